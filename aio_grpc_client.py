@@ -0,0 +1,142 @@
+import asyncio
+from typing import AsyncIterator
+import grpc
+import service_file_pb2
+import service_file_pb2_grpc
+from config import DEFAULT_CHUNK_SIZE
+from grpc_client import call_compression, is_not_found, SERVICE_NAME
+from retry import RetryPolicy, DEFAULT_RETRY_POLICY
+
+class AsyncGrpcClient:
+    """
+    Asynchronous client for interacting with the gRPC backend.
+
+    All calls are multiplexed over a single HTTP/2 channel.
+    """
+
+    def __init__(self, server_address, chunk_size=DEFAULT_CHUNK_SIZE, compression: str = None,
+                 retry_policy: RetryPolicy = DEFAULT_RETRY_POLICY):
+        """
+        Initialize the asynchronous gRPC client with the server address.
+
+        The channel is created lazily on first use, so that it is bound to
+        the event loop which runs the calls.
+
+        :param server_address: Address of the gRPC server.
+        :param chunk_size: Maximum size of a chunk requested from the server.
+        :param compression: Compress the channel and ask for compressed replies with 'gzip', or None.
+        :param retry_policy: Timeouts, deadline and retries of the calls, retried natively by the channel.
+        """
+        self.server_address = server_address
+        self.chunk_size = chunk_size
+        self.retry_policy = retry_policy
+        self.compression, self.metadata = call_compression(compression)
+        self.channel: grpc.aio.Channel | None = None
+        self.stub: service_file_pb2_grpc.FileStub | None = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        """
+        Close the channel.
+        """
+        if self.channel is not None:
+            await self.channel.close()
+            self.channel = None
+            self.stub = None
+
+    def _get_stub(self) -> service_file_pb2_grpc.FileStub:
+        """
+        Return the stub, opening the channel on first use.
+        """
+        if self.stub is None:
+            self.channel = grpc.aio.insecure_channel(self.server_address, compression=self.compression,
+                                                     options=self.retry_policy.grpc_options(SERVICE_NAME))
+            self.stub = service_file_pb2_grpc.FileStub(self.channel)
+        return self.stub
+
+    async def get_file_stat(self, uuid):
+        """
+        Get file metadata from the server.
+
+        :param uuid: UUID of the file.
+        :return: File metadata.
+        """
+        request = service_file_pb2.StatRequest(uuid=service_file_pb2.Uuid(value=uuid))
+        timeout = self.retry_policy.call_timeout(self.retry_policy.start())
+        try:
+            response = await self._get_stub().stat(request, metadata=self.metadata, timeout=timeout)
+        except grpc.RpcError as e:
+            if is_not_found(e):
+                raise FileNotFoundError(f"File with UUID {uuid} not found.") from e
+            raise
+        return {
+            'name': response.data.name,
+            'size': response.data.size,
+            'create_datetime': response.data.create_datetime.ToJsonString(),
+            'mimetype': response.data.mimetype
+        }
+
+    async def read_file(self, uuid):
+        """
+        Read file content from the server.
+
+        :param uuid: UUID of the file.
+        :return: File name and file content.
+        """
+        file_name, chunks = await self.read_file_stream(uuid)
+        return file_name, b''.join([chunk async for chunk in chunks])
+
+    async def read_file_stream(self, uuid) -> tuple[str, AsyncIterator[bytes]]:
+        """
+        Read file content from the server chunk by chunk.
+
+        The first chunk is awaited eagerly so that errors are raised before
+        the caller starts writing any output. The UUID is returned in place
+        of the file name, which the read reply does not carry. The operation
+        deadline bounds the whole transfer and the per-call timeout each reply.
+
+        :param uuid: UUID of the file.
+        :return: File name and an asynchronous iterator over the file content chunks.
+        """
+        request = service_file_pb2.ReadRequest(
+            uuid=service_file_pb2.Uuid(value=uuid),
+            size=self.chunk_size
+        )
+        call = self._get_stub().read(request, metadata=self.metadata, timeout=self.retry_policy.deadline)
+        try:
+            first_chunk = await self._read_reply(call)
+        except grpc.RpcError as e:
+            if is_not_found(e):
+                raise FileNotFoundError(f"File with UUID {uuid} not found.") from e
+            raise
+        return uuid, self._iter_chunks(call, first_chunk)
+
+    async def _read_reply(self, call):
+        """
+        Wait for the next reply of a streaming call, cancelling it if none arrives within the per-call timeout.
+
+        :param call: Streaming read call.
+        :raises TimeoutError: If no reply arrived in time.
+        """
+        try:
+            return await asyncio.wait_for(call.read(), self.retry_policy.timeout)
+        except asyncio.TimeoutError:
+            call.cancel()
+            raise TimeoutError(f"No reply from the server for {self.retry_policy.timeout} seconds.") from None
+
+    async def _iter_chunks(self, call, first_chunk) -> AsyncIterator[bytes]:
+        """
+        Yield the data of the first reply and of all remaining replies.
+
+        :param call: Streaming read call.
+        :param first_chunk: Reply already read from the call.
+        """
+        file_chunk = first_chunk
+        while file_chunk is not grpc.aio.EOF:
+            yield file_chunk.data.data
+            file_chunk = await self._read_reply(call)
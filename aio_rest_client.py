@@ -0,0 +1,155 @@
+from typing import AsyncIterator
+import aiohttp
+from config import DEFAULT_CHUNK_SIZE, DEFAULT_POOL_MAXSIZE
+from compression import accept_encoding
+from retry import RetryPolicy, DEFAULT_RETRY_POLICY, RETRY_STATUSES
+
+class AsyncRestClient:
+    """
+    Asynchronous client for interacting with a REST API to manage files.
+    """
+    def __init__(self, base_url, chunk_size=DEFAULT_CHUNK_SIZE, pool_maxsize=DEFAULT_POOL_MAXSIZE, keep_alive=True,
+                 compression: str = None, retry_policy: RetryPolicy = DEFAULT_RETRY_POLICY):
+        """
+        Initialize AsyncRestClient with base URL.
+
+        The underlying session is created lazily on first use, so that it is
+        bound to the event loop which runs the requests.
+
+        :param base_url: Base URL for the REST API.
+        :param chunk_size: Maximum size of a chunk read from the response body.
+        :param pool_maxsize: Maximum number of connections to a single host.
+        :param keep_alive: Keep connections open between requests.
+        :param compression: Ask the server to compress responses with 'gzip' or 'zstd', or None.
+        :param retry_policy: Timeouts, deadline and retries of the requests.
+        """
+        self.base_url = base_url
+        self.chunk_size = chunk_size
+        self.pool_maxsize = pool_maxsize
+        self.keep_alive = keep_alive
+        self.accept_encoding = accept_encoding(compression)
+        self.retry_policy = retry_policy
+        self.session: aiohttp.ClientSession | None = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        """
+        Close all pooled connections.
+        """
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """
+        Return the pooled session, creating it on first use.
+        """
+        if self.session is None:
+            connector = aiohttp.TCPConnector(limit=self.pool_maxsize, limit_per_host=self.pool_maxsize,
+                                             force_close=not self.keep_alive)
+            self.session = aiohttp.ClientSession(connector=connector, headers={'Accept-Encoding': self.accept_encoding})
+        return self.session
+
+    async def _get(self, url: str) -> aiohttp.ClientResponse:
+        """
+        Send a GET request, retrying failed connections, timeouts and retryable statuses.
+
+        :param url: URL of the request.
+        """
+        return await self.retry_policy.run_async(lambda timeout: self._get_once(url, timeout), self._is_retryable)
+
+    async def _get_once(self, url: str, timeout: float | None) -> aiohttp.ClientResponse:
+        """
+        Send a single GET request and raise ClientResponseError for a retryable status.
+
+        :param url: URL of the request.
+        :param timeout: Timeout for connecting and for every wait for data in seconds, or None.
+        """
+        client_timeout = aiohttp.ClientTimeout(total=None, sock_connect=timeout, sock_read=timeout)
+        response = await self._get_session().get(url, timeout=client_timeout)
+        if response.status in RETRY_STATUSES:
+            response.release()
+            response.raise_for_status()
+        return response
+
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        """
+        Check whether a failed request may be sent again.
+
+        :param error: Exception raised by the attempt.
+        """
+        if isinstance(error, aiohttp.ClientResponseError):
+            return error.status in RETRY_STATUSES
+        return isinstance(error, (aiohttp.ClientConnectionError, TimeoutError))
+
+    async def get_file_stat(self, uuid):
+        """
+        Get file metadata by UUID.
+
+        :param uuid: UUID of the file.
+        """
+        url = f"{self.base_url}/file/{uuid}/stat/"
+        async with await self._get(url) as response:
+            match response.status:
+                case 200:
+                    return await response.json()
+                case 404:
+                    raise FileNotFoundError(f"File with UUID {uuid} not found.")
+                case _:
+                    response.raise_for_status()
+
+    async def read_file(self, uuid):
+        """
+        Read file content by UUID.
+
+        :param uuid: UUID of the file.
+        """
+        file_name, chunks = await self.read_file_stream(uuid)
+        return file_name, b''.join([chunk async for chunk in chunks])
+
+    async def read_file_stream(self, uuid) -> tuple[str, AsyncIterator[bytes]]:
+        """
+        Read file content by UUID without loading the whole body into memory.
+
+        :param uuid: UUID of the file.
+        :return: File name and an asynchronous iterator over the file content chunks.
+        """
+        url = f"{self.base_url}/file/{uuid}/read/"
+        response = await self._get(url)
+        match response.status:
+            case 200:
+                return self._parse_file_name(response), self._iter_body(response)
+            case 404:
+                response.release()
+                raise FileNotFoundError(f"File with UUID {uuid} not found.")
+            case _:
+                response.release()
+                response.raise_for_status()
+
+    async def _iter_body(self, response: aiohttp.ClientResponse) -> AsyncIterator[bytes]:
+        """
+        Yield the response body in chunks and release the connection afterwards.
+
+        :param response: Streamed response.
+        """
+        async with response:
+            async for chunk in response.content.iter_chunked(self.chunk_size):
+                yield chunk
+
+    @staticmethod
+    def _parse_file_name(response: aiohttp.ClientResponse) -> str:
+        """
+        Return the file name from the Content-Disposition header.
+
+        :param response: Response of the read endpoint.
+        """
+        disposition = response.headers.get('Content-Disposition', '')
+        if 'filename=' in disposition:
+            return disposition.split('filename=')[-1].strip('"')
+        return 'unknown_filename'
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark of file-client against local REST and gRPC servers.
+
+Generates a set of files of the requested sizes, starts flask_server/server.py
+and server_grpc/grpc_server.py serving them on free local ports, and measures
+stat and read for each backend, file size and concurrency level. Every
+scenario runs in a fresh client process which reports its latency samples and
+peak RSS; server CPU time is read from /proc around each scenario. Results are
+printed as JSON so runs on different commits can be compared.
+
+The gRPC stand-in keeps file contents in memory, so gigabyte sizes need as
+much free memory in the server process.
+
+Usage: python benchmarks/e2e.py [--sizes 1,1K,1M,64M] [--concurrency 1,8] [--requests N] [--json FILE]
+"""
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import resource
+import tempfile
+import statistics
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT_DIR: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+from config import BACKEND_REST, BACKEND_GRPC
+
+SIZE_SUFFIXES: dict[str, int] = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+WRITE_BLOCK_SIZE: int = 1024 * 1024
+SERVER_START_TIMEOUT: float = 30.0
+
+def parse_size(value: str) -> int:
+    """
+    Parse a size in bytes with an optional K, M or G suffix.
+
+    :param value: Size such as '512', '1K' or '64M'.
+    """
+    value = value.strip().upper()
+    if value and value[-1] in SIZE_SUFFIXES:
+        return int(value[:-1]) * SIZE_SUFFIXES[value[-1]]
+    return int(value)
+
+def generate_files(directory: str, sizes: list[int]) -> list[dict]:
+    """
+    Write one file of random content per size and return their metadata.
+
+    :param directory: Directory for the generated files.
+    :param sizes: File sizes in bytes.
+    """
+    files = []
+    for size in sizes:
+        path = os.path.join(directory, f'bench-{size}.bin')
+        with open(path, 'wb') as f:
+            remaining = size
+            while remaining > 0:
+                block = os.urandom(min(WRITE_BLOCK_SIZE, remaining))
+                f.write(block)
+                remaining -= len(block)
+        files.append({
+            'uuid': f'bench-{size}',
+            'name': os.path.basename(path),
+            'size': size,
+            'create_datetime': '2024-01-01T00:00:00',
+            'mimetype': 'application/octet-stream',
+            'path': path,
+        })
+    return files
+
+def serve_rest(manifest: str, port: int) -> None:
+    """
+    Run the Flask server with the generated files.
+
+    :param manifest: Path to the JSON list of generated files.
+    :param port: Port to listen on.
+    """
+    from flask_server.server import app, file_service, FileMetadata
+    with open(manifest) as f:
+        file_service.add_files_metadata(FileMetadata(**file) for file in json.load(f))
+    app.run(port=port, threaded=True)
+
+def serve_grpc(manifest: str, port: int) -> None:
+    """
+    Run the gRPC server with the generated files.
+
+    :param manifest: Path to the JSON list of generated files.
+    :param port: Port to listen on.
+    """
+    from server_grpc import grpc_server
+    with open(manifest) as f:
+        for file in json.load(f):
+            with open(file['path'], 'rb') as content:
+                grpc_server.FILES[file['uuid']] = {**file, 'content': content.read()}
+    grpc_server.serve(port)
+
+def free_port() -> int:
+    """
+    Return a port which is currently free on localhost.
+    """
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def start_server(backend: str, manifest: str, port: int) -> subprocess.Popen:
+    """
+    Start a server in a subprocess and wait until it accepts connections.
+
+    :param backend: Type of backend (REST or gRPC).
+    :param manifest: Path to the JSON list of generated files.
+    :param port: Port to listen on.
+    """
+    process = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve', backend,
+                                '--manifest', manifest, '--port', str(port)],
+                               cwd=ROOT_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"The {backend} server exited with code {process.returncode}.")
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"The {backend} server did not start within {SERVER_START_TIMEOUT} seconds.")
+
+def process_cpu_time(pid: int) -> float:
+    """
+    Return the user and system CPU time of a process in seconds.
+
+    :param pid: Process ID.
+    """
+    with open(f'/proc/{pid}/stat') as f:
+        fields = f.read().rsplit(')', 1)[1].split()
+    # utime and stime are the 14th and 15th fields, counted from the pid
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+def run_worker(backend: str, address: str, command: str, uuid: str, requests: int, concurrency: int) -> dict:
+    """
+    Run one scenario in this process and return its measurements.
+
+    :param backend: Type of backend (REST or gRPC).
+    :param address: Base URL or address of the server.
+    :param command: 'stat' or 'read'.
+    :param uuid: UUID of the file.
+    :param requests: Number of requests.
+    :param concurrency: Number of requests in flight.
+    """
+    from file_client import FileClient
+    client = FileClient(backend, rest_base_url=address, grpc_server=address, output=os.devnull,
+                        pool_size=concurrency)
+    operation = client.get_stat if command == 'stat' else client.read
+
+    def timed(_: int) -> float:
+        start = time.perf_counter()
+        operation(uuid)
+        return time.perf_counter() - start
+
+    operation(uuid)  # Warm up the connection
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(timed, range(requests)))
+    wall_time = time.perf_counter() - start
+    client.client.close()
+    return {
+        'latencies': latencies,
+        'wall_time': wall_time,
+        'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+def percentiles(samples: list[float]) -> dict:
+    """
+    Return latency percentiles of the samples in milliseconds.
+
+    :param samples: Latencies in seconds.
+    """
+    ordered = sorted(samples)
+
+    def percentile(fraction: float) -> float:
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000
+
+    return {
+        'min': ordered[0] * 1000,
+        'p50': statistics.median(ordered) * 1000,
+        'p90': percentile(0.90),
+        'p99': percentile(0.99),
+        'max': ordered[-1] * 1000,
+    }
+
+def run_scenario(backend: str, address: str, server: subprocess.Popen, command: str, file: dict,
+                 requests: int, concurrency: int) -> dict:
+    """
+    Run one scenario in a fresh client process and summarize its measurements.
+
+    :param backend: Type of backend (REST or gRPC).
+    :param address: Base URL or address of the server.
+    :param server: Server process, whose CPU time is measured.
+    :param command: 'stat' or 'read'.
+    :param file: Metadata of the generated file.
+    :param requests: Number of requests.
+    :param concurrency: Number of requests in flight.
+    """
+    cpu_before = process_cpu_time(server.pid)
+    result = subprocess.run([sys.executable, os.path.abspath(__file__), '--worker', backend, '--address', address,
+                             '--command', command, '--uuid', file['uuid'], '--requests', str(requests),
+                             '--concurrency', str(concurrency)],
+                            cwd=ROOT_DIR, capture_output=True, text=True, check=True)
+    server_cpu = process_cpu_time(server.pid) - cpu_before
+    measurements = json.loads(result.stdout)
+    wall_time = measurements['wall_time']
+    transferred = requests * file['size'] if command == 'read' else 0
+    return {
+        'backend': backend,
+        'command': command,
+        'size': file['size'],
+        'concurrency': concurrency,
+        'requests': requests,
+        'latency_ms': percentiles(measurements['latencies']),
+        'requests_per_s': requests / wall_time,
+        'throughput_mib_s': transferred / wall_time / SIZE_SUFFIXES['M'],
+        'client_max_rss_kb': measurements['max_rss_kb'],
+        'server_cpu_s': server_cpu,
+    }
+
+def git_commit() -> str | None:
+    """
+    Return the commit of the working tree, or None outside a git checkout.
+    """
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT_DIR, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmark(args: argparse.Namespace) -> dict:
+    """
+    Generate the files, start both servers and run every scenario.
+
+    :param args: Parsed command line arguments.
+    """
+    sizes = [parse_size(size) for size in args.sizes.split(',')]
+    levels = [int(level) for level in args.concurrency.split(',')]
+    results: dict = {'python': sys.version.split()[0], 'commit': git_commit(), 'scenarios': []}
+    with tempfile.TemporaryDirectory(prefix='file-client-bench-') as directory:
+        files = generate_files(directory, sizes)
+        manifest = os.path.join(directory, 'manifest.json')
+        with open(manifest, 'w') as f:
+            json.dump(files, f)
+
+        for backend in args.backends.split(','):
+            port = free_port()
+            address = f'http://127.0.0.1:{port}' if backend == BACKEND_REST else f'127.0.0.1:{port}'
+            server = start_server(backend, manifest, port)
+            try:
+                for command in ('stat', 'read'):
+                    for file in files if command == 'read' else files[:1]:
+                        for concurrency in levels:
+                            # Cap the transferred volume so gigabyte files stay practical
+                            requests = args.requests
+                            if command == 'read' and file['size']:
+                                requests = min(requests, max(concurrency, args.max_transfer // file['size']))
+                            results['scenarios'].append(
+                                run_scenario(backend, address, server, command, file, requests, concurrency))
+            finally:
+                server.terminate()
+                server.wait()
+    return results
+
+def main() -> None:
+    """
+    Parse command line arguments and run the benchmark, a server or a client worker.
+    """
+    parser = argparse.ArgumentParser(description='Measure stat and read of file-client against local servers.')
+    parser.add_argument('--sizes', default='1,1K,1M,64M',
+                        help='Comma-separated file sizes with optional K, M, G suffixes (default: 1,1K,1M,64M)')
+    parser.add_argument('--concurrency', default='1,8',
+                        help='Comma-separated numbers of requests in flight (default: 1,8)')
+    parser.add_argument('--requests', type=int, default=50, help='Requests per scenario (default: 50)')
+    parser.add_argument('--max-transfer', type=parse_size, default=SIZE_SUFFIXES['G'],
+                        help='Maximum bytes read per scenario, limiting requests for large files (default: 1G)')
+    parser.add_argument('--backends', default=f'{BACKEND_REST},{BACKEND_GRPC}',
+                        help=f'Comma-separated backends to measure (default: {BACKEND_REST},{BACKEND_GRPC})')
+    parser.add_argument('--json', default='-', help='Output file for the results (default: stdout)')
+    # Internal modes used by the subprocesses of the benchmark
+    parser.add_argument('--serve', choices=[BACKEND_REST, BACKEND_GRPC], help=argparse.SUPPRESS)
+    parser.add_argument('--manifest', help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--worker', choices=[BACKEND_REST, BACKEND_GRPC], help=argparse.SUPPRESS)
+    parser.add_argument('--address', help=argparse.SUPPRESS)
+    parser.add_argument('--command', choices=['stat', 'read'], help=argparse.SUPPRESS)
+    parser.add_argument('--uuid', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve == BACKEND_REST:
+        serve_rest(args.manifest, args.port)
+        return
+    if args.serve == BACKEND_GRPC:
+        serve_grpc(args.manifest, args.port)
+        return
+    if args.worker is not None:
+        concurrency = int(args.concurrency)
+        print(json.dumps(run_worker(args.worker, args.address, args.command, args.uuid, args.requests, concurrency)))
+        return
+
+    output = json.dumps(run_benchmark(args), indent=2)
+    if args.json == '-':
+        print(output)
+    else:
+        with open(args.json, 'w') as f:
+            f.write(output + '\n')
+
+if __name__ == '__main__':
+    main()
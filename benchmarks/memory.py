@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark of the in-memory metadata stores of the REST server.
+
+Loads the same synthetic catalog into DictMetadataStore and
+CompactMetadataStore and reports the memory each one holds, measured with
+tracemalloc, together with the mean time of a lookup. Results are printed
+as JSON so runs on different commits can be compared.
+
+Usage: python benchmarks/memory.py [--files N] [--lookups N] [--json FILE]
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tracemalloc
+import uuid as uuid_module
+from typing import Callable, Iterator
+
+ROOT_DIR: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+from flask_server.store import FileMetadata, MetadataStore, DictMetadataStore, CompactMetadataStore
+
+MIMETYPES: tuple[str, ...] = ('application/pdf', 'text/plain', 'image/jpeg', 'application/json', 'image/png')
+DIRECTORIES: int = 1000
+
+def generate_files(count: int, seed: int = 0) -> Iterator[FileMetadata]:
+    """
+    Yield metadata of a synthetic catalog, the same for the same seed.
+
+    :param count: Number of files.
+    :param seed: Seed of the random generator.
+    """
+    rng = random.Random(seed)
+    for i in range(count):
+        name = f"document-{i}.{rng.choice(('pdf', 'txt', 'jpg', 'json', 'png'))}"
+        yield FileMetadata(
+            uuid=str(uuid_module.UUID(int=rng.getrandbits(128), version=4)),
+            create_datetime=time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(rng.randrange(1_500_000_000, 1_700_000_000))),
+            size=rng.randrange(1, 1 << 30),
+            mimetype=rng.choice(MIMETYPES),
+            name=name,
+            path=f"/storage/volume-{i % DIRECTORIES}/{name}"
+        )
+
+def build_dict_store(files: Iterator[FileMetadata]) -> MetadataStore:
+    return DictMetadataStore({file_metadata.uuid: file_metadata for file_metadata in files})
+
+def build_compact_store(files: Iterator[FileMetadata]) -> MetadataStore:
+    return CompactMetadataStore(files)
+
+def measure(build: Callable[[Iterator[FileMetadata]], MetadataStore], files: int, lookups: int) -> dict:
+    """
+    Build a store of the synthetic catalog and measure its memory and lookup time.
+
+    :param build: Function building the store from the metadata of the files.
+    :param files: Number of files.
+    :param lookups: Number of timed lookups.
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    store = build(generate_files(files))
+    load_time = time.perf_counter() - start
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    uuids = [file_metadata.uuid for file_metadata in generate_files(lookups)]
+    start = time.perf_counter()
+    for uuid in uuids:
+        store.get(uuid)
+    lookup_time = (time.perf_counter() - start) / len(uuids)
+    return {
+        'files': len(store),
+        'memory_mib': memory / 1024 ** 2,
+        'bytes_per_file': memory / files,
+        'load_s': load_time,
+        'lookup_us': lookup_time * 1e6,
+    }
+
+def main() -> None:
+    """
+    Parse command line arguments and compare the stores.
+    """
+    parser = argparse.ArgumentParser(description='Compare memory use of the in-memory metadata stores.')
+    parser.add_argument('--files', type=int, default=1_000_000, help='Number of files in the catalog (default: 1000000)')
+    parser.add_argument('--lookups', type=int, default=100_000, help='Number of timed lookups (default: 100000)')
+    parser.add_argument('--json', default='-', help='Output file for the results (default: stdout)')
+    args = parser.parse_args()
+
+    results = {
+        'python': sys.version.split()[0],
+        'stores': {
+            'dict': measure(build_dict_store, args.files, min(args.lookups, args.files)),
+            'compact': measure(build_compact_store, args.files, min(args.lookups, args.files)),
+        },
+    }
+    results['memory_ratio'] = results['stores']['dict']['memory_mib'] / results['stores']['compact']['memory_mib']
+    output = json.dumps(results, indent=2)
+    if args.json == '-':
+        print(output)
+    else:
+        with open(args.json, 'w') as f:
+            f.write(output + '\n')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark for the file-client CLI.
+
+Measures the import time of the CLI and backend modules and the cold-start
+latency of each subcommand, every sample in a fresh interpreter. Results are
+printed as JSON so runs on different commits can be compared.
+
+Usage: python benchmarks/startup.py [--repeat N] [--uuid UUID] [--json FILE]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+ROOT_DIR: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+from config import BACKEND_REST, BACKEND_GRPC, DEFAULT_REST_URL, DEFAULT_GRPC_SERVER
+
+MODULES: list[str] = ['file_client', 'rest_client', 'grpc_client', 'aio_rest_client', 'aio_grpc_client']
+CLI: str = os.path.join(ROOT_DIR, 'file_client.py')
+
+def measure_import(module: str) -> int:
+    """
+    Return the cumulative import time of a module in microseconds.
+
+    :param module: Name of the module.
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=ROOT_DIR, capture_output=True, text=True, check=True)
+    for line in reversed(result.stderr.splitlines()):
+        fields = [field.strip() for field in line.split('|')]
+        if len(fields) == 3 and fields[2] == module:
+            return int(fields[1])
+    raise RuntimeError(f"Import time of {module} not found.")
+
+def measure_command(args: list[str]) -> tuple[float, int]:
+    """
+    Run the CLI once and return its wall time in milliseconds and exit code.
+
+    :param args: Command line arguments of the CLI.
+    """
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, CLI, *args], cwd=ROOT_DIR,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return (time.perf_counter() - start) * 1000, result.returncode
+
+def summarize(samples: list[float]) -> dict:
+    """
+    Return summary statistics of the samples.
+
+    :param samples: Measured values.
+    """
+    return {
+        'min': min(samples),
+        'median': statistics.median(samples),
+        'max': max(samples),
+    }
+
+def main() -> None:
+    """
+    Parse command line arguments and run the benchmark.
+    """
+    parser = argparse.ArgumentParser(description='Measure import time and cold-start latency of file-client.')
+    parser.add_argument('--repeat', type=int, default=10, help='Number of samples per measurement (default: 10)')
+    parser.add_argument('--uuid', default='1234', help='UUID used for stat and read (default: 1234)')
+    parser.add_argument('--base-url', default=DEFAULT_REST_URL, help=f'REST server (default: {DEFAULT_REST_URL})')
+    parser.add_argument('--grpc-server', default=DEFAULT_GRPC_SERVER,
+                        help=f'gRPC server (default: {DEFAULT_GRPC_SERVER})')
+    parser.add_argument('--json', default='-', help='Output file for the results (default: stdout)')
+    args = parser.parse_args()
+
+    results: dict = {'python': sys.version.split()[0], 'import_us': {}, 'command_ms': {}}
+    for module in MODULES:
+        results['import_us'][module] = summarize([measure_import(module) for _ in range(args.repeat)])
+
+    commands: dict[str, list[str]] = {'--help': ['--help']}
+    for backend in (BACKEND_REST, BACKEND_GRPC):
+        for command in ('stat', 'read'):
+            commands[f'{backend} {command}'] = [
+                '--backend', backend, '--base-url', args.base_url, '--grpc-server', args.grpc_server,
+                '--no-cache', '--output', os.devnull, command, args.uuid
+            ]
+    for name, command_args in commands.items():
+        samples = [measure_command(command_args) for _ in range(args.repeat)]
+        results['command_ms'][name] = {
+            **summarize([wall_time for wall_time, _ in samples]),
+            'exit_codes': sorted({exit_code for _, exit_code in samples}),
+        }
+
+    output = json.dumps(results, indent=2)
+    if args.json == '-':
+        print(output)
+    else:
+        with open(args.json, 'w') as f:
+            f.write(output + '\n')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+"""
+Negotiation of transport compression for the REST clients.
+
+Compression is opt-in: without it the clients ask for the identity encoding,
+so servers never spend CPU on compressing responses for them. Decoding is
+left to requests (urllib3) and aiohttp, which support zstd only when the
+zstandard package is installed.
+"""
+def zstd_available() -> bool:
+    """
+    Check whether zstd responses can be decoded.
+    """
+    try:
+        import zstandard
+    except ImportError:
+        return False
+    return True
+
+def accept_encoding(compression: str | None) -> str:
+    """
+    Return the Accept-Encoding header value for the requested compression.
+
+    zstd is preferred but gzip stays acceptable for servers without zstd.
+
+    :param compression: 'gzip', 'zstd' or None for no compression.
+    :raises ValueError: If the compression is unknown or zstd cannot be decoded.
+    """
+    match compression:
+        case None:
+            return 'identity'
+        case 'gzip':
+            return 'gzip'
+        case 'zstd':
+            if not zstd_available():
+                raise ValueError("zstd compression requires the zstandard package.")
+            return 'zstd, gzip;q=0.5'
+        case _:
+            raise ValueError(f"Unknown compression: {compression}")
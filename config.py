@@ -10,4 +10,60 @@ DEFAULT_OUTPUT = '-'
 # Backend possible choices
 BACKEND_GRPC = 'grpc'
 BACKEND_REST = 'rest'
+BACKEND_AUTO = 'auto'  # both backends, hedged by measured latency
 DEFAULT_SERVER_TYPE = BACKEND_REST
+
+# Maximum size of a single chunk when streaming file content (64 KiB)
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+# HTTP connection pool for the REST backend
+DEFAULT_POOL_CONNECTIONS = 4  # number of per-host pools kept alive
+DEFAULT_POOL_MAXSIZE = 10  # maximum connections per host
+
+# Number of concurrent workers in batch mode
+DEFAULT_JOBS = 8
+
+# Client-side metadata cache for stat
+DEFAULT_CACHE_PATH = os.getenv('FILE_CLIENT_CACHE',
+                               os.path.join(os.path.expanduser('~'), '.cache', 'file-client', 'stat-cache.sqlite3'))
+DEFAULT_CACHE_TTL = 3600  # seconds
+DEFAULT_CACHE_MAX_ENTRIES = 100_000
+
+# Client-side cache of REST file contents (disabled when not set)
+DEFAULT_CONTENT_CACHE_DIR = os.getenv('FILE_CLIENT_CONTENT_CACHE')
+
+# Segmented downloads: files smaller than this are read with a single request
+DEFAULT_SEGMENT_MIN_SIZE = 8 * 1024 * 1024
+
+# Unix socket of the local agent keeping warm backend connections
+DEFAULT_AGENT_SOCKET = os.getenv('FILE_CLIENT_AGENT',
+                                 os.path.join(os.getenv('XDG_RUNTIME_DIR', '/tmp'), f'file-client-agent-{os.getuid()}.sock'))
+
+# Transport compression requested with --compression (zstd only over REST)
+COMPRESSION_CHOICES = ['gzip', 'zstd']
+# gRPC metadata key by which clients opt in to compressed replies
+GRPC_COMPRESSION_METADATA = 'file-accept-compression'
+# Responses smaller than this are not worth compressing
+COMPRESSION_MIN_SIZE = 1024
+# MIME types which compress well; anything else (images, archives, ...) is sent as is
+COMPRESSIBLE_MIMETYPES = ('text/', 'application/json', 'application/xml', 'application/javascript',
+                          'image/svg+xml')
+
+# Response headers carrying the file metadata of a REST read with ?stat=1
+STAT_HEADERS = {
+    'name': 'X-File-Name',
+    'size': 'X-File-Size',
+    'create_datetime': 'X-File-Create-Datetime',
+    'mimetype': 'X-File-Mimetype',
+}
+
+# Automatic backend selection: a hedged call goes to the other backend when the
+# primary has not answered within this percentile of its recent latencies
+DEFAULT_HEDGE_PERCENTILE = 95
+DEFAULT_HEDGE_DELAY = 0.05  # seconds, used until enough latencies are measured
+DEFAULT_LATENCY_WINDOW = 100  # latencies kept per backend
+
+# Retries and timeouts of backend calls
+DEFAULT_RETRIES = 3  # retries after the first attempt
+DEFAULT_TIMEOUT = 30.0  # seconds per attempt (REST: connect and between bytes, gRPC reads: between replies)
+DEFAULT_DEADLINE = None  # seconds per operation including retries, None for no limit
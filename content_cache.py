@@ -0,0 +1,151 @@
+import os
+import json
+import hashlib
+import tempfile
+from typing import BinaryIO, Iterable, Iterator
+from config import DEFAULT_CHUNK_SIZE
+from output_sink import FileChunks
+
+class StoringChunks:
+    """
+    Chunks passed through to the cache while they are read.
+
+    Closing them also closes the source chunks, also if they were closed
+    before they were iterated.
+    """
+    def __init__(self, writer: Iterator[bytes], source: Iterable[bytes]) -> None:
+        """
+        Initialize the chunks.
+
+        :param writer: Generator writing the chunks to the cache and yielding them.
+        :param source: Chunks of the response body.
+        """
+        self._writer = writer
+        self._source = source
+
+    def __iter__(self) -> Iterator[bytes]:
+        return self
+
+    def __next__(self) -> bytes:
+        return next(self._writer)
+
+    def close(self) -> None:
+        self._writer.close()
+        close = getattr(self._source, 'close', None)
+        if close is not None:
+            close()
+
+class CachedContent:
+    """
+    Cached response body together with the validators it was served with.
+    """
+    def __init__(self, file: BinaryIO, etag: str | None, last_modified: str | None, file_name: str) -> None:
+        """
+        Initialize the cached content.
+
+        :param file: Open cache file positioned at the start of the body.
+        :param etag: ETag header of the cached response.
+        :param last_modified: Last-Modified header of the cached response.
+        :param file_name: Name of the cached file.
+        """
+        self.file = file
+        self.etag = etag
+        self.last_modified = last_modified
+        self.file_name = file_name
+
+    def validators(self) -> dict[str, str]:
+        """
+        Return conditional request headers revalidating this content.
+        """
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+    def iter_chunks(self, chunk_size: int = DEFAULT_CHUNK_SIZE) -> FileChunks:
+        """
+        Return the cached body, which is read in chunks or copied with sendfile.
+
+        The cache file is closed once the body was consumed.
+
+        :param chunk_size: Maximum size of a chunk.
+        """
+        return FileChunks(self.file, chunk_size)
+
+    def close(self) -> None:
+        """
+        Close the cache file without reading it.
+        """
+        self.file.close()
+
+class ContentCache:
+    """
+    On-disk cache of downloaded file contents revalidated with conditional requests.
+
+    Each entry is a single file holding a JSON header line with the validators
+    followed by the body, and is replaced atomically, so readers in other
+    processes always see a consistent entry.
+    """
+    def __init__(self, directory: str) -> None:
+        """
+        Initialize the cache in the given directory.
+
+        :param directory: Directory holding the cache entries.
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _entry_path(self, url: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(url.encode('utf-8')).hexdigest())
+
+    def lookup(self, url: str) -> CachedContent | None:
+        """
+        Open the cached content of a URL.
+
+        :param url: URL of the resource.
+        :return: Cached content or None if the URL is not cached.
+        """
+        try:
+            file = open(self._entry_path(url), 'rb')
+        except FileNotFoundError:
+            return None
+        try:
+            header = json.loads(file.readline())
+        except ValueError:
+            file.close()
+            return None
+        return CachedContent(file, header.get('etag'), header.get('last_modified'), header['file_name'])
+
+    def store(self, url: str, etag: str | None, last_modified: str | None, file_name: str,
+              chunks: Iterable[bytes]) -> StoringChunks:
+        """
+        Pass chunks through while writing them to the cache.
+
+        The entry is published only once all chunks were consumed, so an
+        interrupted download never leaves a truncated entry behind.
+
+        :param url: URL of the resource.
+        :param etag: ETag header of the response.
+        :param last_modified: Last-Modified header of the response.
+        :param file_name: Name of the file.
+        :param chunks: Chunks of the response body.
+        :return: Iterator over the same chunks.
+        """
+        return StoringChunks(self._write(url, etag, last_modified, file_name, chunks), chunks)
+
+    def _write(self, url: str, etag: str | None, last_modified: str | None, file_name: str,
+               chunks: Iterable[bytes]) -> Iterator[bytes]:
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                header = {'etag': etag, 'last_modified': last_modified, 'file_name': file_name}
+                f.write(json.dumps(header).encode('utf-8') + b'\n')
+                for chunk in chunks:
+                    f.write(chunk)
+                    yield chunk
+            os.replace(tmp_path, self._entry_path(url))
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
@@ -0,0 +1,286 @@
+"""
+Local agent keeping warm backend connections for short-lived file-client runs.
+
+The agent listens on a Unix socket and serves stat and read requests through
+long-lived backend clients, connection pools and the metadata cache. Each
+request uses its own connection: the client sends one JSON line, the agent
+answers with a JSON header line and, for reads, with length-prefixed content
+frames terminated by an empty frame and a JSON trailer line.
+"""
+import os
+import sys
+import json
+import errno
+import socket
+import struct
+import signal
+import threading
+import socketserver
+from typing import Callable, Iterator
+from config import DEFAULT_AGENT_SOCKET
+
+# Length prefix of a content frame
+FRAME_HEADER = struct.Struct('>I')
+
+class AgentError(Exception):
+    """Raised when the agent reports a failure which is not a missing file."""
+
+def agent_is_running(socket_path: str = DEFAULT_AGENT_SOCKET) -> bool:
+    """
+    Check whether an agent accepts connections on the socket.
+
+    :param socket_path: Path to the Unix socket of the agent.
+    :return: True if the agent is running.
+    """
+    if not os.path.exists(socket_path):
+        return False
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(socket_path)
+        return True
+    except OSError:
+        return False
+
+class AgentClient:
+    """
+    Backend client forwarding stat and read requests to a running agent.
+    """
+    def __init__(self, socket_path: str, backend: str, address: str) -> None:
+        """
+        Initialize the client for one backend served by the agent.
+
+        :param socket_path: Path to the Unix socket of the agent.
+        :param backend: Type of backend (REST or gRPC).
+        :param address: Base URL or address of the backend server.
+        """
+        self.socket_path = socket_path
+        self.backend = backend
+        self.address = address
+
+    def get_file_stat(self, uuid):
+        """
+        Get file metadata by UUID through the agent.
+
+        :param uuid: UUID of the file.
+        """
+        with self._request({'op': 'stat', 'uuid': uuid}) as (header, rfile):
+            return header['stat']
+
+    def read_file(self, uuid):
+        """
+        Read file content by UUID through the agent.
+
+        :param uuid: UUID of the file.
+        """
+        file_name, chunks = self.read_file_stream(uuid)
+        return file_name, b''.join(chunks)
+
+    def read_file_stream(self, uuid, offset: int = 0) -> tuple[str, Iterator[bytes]]:
+        """
+        Read file content by UUID through the agent chunk by chunk.
+
+        :param uuid: UUID of the file.
+        :param offset: Offset of the first byte to read.
+        :return: File name and an iterator over the file content chunks.
+        """
+        request = self._request({'op': 'read', 'uuid': uuid, 'offset': offset})
+        header, rfile = request.__enter__()
+        return header['file_name'], self._iter_frames(request, rfile)
+
+    def close(self) -> None:
+        """
+        Nothing to release, every request uses its own connection.
+        """
+
+    @staticmethod
+    def _iter_frames(request, rfile) -> Iterator[bytes]:
+        """
+        Yield content frames until the terminating frame and check the trailer.
+
+        :param request: Open request context, closed once the content was read.
+        :param rfile: Stream of the agent connection.
+        """
+        try:
+            while True:
+                (size,) = FRAME_HEADER.unpack(AgentClient._read_exactly(rfile, FRAME_HEADER.size))
+                if size == 0:
+                    break
+                yield AgentClient._read_exactly(rfile, size)
+            AgentClient._check_reply(json.loads(rfile.readline()))
+        finally:
+            request.__exit__(None, None, None)
+
+    def _request(self, message: dict):
+        """
+        Send a request to the agent and return a context with the reply header.
+
+        :param message: Request without the backend identification.
+        """
+        return _AgentRequest(self.socket_path, {**message, 'backend': self.backend, 'address': self.address})
+
+    @staticmethod
+    def _read_exactly(rfile, size: int) -> bytes:
+        data = rfile.read(size)
+        if len(data) != size:
+            raise AgentError("Connection to the agent closed unexpectedly.")
+        return data
+
+    @staticmethod
+    def _check_reply(reply: dict) -> dict:
+        """
+        Raise the error reported by the agent, if any.
+
+        :param reply: Header or trailer sent by the agent.
+        :return: The reply itself.
+        """
+        if reply.get('ok'):
+            return reply
+        if reply.get('error') == 'not_found':
+            raise FileNotFoundError(reply.get('message'))
+        raise AgentError(reply.get('message'))
+
+class _AgentRequest:
+    """
+    Connection carrying one request to the agent.
+    """
+    def __init__(self, socket_path: str, message: dict) -> None:
+        self.socket_path = socket_path
+        self.message = message
+        self.sock: socket.socket | None = None
+
+    def __enter__(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self.sock.connect(self.socket_path)
+            self.sock.sendall(json.dumps(self.message).encode('utf-8') + b'\n')
+            rfile = self.sock.makefile('rb')
+            header = AgentClient._check_reply(json.loads(rfile.readline() or b'{}'))
+        except BaseException:
+            self.sock.close()
+            raise
+        return header, rfile
+
+    def __exit__(self, *exc_info):
+        self.sock.close()
+
+class AgentRequestHandler(socketserver.StreamRequestHandler):
+    """
+    Serves a single request received on an agent connection.
+    """
+    server: 'FileAgent'
+
+    def handle(self) -> None:
+        line = self.rfile.readline()
+        if not line:
+            # Liveness probe connecting without sending a request
+            return
+        try:
+            request: dict = json.loads(line)
+            file_client = self.server.get_file_client(request['backend'], request['address'])
+            match request['op']:
+                case 'stat':
+                    self._send_json({'ok': True, 'stat': file_client.get_stat(request['uuid'])})
+                case 'read':
+                    self._handle_read(file_client, request)
+                case op:
+                    self._send_json({'ok': False, 'error': 'error', 'message': f"Unknown operation: {op}"})
+        except FileNotFoundError as e:
+            self._send_json({'ok': False, 'error': 'not_found', 'message': str(e)})
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        except Exception as e:
+            try:
+                self._send_json({'ok': False, 'error': 'error', 'message': str(e)})
+            except OSError:
+                pass
+
+    def _handle_read(self, file_client, request: dict) -> None:
+        """
+        Stream file content to the connection as length-prefixed frames.
+
+        :param file_client: FileClient of the requested backend.
+        :param request: Decoded read request.
+        """
+        offset: int = request.get('offset', 0)
+        if offset:
+            file_name, chunks = file_client.client.read_file_stream(request['uuid'], offset=offset)
+        else:
+            file_name, chunks = file_client.client.read_file_stream(request['uuid'])
+        self._send_json({'ok': True, 'file_name': file_name})
+        try:
+            for chunk in chunks:
+                if chunk:
+                    self.wfile.write(FRAME_HEADER.pack(len(chunk)))
+                    self.wfile.write(chunk)
+            trailer = {'ok': True}
+        except Exception as e:
+            trailer = {'ok': False, 'error': 'error', 'message': str(e)}
+        self.wfile.write(FRAME_HEADER.pack(0))
+        self._send_json(trailer)
+
+    def _send_json(self, message: dict) -> None:
+        self.wfile.write(json.dumps(message).encode('utf-8') + b'\n')
+
+class FileAgent(socketserver.ThreadingUnixStreamServer):
+    """
+    Unix socket server keeping one warm FileClient per backend.
+    """
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, client_factory: Callable[[str, str], object]) -> None:
+        """
+        Bind the agent to its socket, replacing a stale socket file.
+
+        :param socket_path: Path to the Unix socket.
+        :param client_factory: Function creating a FileClient for a backend type and address.
+        :raises OSError: If another agent is already running on the socket.
+        """
+        if agent_is_running(socket_path):
+            raise OSError(errno.EADDRINUSE, f"An agent is already running on {socket_path}")
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        self.socket_path = socket_path
+        self.client_factory = client_factory
+        self._clients: dict[tuple[str, str], object] = {}
+        self._clients_lock = threading.Lock()
+        old_umask = os.umask(0o077)
+        try:
+            super().__init__(socket_path, AgentRequestHandler)
+        finally:
+            os.umask(old_umask)
+
+    def get_file_client(self, backend: str, address: str):
+        """
+        Return the warm FileClient of a backend, creating it on first use.
+
+        :param backend: Type of backend (REST or gRPC).
+        :param address: Base URL or address of the backend server.
+        """
+        with self._clients_lock:
+            key = (backend, address)
+            if key not in self._clients:
+                self._clients[key] = self.client_factory(backend, address)
+            return self._clients[key]
+
+    def server_close(self) -> None:
+        super().server_close()
+        with self._clients_lock:
+            for file_client in self._clients.values():
+                file_client.client.close()
+            self._clients.clear()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+def serve_agent(socket_path: str, client_factory: Callable[[str, str], object]) -> None:
+    """
+    Run the agent in the foreground until it is interrupted or terminated.
+
+    :param socket_path: Path to the Unix socket.
+    :param client_factory: Function creating a FileClient for a backend type and address.
+    """
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    with FileAgent(socket_path, client_factory) as agent:
+        try:
+            agent.serve_forever()
+        except KeyboardInterrupt:
+            pass
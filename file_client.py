@@ -1,58 +1,540 @@
 #!/usr/bin/env python3
+# Backend modules and their dependencies (requests, grpc, aiohttp, sqlite3, asyncio)
+# are imported only when they are used, which keeps the CLI startup fast.
+from __future__ import annotations
+import time
+# Start of the client, the origin of recorded timings
+START_TIME: float = time.perf_counter()
+import os
 import sys
 import argparse
-from rest_client import RestClient
-from grpc_client import GrpcClient
-# from grpc_client import GrpcClient
-from config import BACKEND_REST, BACKEND_GRPC, DEFAULT_REST_URL, DEFAULT_GRPC_SERVER, DEFAULT_SERVER_TYPE, DEFAULT_OUTPUT
+from collections import deque
+from typing import TYPE_CHECKING, Awaitable, Callable, Iterable, Iterator
+from config import BACKEND_REST, BACKEND_GRPC, BACKEND_AUTO, DEFAULT_REST_URL, DEFAULT_GRPC_SERVER, DEFAULT_SERVER_TYPE, DEFAULT_OUTPUT, \
+    DEFAULT_CHUNK_SIZE, DEFAULT_POOL_MAXSIZE, DEFAULT_JOBS, DEFAULT_CACHE_PATH, DEFAULT_CACHE_TTL, DEFAULT_CACHE_MAX_ENTRIES, \
+    DEFAULT_CONTENT_CACHE_DIR, DEFAULT_SEGMENT_MIN_SIZE, DEFAULT_AGENT_SOCKET, COMPRESSION_CHOICES, \
+    DEFAULT_HEDGE_PERCENTILE, DEFAULT_RETRIES, DEFAULT_TIMEOUT
+from output_sink import OutputSink, FileChunks
+from timings import Timings, NO_TIMINGS
+from retry import RetryPolicy, DEFAULT_RETRY_POLICY
+
+if TYPE_CHECKING:
+    import asyncio
+    from concurrent.futures import Future, ThreadPoolExecutor
+    from stat_cache import StatCache
+    from content_cache import ContentCache
 
 class FileClient:
     """
     Client for interacting with file backend (REST or gRPC).
     """
-    def __init__(self, backend: str, rest_base_url: str = None, grpc_server: str = None, output: str = None) -> None:
+    def __init__(self, backend: str, rest_base_url: str = None, grpc_server: str = None, output: str = None,
+                 chunk_size: int = None, pool_size: int = None, keep_alive: bool = True,
+                 asynchronous: bool = False, stat_cache: StatCache = None, refresh: bool = False,
+                 content_cache: ContentCache = None, segments: int = 1,
+                 segment_min_size: int = DEFAULT_SEGMENT_MIN_SIZE, resume: bool = False,
+                 agent_socket: str = None, timings: Timings = NO_TIMINGS, compression: str = None,
+                 hedge_percentile: float = DEFAULT_HEDGE_PERCENTILE,
+                 retry_policy: RetryPolicy = DEFAULT_RETRY_POLICY, stat_output: str = None) -> None:
         """
         Initialize the FileClient with the given backend.
         
-        :param backend: Type of backend (REST or gRPC).
+        :param backend: Type of backend (REST, gRPC, or auto for both with hedged calls).
         :param rest_base_url: Base URL for the REST server.
         :param grpc_server: Address of the gRPC server.
         :param output: Output file path or '-' for stdout.
+        :param chunk_size: Maximum size of a streamed chunk in bytes.
+        :param pool_size: Maximum number of pooled REST connections per host.
+        :param keep_alive: Keep REST connections open between requests.
+        :param asynchronous: Use asyncio backends, which drive batch operations from a single thread.
+        :param stat_cache: Cache of file metadata used by stat, or None to always ask the backend.
+        :param refresh: Ignore cached metadata and store freshly retrieved metadata in the cache.
+        :param content_cache: Cache of REST file contents revalidated on each read, or None.
+        :param segments: Number of concurrent range requests used to read a large file into an output file.
+        :param segment_min_size: Minimum file size in bytes for a segmented read.
+        :param resume: Continue an interrupted read into the output file instead of starting over.
+        :param agent_socket: Socket of a running agent which forwards requests over its warm connections, or None.
+        :param timings: Recorder of the phases of each operation.
+        :param compression: Transport compression requested from the backend ('gzip', 'zstd') or None.
+        :param hedge_percentile: With the auto backend, latency percentile of the faster backend after which
+                                 the call is repeated on the other one.
+        :param retry_policy: Timeouts, deadline and retries of backend calls.
+        :param stat_output: File path or '-' for stdout receiving the metadata of read files, or None.
         """
+        self.timings: Timings = timings
+        self.retry_policy: RetryPolicy = retry_policy
+        self.compression: str | None = compression
         self.output: str = output or DEFAULT_OUTPUT
+        self.chunk_size: int = chunk_size or DEFAULT_CHUNK_SIZE
+        self.asynchronous: bool = asynchronous
+        self.stat_cache: StatCache | None = stat_cache
+        self.refresh: bool = refresh
+        self.segments: int = segments
+        self.segment_min_size: int = segment_min_size
+        self.resume: bool = resume
+        self.stat_output: str | None = stat_output
+        backend_address = {BACKEND_REST: rest_base_url or DEFAULT_REST_URL, BACKEND_GRPC: grpc_server or DEFAULT_GRPC_SERVER}
+        backend_address[BACKEND_AUTO] = f"{backend_address[BACKEND_REST]}|{backend_address[BACKEND_GRPC]}"
+        self.backend_key: str = f"{backend}:{backend_address.get(backend)}"
 
         backend_clients = {
-            BACKEND_REST: lambda: RestClient(rest_base_url or DEFAULT_REST_URL),
-            BACKEND_GRPC: lambda: GrpcClient(grpc_server or DEFAULT_GRPC_SERVER)
+            BACKEND_REST: lambda: self._create_rest_client(rest_base_url or DEFAULT_REST_URL,
+                                                           pool_size or DEFAULT_POOL_MAXSIZE, keep_alive, content_cache),
+            BACKEND_GRPC: lambda: self._create_grpc_client(grpc_server or DEFAULT_GRPC_SERVER)
         }
+        backend_clients[BACKEND_AUTO] = lambda: self._create_hedged_client(
+            {name: backend_clients[name]() for name in (BACKEND_REST, BACKEND_GRPC)},
+            pool_size or DEFAULT_POOL_MAXSIZE, hedge_percentile)
+
+        if asynchronous:
+            if backend == BACKEND_AUTO:
+                raise ValueError("The auto backend does not support asynchronous mode.")
+            backend_clients = {
+                BACKEND_REST: lambda: self._create_async_rest_client(rest_base_url or DEFAULT_REST_URL,
+                                                                     pool_size or DEFAULT_POOL_MAXSIZE, keep_alive),
+                BACKEND_GRPC: lambda: self._create_async_grpc_client(grpc_server or DEFAULT_GRPC_SERVER)
+            }
+
+        if agent_socket is not None and not asynchronous and backend in (BACKEND_REST, BACKEND_GRPC):
+            backend_clients = {backend: lambda: self._create_agent_client(agent_socket, backend, backend_address[backend])}
 
         try:
             self.client = backend_clients[backend]()
         except KeyError:
             raise ValueError(f"Unknown backend: {backend}")
 
+    def _create_rest_client(self, base_url: str, pool_size: int, keep_alive: bool, content_cache: ContentCache | None):
+        """
+        Create the REST client, importing requests only when needed.
+        """
+        with self.timings.span('import', module='rest_client'):
+            from rest_client import RestClient
+        return RestClient(base_url, chunk_size=self.chunk_size, pool_maxsize=pool_size, keep_alive=keep_alive,
+                          content_cache=content_cache, timings=self.timings, compression=self.compression,
+                          retry_policy=self.retry_policy)
+
+    def _create_grpc_client(self, server_address: str):
+        """
+        Create the gRPC client, importing grpc and the generated stubs only when needed.
+        """
+        with self.timings.span('import', module='grpc_client'):
+            from grpc_client import GrpcClient
+        return GrpcClient(server_address, chunk_size=self.chunk_size, timings=self.timings,
+                          compression=self.compression, retry_policy=self.retry_policy)
+
+    def _create_async_rest_client(self, base_url: str, pool_size: int, keep_alive: bool):
+        """
+        Create the asyncio REST client, importing aiohttp only when needed.
+        """
+        with self.timings.span('import', module='aio_rest_client'):
+            from aio_rest_client import AsyncRestClient
+        return AsyncRestClient(base_url, chunk_size=self.chunk_size, pool_maxsize=pool_size, keep_alive=keep_alive,
+                               compression=self.compression, retry_policy=self.retry_policy)
+
+    def _create_async_grpc_client(self, server_address: str):
+        """
+        Create the asyncio gRPC client.
+        """
+        with self.timings.span('import', module='aio_grpc_client'):
+            from aio_grpc_client import AsyncGrpcClient
+        return AsyncGrpcClient(server_address, chunk_size=self.chunk_size, compression=self.compression,
+                               retry_policy=self.retry_policy)
+
+    @staticmethod
+    def _create_hedged_client(clients: dict[str, object], pool_size: int, hedge_percentile: float):
+        """
+        Create the client dispatching calls to the faster backend and hedging slow ones.
+        """
+        from hedged_client import HedgedClient
+        return HedgedClient(clients, hedge_percentile=hedge_percentile, max_workers=2 * pool_size)
+
+    @staticmethod
+    def _create_agent_client(socket_path: str, backend: str, address: str):
+        """
+        Create the client forwarding requests to the local agent.
+        """
+        from file_agent import AgentClient
+        return AgentClient(socket_path, backend, address)
+
     def stat(self, uuid: str) -> None:
         """
         Retrieve and output metadata of the file identified by UUID.
         
         :param uuid: UUID of the file.
         """
-        stat_data: dict = self.client.get_file_stat(uuid)
-        stat_output: str = self._format_stat(stat_data)
-        self._write_output(stat_output.encode('utf-8'), f"{uuid}_stat.txt")
+        with self.timings.span('stat', uuid=uuid):
+            stat_data: dict = self.get_stat(uuid)
+            stat_output: str = self._format_stat(stat_data)
+            self._write_output(stat_output.encode('utf-8'), f"{uuid}_stat.txt")
+
+    def get_stat(self, uuid: str) -> dict:
+        """
+        Return metadata of the file identified by UUID, from the cache if possible.
+
+        :param uuid: UUID of the file.
+        :return: Metadata dictionary of the file.
+        """
+        return self._cached_stat(uuid) or self._store_stat(uuid, self.client.get_file_stat(uuid))
 
 
     def read(self, uuid: str) -> None:
         """
         Read and output the content of the file identified by UUID.
         
+        :param uuid: UUID of the file.
+        """
+        with self.timings.span('read', uuid=uuid):
+            self._read(uuid)
+
+    def _read(self, uuid: str) -> None:
+        """
+        Read the file with a resumed, segmented or single streamed request.
+
         :param uuid: UUID of the file.
         """
         file_name: str
-        file_content: bytes
-        file_name, file_content = self.client.read_file(uuid)
+        file_content: Iterable[bytes]
+        stat_data: dict | None = None
+
+        resume_offset: int = self._resume_offset()
+        if resume_offset:
+            if self.stat_output is not None:
+                self._write_stat_output(self.get_stat(uuid))
+            validator = _get_validator(self.output)
+            if validator is not None and getattr(self.client, 'validates_ranges', False):
+                file_name, file_content = self.client.read_file_stream(uuid, offset=resume_offset, if_range=validator)
+            else:
+                file_name, file_content = self.client.read_file_stream(uuid, offset=resume_offset)
+            # The server sends the whole file again if it changed since the first part was read
+            self._write_output(file_content, file_name, append=getattr(file_content, 'offset', resume_offset) != 0)
+            return
+
+        if self.segments > 1 and self.output != '-' and hasattr(self.client, 'read_file_range'):
+            stat_data = self.client.get_file_stat(uuid)
+            if stat_data['size'] >= self.segment_min_size:
+                if self.stat_output is not None:
+                    self._write_stat_output(stat_data)
+                self._read_segmented(uuid, stat_data['size'])
+                return
+
+        if self.stat_output is None:
+            file_name, file_content = self.client.read_file_stream(uuid)
+        elif stat_data is not None:
+            self._write_stat_output(stat_data)
+            file_name, file_content = self.client.read_file_stream(uuid)
+        else:
+            stat_data, file_name, file_content = self._stat_read(uuid)
+            self._write_stat_output(stat_data)
         self._write_output(file_content, file_name)
 
+    def _stat_read(self, uuid: str) -> tuple[dict, str, Iterable[bytes]]:
+        """
+        Return metadata and content of a file, in a single backend call where the backend supports it.
+
+        The agent and the asyncio clients fall back to a stat and a read call.
+
+        :param uuid: UUID of the file.
+        :return: Metadata dictionary, file name and an iterator over the file content chunks.
+        """
+        if not hasattr(self.client, 'stat_read_file'):
+            stat_data: dict = self.get_stat(uuid)
+            file_name, file_content = self.client.read_file_stream(uuid)
+            return stat_data, file_name, file_content
+        stat_data, file_content = self.client.stat_read_file(uuid)
+        return self._store_stat(uuid, stat_data), stat_data['name'], file_content
+
+    def _resume_offset(self) -> int:
+        """
+        Return the number of bytes already read into the output file when resuming.
+
+        :return: Size of the existing output file, or 0 if there is nothing to resume.
+        """
+        if not self.resume or self.output == '-':
+            return 0
+        try:
+            return os.path.getsize(self.output)
+        except FileNotFoundError:
+            return 0
+
+    def _read_segmented(self, uuid: str, file_size: int) -> None:
+        """
+        Read a file with concurrent range requests writing each segment in place.
+
+        The segments are written into a temporary file next to the output,
+        which replaces the output only once every segment arrived. A failed
+        read thus never leaves a file of full size with holes, which a
+        resumed read would take for complete.
+
+        :param uuid: UUID of the file.
+        :param file_size: Size of the file in bytes.
+        :raises IOError: If a segment ends early or the file changed between the segments.
+        """
+        import secrets
+        from concurrent.futures import ThreadPoolExecutor
+        segment_size: int = -(-file_size // self.segments)
+        directory, name = os.path.split(os.path.abspath(self.output))
+        part_path: str = os.path.join(directory, f".{name}.{secrets.token_hex(4)}.part")
+        validators: set[str | None] = set()
+
+        try:
+            with OutputSink(part_path) as sink:
+                sink.preallocate(file_size)
+                fd: int = sink.fileno()
+                os.ftruncate(fd, file_size)
+
+                def fetch_segment(start: int) -> None:
+                    stop: int = min(start + segment_size, file_size)
+                    offset: int = start
+                    chunks = self.client.read_file_range(uuid, start, stop)
+                    validators.add(getattr(chunks, 'validator', None))
+                    for chunk in self.timings.track(chunks, start=start):
+                        view = memoryview(chunk)
+                        while view:
+                            written = os.pwrite(fd, view, offset)
+                            offset += written
+                            view = view[written:]
+                    if offset != stop:
+                        raise IOError(f"Segment {start}-{stop - 1} of UUID {uuid} ended at byte {offset}.")
+
+                with ThreadPoolExecutor(max_workers=self.segments) as executor:
+                    futures = [executor.submit(fetch_segment, start) for start in range(0, file_size, segment_size)]
+                    for future in futures:
+                        future.result()
+            if len(validators) > 1:
+                raise IOError(f"File with UUID {uuid} changed while its segments were read.")
+            # Recorded on the new file, so a validator of an earlier download does not stay behind
+            validator = validators.pop() if validators else None
+            if validator is not None:
+                _set_validator(part_path, validator)
+            os.replace(part_path, self.output)
+        except BaseException:
+            try:
+                os.remove(part_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+    def stat_many(self, uuids: Iterable[str], jobs: int = DEFAULT_JOBS, ordered: bool = True) -> list[str]:
+        """
+        Retrieve and output metadata of many files concurrently.
+
+        :param uuids: UUIDs of the files.
+        :param jobs: Number of concurrent workers.
+        :param ordered: Write results in input order instead of as they complete.
+        :return: UUIDs which could not be retrieved.
+        """
+        def format_stat(uuid: str, stat_data: dict) -> bytes:
+            stat_output: str = f"UUID: {uuid}\n" + self._format_stat(stat_data)
+            return stat_output.encode('utf-8')
+
+        def fetch_stat(uuid: str) -> bytes:
+            with self.timings.span('stat', uuid=uuid):
+                return format_stat(uuid, self.get_stat(uuid))
+
+        async def fetch_stat_async(uuid: str) -> bytes:
+            stat_data: dict = self._cached_stat(uuid) or self._store_stat(uuid, await self.client.get_file_stat(uuid))
+            return format_stat(uuid, stat_data)
+
+        if self.asynchronous:
+            import asyncio
+            return asyncio.run(self._run_batch_async(uuids, fetch_stat_async, jobs, ordered))
+        return self._run_batch(uuids, fetch_stat, jobs, ordered)
+
+    def _cached_stat(self, uuid: str) -> dict | None:
+        """
+        Return cached metadata of a file unless caching is disabled or refreshed.
+
+        :param uuid: UUID of the file.
+        :return: Metadata dictionary or None.
+        """
+        if self.stat_cache is None or self.refresh:
+            return None
+        return self.stat_cache.get(self.backend_key, uuid)
+
+    def _store_stat(self, uuid: str, stat_data: dict) -> dict:
+        """
+        Store metadata of a file in the cache if caching is enabled.
+
+        :param uuid: UUID of the file.
+        :param stat_data: Metadata dictionary of the file.
+        :return: The stored metadata dictionary.
+        """
+        if self.stat_cache is not None:
+            self.stat_cache.put(self.backend_key, uuid, stat_data)
+        return stat_data
+
+    def read_many(self, uuids: Iterable[str], jobs: int = DEFAULT_JOBS, ordered: bool = True) -> list[str]:
+        """
+        Read and output the content of many files concurrently.
+
+        Each file is buffered by its worker and written to the output as a whole,
+        so contents of different files are never interleaved.
+
+        :param uuids: UUIDs of the files.
+        :param jobs: Number of concurrent workers.
+        :param ordered: Write results in input order instead of as they complete.
+        :return: UUIDs which could not be read.
+        """
+        import threading
+        stat_sink: OutputSink | None = OutputSink(self.stat_output) if self.stat_output is not None else None
+        stat_lock = threading.Lock()
+
+        def write_stat(uuid: str, stat_data: dict) -> None:
+            stat_output: str = f"UUID: {uuid}\n" + self._format_stat(stat_data)
+            with stat_lock:
+                stat_sink.write(stat_output.encode('utf-8'))
+
+        def fetch_content(uuid: str) -> bytes:
+            with self.timings.span('read', uuid=uuid):
+                if stat_sink is None:
+                    file_name, file_content = self.client.read_file_stream(uuid)
+                    return b''.join(self.timings.track(file_content, consume='buffer', uuid=uuid))
+                stat_data, file_name, file_content = self._stat_read(uuid)
+                content: bytes = b''.join(self.timings.track(file_content, consume='buffer', uuid=uuid))
+                write_stat(uuid, stat_data)
+                return content
+
+        async def fetch_content_async(uuid: str) -> bytes:
+            if stat_sink is None:
+                file_name, file_content = await self.client.read_file(uuid)
+                return file_content
+            stat_data: dict = self._cached_stat(uuid) or self._store_stat(uuid, await self.client.get_file_stat(uuid))
+            file_name, file_content = await self.client.read_file(uuid)
+            write_stat(uuid, stat_data)
+            return file_content
+
+        try:
+            if self.asynchronous:
+                import asyncio
+                return asyncio.run(self._run_batch_async(uuids, fetch_content_async, jobs, ordered))
+            return self._run_batch(uuids, fetch_content, jobs, ordered)
+        finally:
+            if stat_sink is not None:
+                stat_sink.close()
+
+    def _run_batch(self, uuids: Iterable[str], fetch: Callable[[str], bytes], jobs: int, ordered: bool) -> list[str]:
+        """
+        Fetch results for many UUIDs on a thread pool and write them to the output.
+
+        Failures are reported on stderr and do not stop the batch.
+
+        :param uuids: UUIDs of the files.
+        :param fetch: Function returning the output for a single UUID.
+        :param jobs: Number of concurrent workers.
+        :param ordered: Write results in input order instead of as they complete.
+        :return: UUIDs for which fetch failed.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        failed: list[str] = []
+        with ThreadPoolExecutor(max_workers=jobs) as executor, OutputSink(self.output) as sink:
+            for uuid, future in self._iter_completed(executor, uuids, fetch, jobs, ordered):
+                self._write_result(sink.write, uuid, future, failed)
+        return failed
+
+    async def _run_batch_async(self, uuids: Iterable[str], fetch: Callable[[str], Awaitable[bytes]], jobs: int,
+                               ordered: bool) -> list[str]:
+        """
+        Fetch results for many UUIDs as asyncio tasks and write them to the output.
+
+        At most jobs requests are in flight at a time. Failures are reported on
+        stderr and do not stop the batch.
+
+        :param uuids: UUIDs of the files.
+        :param fetch: Coroutine function returning the output for a single UUID.
+        :param jobs: Maximum number of requests in flight.
+        :param ordered: Write results in input order instead of as they complete.
+        :return: UUIDs for which fetch failed.
+        """
+        import asyncio
+        failed: list[str] = []
+        pending: deque[tuple[str, asyncio.Task]] = deque()
+
+        async def pop_completed() -> list[tuple[str, asyncio.Task]]:
+            if ordered:
+                uuid, task = pending.popleft()
+                await asyncio.wait([task])
+                return [(uuid, task)]
+            done, _ = await asyncio.wait([task for _, task in pending], return_when=asyncio.FIRST_COMPLETED)
+            completed = [item for item in pending if item[1] in done]
+            for item in completed:
+                pending.remove(item)
+            return completed
+
+        try:
+            with OutputSink(self.output) as sink:
+                for uuid in uuids:
+                    pending.append((uuid, asyncio.create_task(fetch(uuid))))
+                    while len(pending) >= jobs:
+                        for done_uuid, task in await pop_completed():
+                            self._write_result(sink.write, done_uuid, task, failed)
+                while pending:
+                    for done_uuid, task in await pop_completed():
+                        self._write_result(sink.write, done_uuid, task, failed)
+        finally:
+            await self.client.close()
+        return failed
+
+    @staticmethod
+    def _write_result(write: Callable[[bytes], None], uuid: str, result: Future | asyncio.Task,
+                      failed: list[str]) -> None:
+        """
+        Write the result of a finished fetch or report its failure on stderr.
+
+        :param write: Function writing a chunk of bytes to the output.
+        :param uuid: UUID of the file.
+        :param result: Finished future or task of the fetch.
+        :param failed: List collecting UUIDs of failed fetches.
+        """
+        try:
+            write(result.result())
+        except Exception as e:
+            sys.stderr.write(f"{uuid}: {e}\n")
+            failed.append(uuid)
+
+    @staticmethod
+    def _iter_completed(executor: ThreadPoolExecutor, uuids: Iterable[str], fetch: Callable[[str], bytes],
+                        jobs: int, ordered: bool) -> Iterator[tuple[str, Future]]:
+        """
+        Submit fetches while keeping at most twice the number of workers in flight.
+
+        The bounded window keeps memory flat for arbitrarily long UUID lists.
+
+        :param executor: Executor running the fetches.
+        :param uuids: UUIDs of the files.
+        :param fetch: Function returning the output for a single UUID.
+        :param jobs: Number of concurrent workers.
+        :param ordered: Yield in input order instead of completion order.
+        :return: Iterator of UUIDs with their finished futures.
+        """
+        window: int = 2 * jobs
+        pending: deque[tuple[str, Future]] = deque()
+        for uuid in uuids:
+            pending.append((uuid, executor.submit(fetch, uuid)))
+            while len(pending) >= window:
+                yield from FileClient._pop_completed(pending, ordered)
+        while pending:
+            yield from FileClient._pop_completed(pending, ordered)
+
+    @staticmethod
+    def _pop_completed(pending: deque, ordered: bool) -> Iterator[tuple[str, Future]]:
+        """
+        Remove finished futures from the pending queue.
+
+        :param pending: Queue of UUIDs with their futures.
+        :param ordered: Wait for the oldest future instead of any future.
+        :return: Iterator of UUIDs with their finished futures.
+        """
+        from concurrent.futures import wait, FIRST_COMPLETED
+        if ordered:
+            uuid, future = pending.popleft()
+            wait([future])
+            yield uuid, future
+            return
+        done, _ = wait([future for _, future in pending], return_when=FIRST_COMPLETED)
+        for item in [item for item in pending if item[1] in done]:
+            pending.remove(item)
+            yield item
+
     def _format_stat(self, stat_data: dict) -> str:
         """
         Format file metadata into a string.
@@ -65,18 +547,37 @@ class FileClient:
                 f"Created: {stat_data['create_datetime']}\n"
                 f"MIME Type: {stat_data['mimetype']}\n")
 
-    def _write_output(self, content: bytes, file_name: str) -> None:
+    def _write_stat_output(self, stat_data: dict) -> None:
+        """
+        Write the metadata of a read file to the stat output.
+
+        :param stat_data: Metadata dictionary of the file.
+        """
+        with OutputSink(self.stat_output) as sink:
+            sink.write(self._format_stat(stat_data).encode('utf-8'))
+
+    def _write_output(self, content: bytes | Iterable[bytes], file_name: str, append: bool = False) -> None:
         """
         Write file content to the output destination.
+
+        Content may be given either as bytes or as an iterable of byte chunks,
+        which are written unchanged, one by one as they arrive.
         
         :param content: Content of the file.
         :param file_name: Name of the file.
+        :param append: Append to the output file instead of overwriting it.
         """
-        if self.output == '-':
-            sys.stdout.write(content.decode('utf-8', errors='replace'))
-        else:
-            with open(self.output, 'wb') as f:
-                f.write(content)
+        chunks: Iterable[bytes] = [content] if isinstance(content, bytes) else content
+        with OutputSink(self.output, append) as sink:
+            if self.output != '-' and not append:
+                # Recorded before any content is written, so a resumed read can check the file did not change
+                _set_validator(self.output, getattr(content, 'validator', None))
+            if isinstance(chunks, FileChunks):
+                # Keep the local file visible to write_all, which copies it with sendfile
+                with self.timings.span('write', sendfile=True):
+                    sink.write_all(chunks)
+            else:
+                sink.write_all(self.timings.track(chunks))
 
 def main() -> None:
     """
@@ -84,19 +585,74 @@ def main() -> None:
     """
     parser = argparse.ArgumentParser(
         description='CLI client to interact with REST or gRPC server.\n'
-                    'Usage: file-client [options] stat UUID\n'
-                    '       file-client [options] read UUID\n'
+                    'Usage: file-client [options] stat UUID [UUID ...]\n'
+                    '       file-client [options] read UUID [UUID ...]\n'
+                    '       file-client [options] --from-file FILE stat|read\n'
+                    '       file-client [options] agent\n'
                     '       file-client --help',
         formatter_class=argparse.RawTextHelpFormatter
     )
-    parser.add_argument('command', choices=['stat', 'read'],
+    parser.add_argument('command', choices=['stat', 'read', 'agent'],
                         help='Command to execute:\n'
                              'stat - Prints the file metadata in a human-readable manner.\n'
-                             'read - Outputs the file content.')
-    parser.add_argument('uuid', help='UUID of the file')
-    parser.add_argument('--backend', choices=[BACKEND_GRPC, BACKEND_REST],
+                             'read - Outputs the file content.\n'
+                             'agent - Runs the local agent keeping backend connections warm.')
+    parser.add_argument('uuid', nargs='*', help='UUID of the file (several UUIDs enable batch mode)')
+    parser.add_argument('--from-file',
+                        help='Read UUIDs from a file, one per line ("-" for stdin)')
+    parser.add_argument('--jobs', type=int,
+                        default=DEFAULT_JOBS,
+                        help=f'Number of concurrent requests in batch mode (default: {DEFAULT_JOBS})')
+    parser.add_argument('--unordered', dest='ordered', action='store_false',
+                        help='Write batch results as they complete instead of in input order')
+    parser.add_argument('--no-cache', dest='cache', action='store_false',
+                        help='Do not use the local metadata cache for stat')
+    parser.add_argument('--refresh', action='store_true',
+                        help='Ignore cached metadata and refresh the cache from the backend')
+    parser.add_argument('--cache-ttl', type=float,
+                        default=DEFAULT_CACHE_TTL,
+                        help=f'Time to live of cached metadata in seconds (default: {DEFAULT_CACHE_TTL})')
+    parser.add_argument('--cache-size', type=int,
+                        default=DEFAULT_CACHE_MAX_ENTRIES,
+                        help=f'Maximum number of cached metadata entries (default: {DEFAULT_CACHE_MAX_ENTRIES})')
+    parser.add_argument('--content-cache', metavar='DIR',
+                        default=DEFAULT_CONTENT_CACHE_DIR,
+                        help='Directory caching REST file contents, revalidated with conditional requests')
+    parser.add_argument('--segments', type=int,
+                        default=1,
+                        help='Read large files into --output with this many concurrent range requests (default: 1)')
+    parser.add_argument('--resume', action='store_true',
+                        help='Continue an interrupted read into --output, fetching only the missing bytes')
+    parser.add_argument('--async', dest='asynchronous', action='store_true',
+                        help='Run the batch on an asyncio event loop; --jobs limits requests in flight')
+    parser.add_argument('--agent-socket',
+                        default=DEFAULT_AGENT_SOCKET,
+                        help=f'Unix socket of the local agent (default: {DEFAULT_AGENT_SOCKET})')
+    parser.add_argument('--no-agent', dest='agent', action='store_false',
+                        help='Connect to the backend directly even if the local agent is running')
+    parser.add_argument('--compression', choices=COMPRESSION_CHOICES,
+                        help='Ask the server to compress text and JSON responses (zstd needs zstandard, REST only)')
+    parser.add_argument('--timeout', type=float,
+                        default=DEFAULT_TIMEOUT,
+                        help='Seconds allowed for a single attempt of a backend call; for REST it bounds connecting\n'
+                             f'and every wait for data, for gRPC reads every reply (default: {DEFAULT_TIMEOUT})')
+    parser.add_argument('--deadline', type=float,
+                        help='Seconds allowed for a whole operation including retries; it also bounds gRPC reads')
+    parser.add_argument('--retries', type=int,
+                        default=DEFAULT_RETRIES,
+                        help='Retries of calls failing with a connection error, timeout, HTTP 429/502/503/504\n'
+                             f'or gRPC UNAVAILABLE, with jittered exponential backoff (default: {DEFAULT_RETRIES})')
+    parser.add_argument('--timings', action='store_true',
+                        help='Print the time spent in each phase (import, connect, send, ttfb, transfer, write) on stderr')
+    parser.add_argument('--trace-file', metavar='FILE',
+                        help='Write the recorded phases as a Chrome trace JSON file')
+    parser.add_argument('--backend', choices=[BACKEND_GRPC, BACKEND_REST, BACKEND_AUTO],
                         default=DEFAULT_SERVER_TYPE,
-                        help=f'Backend to use (default: {DEFAULT_SERVER_TYPE})')
+                        help=f'Backend to use, auto sends each call to the faster one (default: {DEFAULT_SERVER_TYPE})')
+    parser.add_argument('--hedge-percentile', type=float,
+                        default=DEFAULT_HEDGE_PERCENTILE,
+                        help='With --backend auto, repeat a call on the other backend once it takes longer than\n'
+                             f'this percentile of recent latencies (default: {DEFAULT_HEDGE_PERCENTILE})')
     parser.add_argument('--base-url',
                         default=DEFAULT_REST_URL, 
                         help=f'Base URL for REST server (default: {DEFAULT_REST_URL})')
@@ -106,20 +662,221 @@ def main() -> None:
     parser.add_argument('--output',
                         default=DEFAULT_OUTPUT,
                         help=f'Set the output file (default: {DEFAULT_OUTPUT})')
+    parser.add_argument('--stat-output', metavar='FILE',
+                        help='With read, also write the file metadata to FILE ("-" for stdout), fetched in the\n'
+                             'same request as the content')
+    parser.add_argument('--chunk-size', type=int,
+                        default=DEFAULT_CHUNK_SIZE,
+                        help=f'Maximum size of a streamed chunk in bytes (default: {DEFAULT_CHUNK_SIZE})')
+    parser.add_argument('--pool-size', type=int,
+                        default=DEFAULT_POOL_MAXSIZE,
+                        help=f'Maximum number of REST connections per host (default: {DEFAULT_POOL_MAXSIZE})')
+    parser.add_argument('--no-keep-alive', dest='keep_alive', action='store_false',
+                        help='Close REST connections after each request')
 
     args = parser.parse_args()
+    if args.command == "agent":
+        _run_agent(args)
+        return
+    if not args.uuid and args.from_file is None:
+        parser.error('at least one UUID or --from-file is required')
+    if args.stat_output is not None and args.command != "read":
+        parser.error('--stat-output can only be used with read')
+    if args.stat_output == '-' and args.output == '-':
+        parser.error('--stat-output and --output cannot both be stdout')
+    if args.backend == BACKEND_AUTO and args.asynchronous:
+        parser.error('--backend auto does not support --async')
+    if args.compression == 'zstd':
+        from compression import zstd_available
+        if args.backend in (BACKEND_GRPC, BACKEND_AUTO):
+            parser.error('the gRPC backend supports only --compression gzip')
+        if not zstd_available():
+            parser.error('--compression zstd requires the zstandard package')
+
+    timings: Timings = NO_TIMINGS
+    if args.timings or args.trace_file is not None:
+        timings = Timings(origin=START_TIME)
+
+    agent_socket: str | None = None
+    if args.agent and args.cache and not args.refresh and not args.asynchronous and \
+            not _agent_overridden_options(parser, args):
+        from file_agent import agent_is_running
+        if agent_is_running(args.agent_socket):
+            agent_socket = args.agent_socket
+
+    stat_cache: StatCache | None = None
+    if args.cache and args.command == "stat" and agent_socket is None:
+        from stat_cache import StatCache
+        stat_cache = StatCache(DEFAULT_CACHE_PATH, ttl=args.cache_ttl, max_entries=args.cache_size)
+
+    content_cache: ContentCache | None = None
+    if args.content_cache and args.command == "read" and agent_socket is None:
+        from content_cache import ContentCache
+        content_cache = ContentCache(args.content_cache)
 
     client: FileClient = FileClient(
         backend=args.backend,
         rest_base_url=args.base_url,
         grpc_server=args.grpc_server,
-        output=args.output
+        output=args.output,
+        chunk_size=args.chunk_size,
+        pool_size=max(args.pool_size, args.jobs, args.segments),
+        keep_alive=args.keep_alive,
+        asynchronous=args.asynchronous,
+        stat_cache=stat_cache,
+        refresh=args.refresh,
+        content_cache=content_cache,
+        segments=args.segments,
+        resume=args.resume,
+        agent_socket=agent_socket,
+        timings=timings,
+        compression=args.compression,
+        hedge_percentile=args.hedge_percentile,
+        retry_policy=RetryPolicy(retries=args.retries, timeout=args.timeout, deadline=args.deadline),
+        stat_output=args.stat_output
     )
+    timings.record('startup', START_TIME, time.perf_counter() - START_TIME)
+
+    try:
+        failed: list[str] = _run_command(client, args)
+    finally:
+        if stat_cache is not None:
+            stat_cache.close()
+        if args.timings:
+            sys.stderr.write(timings.summary())
+        if args.trace_file is not None:
+            timings.write_trace(args.trace_file)
+    if failed:
+        sys.exit(1)
+
+# Options the agent applies from its own command line; a client setting any of them connects directly
+AGENT_OPTIONS: tuple[str, ...] = ('chunk_size', 'pool_size', 'keep_alive', 'compression', 'timeout', 'deadline',
+                                  'retries', 'content_cache', 'cache_ttl', 'cache_size', 'segments')
+
+def _agent_overridden_options(parser: argparse.ArgumentParser, args: argparse.Namespace) -> list[str]:
+    """
+    Return the options of this invocation which the agent would ignore.
+
+    :param parser: Parser of the command line.
+    :param args: Parsed command line arguments.
+    :return: Destinations of the options set to other values than their defaults.
+    """
+    return [option for option in AGENT_OPTIONS if getattr(args, option) != parser.get_default(option)]
+
+def _run_agent(args: argparse.Namespace) -> None:
+    """
+    Run the local agent with one warm client per backend and a shared metadata cache.
+
+    :param args: Parsed command line arguments.
+    """
+    from file_agent import serve_agent
+
+    stat_cache: StatCache | None = None
+    if args.cache:
+        from stat_cache import StatCache
+        stat_cache = StatCache(DEFAULT_CACHE_PATH, ttl=args.cache_ttl, max_entries=args.cache_size)
+
+    content_cache: ContentCache | None = None
+    if args.content_cache:
+        from content_cache import ContentCache
+        content_cache = ContentCache(args.content_cache)
 
-    if args.command == "stat":
-        client.stat(args.uuid)
-    elif args.command == "read":
-        client.read(args.uuid)
+    def create_client(backend: str, address: str) -> FileClient:
+        return FileClient(
+            backend=backend,
+            rest_base_url=address if backend == BACKEND_REST else None,
+            grpc_server=address if backend == BACKEND_GRPC else None,
+            chunk_size=args.chunk_size,
+            pool_size=max(args.pool_size, args.jobs),
+            keep_alive=args.keep_alive,
+            stat_cache=stat_cache,
+            refresh=args.refresh,
+            content_cache=content_cache,
+            compression=args.compression,
+            retry_policy=RetryPolicy(retries=args.retries, timeout=args.timeout, deadline=args.deadline)
+        )
+
+    try:
+        serve_agent(args.agent_socket, create_client)
+    finally:
+        if stat_cache is not None:
+            stat_cache.close()
+
+def _run_command(client: FileClient, args: argparse.Namespace) -> list[str]:
+    """
+    Execute the stat or read command for a single UUID or a batch of UUIDs.
+
+    :param client: Configured file client.
+    :param args: Parsed command line arguments.
+    :return: UUIDs which failed in batch mode.
+    """
+    if len(args.uuid) == 1 and args.from_file is None and not args.asynchronous:
+        if args.command == "stat":
+            client.stat(args.uuid[0])
+        elif args.command == "read":
+            client.read(args.uuid[0])
+        return []
+
+    uuids: Iterable[str] = args.uuid
+    if args.from_file is not None:
+        uuids = _read_uuids(args.from_file)
+    batch = client.stat_many if args.command == "stat" else client.read_many
+    return batch(uuids, jobs=args.jobs, ordered=args.ordered)
+
+# Extended attribute of an output file holding the validator of the file version written into it
+VALIDATOR_XATTR: str = 'user.file_client.validator'
+
+def _get_validator(path: str) -> str | None:
+    """
+    Return the validator of the file version written into an output file.
+
+    :param path: Path to the output file.
+    :return: ETag or Last-Modified value, or None if not recorded or extended attributes are not supported.
+    """
+    try:
+        return os.getxattr(path, VALIDATOR_XATTR).decode('latin-1')
+    except (OSError, AttributeError):
+        return None
+
+def _set_validator(path: str, validator: str | None) -> None:
+    """
+    Record the validator of the file version written into an output file, or remove a previous one.
+
+    :param path: Path to the output file.
+    :param validator: ETag or Last-Modified value, or None if the backend sends none.
+    """
+    try:
+        if validator is not None:
+            os.setxattr(path, VALIDATOR_XATTR, validator.encode('latin-1'))
+        else:
+            os.removexattr(path, VALIDATOR_XATTR)
+    except (OSError, AttributeError):
+        pass
+
+def _read_uuids(path: str) -> Iterator[str]:
+    """
+    Lazily read UUIDs from a file, one per line, skipping blank lines.
+
+    :param path: Path to the file or '-' for stdin.
+    :return: Iterator of UUIDs.
+    """
+    if path == '-':
+        # stdin belongs to the process, it is left open
+        yield from _iter_uuids(sys.stdin)
+        return
+    with open(path) as f:
+        yield from _iter_uuids(f)
+
+def _iter_uuids(lines: Iterable[str]) -> Iterator[str]:
+    """
+    Yield the UUIDs of lines, skipping blank lines.
+
+    :param lines: Lines with one UUID each.
+    """
+    for line in lines:
+        uuid = line.strip()
+        if uuid:
+            yield uuid
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,237 @@
+"""
+Request log of the REST server, written off the request path.
+
+Request threads only count events and, for the few which pass sampling and
+the rate limit, put a record on a bounded queue; a QueueListener thread
+formats the records as JSON lines and writes them. Every event is counted,
+and a summary of the counts is written periodically, so a flood of misses
+turns into one line per interval instead of one line per request.
+"""
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import random
+import logging
+import threading
+from collections import Counter
+from logging.handlers import QueueHandler, QueueListener
+
+# Events of the REST server
+EVENT_STAT_MISS: str = 'stat_miss'  # stat of an unknown UUID
+EVENT_READ_MISS: str = 'read_miss'  # read of an unknown UUID
+EVENT_DISK_MISS: str = 'disk_miss'  # read of a known file missing on disk
+
+# Fraction of the events of each type logged one by one; events not listed are all logged
+DEFAULT_SAMPLE_RATES: dict[str, float] = {
+    EVENT_STAT_MISS: 0.01,
+    EVENT_READ_MISS: 0.01,
+}
+
+# Maximum number of records per second and event type, also the size of a burst
+DEFAULT_RATE_LIMIT: float = 10.0
+
+# Seconds between summaries of the event counts
+DEFAULT_SUMMARY_INTERVAL: float = 10.0
+
+# Records waiting for the writer thread; more are dropped and counted
+DEFAULT_QUEUE_SIZE: int = 10_000
+
+# Longest field value written, UUIDs sent by clients can be anything
+MAX_FIELD_LENGTH: int = 200
+
+# Name of the summary records
+SUMMARY_EVENT: str = 'summary'
+
+class JsonFormatter(logging.Formatter):
+    """Formats records of the request log as single-line JSON objects."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'event': record.getMessage(),
+        }
+        data.update(getattr(record, 'fields', {}))
+        return json.dumps(data, separators=(',', ':'), default=str)
+
+class _StderrHandler(logging.StreamHandler):
+    """Handler writing to the current standard error, also if it was replaced after the handler was created."""
+
+    def __init__(self) -> None:
+        logging.Handler.__init__(self)
+
+    @property
+    def stream(self):
+        return sys.stderr
+
+class _QueueHandler(QueueHandler):
+    """
+    Queue handler which leaves formatting to the writer thread and counts
+    records dropped when the queue is full instead of blocking.
+    """
+
+    def __init__(self, log_queue: queue.Queue, request_log: 'RequestLog') -> None:
+        super().__init__(log_queue)
+        self.request_log = request_log
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Records stay in this process, so they need not be made picklable here
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.request_log._count_dropped()
+
+class _TokenBucket:
+    """Rate limit letting through a number of events per second with bursts of the same size."""
+    __slots__ = ('rate', 'tokens', 'updated')
+
+    def __init__(self, rate: float) -> None:
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+
+    def take(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+class RequestLog:
+    """
+    Sampled, rate-limited event log with periodic counters.
+
+    The writer and summary threads start with the first event of each
+    process, so a log created before the workers of the server are forked
+    works in every worker.
+    """
+
+    def __init__(self, name: str = 'flask_server.requests', handlers: list[logging.Handler] | None = None,
+                 sample_rates: dict[str, float] | None = None, rate_limit: float = DEFAULT_RATE_LIMIT,
+                 summary_interval: float = DEFAULT_SUMMARY_INTERVAL, queue_size: int = DEFAULT_QUEUE_SIZE) -> None:
+        """
+        Initialize the log.
+
+        :param name: Name of the logger the records go through.
+        :param handlers: Handlers writing the records, by default JSON lines on standard error.
+        :param sample_rates: Fraction of the events of each type logged one by one, the others are only counted.
+        :param rate_limit: Maximum number of records per second and event type, 0 for no limit.
+        :param summary_interval: Seconds between summaries of the event counts.
+        :param queue_size: Number of records waiting for the writer thread.
+        """
+        if handlers is None:
+            handler = _StderrHandler()
+            handler.setFormatter(JsonFormatter())
+            handlers = [handler]
+        self.logger = logging.getLogger(name)
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+        self.handlers = handlers
+        self.sample_rates = DEFAULT_SAMPLE_RATES if sample_rates is None else sample_rates
+        self.rate_limit = rate_limit
+        self.summary_interval = summary_interval
+        self.queue_size = queue_size
+        self._pid: int | None = None
+        self._start_lock = threading.Lock()
+
+    def event(self, event: str, level: int = logging.INFO, **fields) -> None:
+        """
+        Count an event and log it if it passes sampling and the rate limit.
+
+        :param event: Type of the event.
+        :param level: Level of its record.
+        :param fields: Values written with the record.
+        """
+        if self._pid != os.getpid():
+            self._start()
+        sample_rate = self.sample_rates.get(event, 1.0)
+        sampled = sample_rate >= 1.0 or random.random() < sample_rate
+        with self._lock:
+            self._counts[event] += 1
+            if not sampled:
+                return
+            if self.rate_limit > 0:
+                bucket = self._buckets.get(event)
+                if bucket is None:
+                    bucket = self._buckets[event] = _TokenBucket(self.rate_limit)
+                if not bucket.take():
+                    self._rate_limited[event] += 1
+                    return
+        fields = {key: value[:MAX_FIELD_LENGTH] if isinstance(value, str) else value
+                  for key, value in fields.items()}
+        self.logger.log(level, event, extra={'fields': fields})
+
+    def flush(self) -> None:
+        """
+        Log the summary of the events counted since the previous one, if there were any.
+        """
+        if self._pid != os.getpid():
+            return
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+            rate_limited, self._rate_limited = self._rate_limited, Counter()
+            dropped, self._dropped = self._dropped, 0
+        if not counts and not dropped:
+            return
+        fields = {'counts': dict(counts)}
+        if rate_limited:
+            fields['rate_limited'] = dict(rate_limited)
+        if dropped:
+            fields['dropped'] = dropped
+        self.logger.info(SUMMARY_EVENT, extra={'fields': fields})
+
+    def stop(self) -> None:
+        """
+        Log the last summary, write the queued records and stop the threads.
+        """
+        with self._start_lock:
+            if self._pid != os.getpid():
+                return
+            self._stopped.set()
+            self._summary_thread.join()
+            self.flush()
+            self._listener.stop()
+            self.logger.removeHandler(self._queue_handler)
+            self._pid = None
+
+    def _start(self) -> None:
+        """
+        Start the writer and summary threads in this process, replacing any inherited from a parent.
+        """
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._lock = threading.Lock()
+            self._counts: Counter[str] = Counter()
+            self._rate_limited: Counter[str] = Counter()
+            self._dropped = 0
+            self._buckets: dict[str, _TokenBucket] = {}
+            log_queue: queue.Queue = queue.Queue(self.queue_size)
+            for handler in list(self.logger.handlers):
+                if isinstance(handler, _QueueHandler):
+                    self.logger.removeHandler(handler)
+            self._queue_handler = _QueueHandler(log_queue, self)
+            self.logger.addHandler(self._queue_handler)
+            self._listener = QueueListener(log_queue, *self.handlers, respect_handler_level=True)
+            self._listener.start()
+            self._stopped = threading.Event()
+            self._summary_thread = threading.Thread(target=self._summarize, name='request-log-summary', daemon=True)
+            self._summary_thread.start()
+            self._pid = os.getpid()
+            atexit.register(self.stop)
+
+    def _summarize(self) -> None:
+        while not self._stopped.wait(self.summary_interval):
+            self.flush()
+
+    def _count_dropped(self) -> None:
+        with self._lock:
+            self._dropped += 1
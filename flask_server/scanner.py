@@ -0,0 +1,457 @@
+#!/usr/bin/env python3
+"""
+Parallel scanner building and incrementally refreshing the file index.
+
+Directories under the storage root are listed by a pool of worker threads.
+Every file found is compared with the scan state remembered from the
+previous scan (inode, mtime and size); only new and changed files are
+examined, which means sniffing their MIME type and resolving their UUID.
+Changes are bulk-loaded into a MetadataStore, and files which disappeared
+are removed from it at the end of the scan.
+
+A UUID is read from the user.file_uuid extended attribute if the file has
+one, otherwise a file keeps the UUID it got in an earlier scan and a new
+file gets a random one. A file moved or renamed, also with its directory,
+keeps its UUID: through the extended attribute where there is one,
+otherwise by matching the new file with a vanished one of the same inode,
+mtime and size at the end of the scan.
+
+Usage: python flask_server/scanner.py ROOT --db METADATA_DB [--workers N]
+"""
+import os
+import sys
+import time
+import sqlite3
+import argparse
+import mimetypes
+import threading
+import uuid as uuid_module
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from datetime import datetime, timezone
+from typing import NamedTuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from flask_server.store import FileMetadata, MetadataStore, SqliteMetadataStore, INSERT_BATCH_SIZE
+
+# Number of threads listing directories and examining files
+DEFAULT_SCAN_WORKERS: int = 8
+
+# Bytes read from the start of a file to recognize its type
+SNIFF_SIZE: int = 512
+
+# Extended attribute holding the UUID of a file
+UUID_XATTR: str = 'user.file_uuid'
+
+# Signatures of common binary formats whose files often lack an extension
+MAGIC_NUMBERS: tuple[tuple[bytes, str], ...] = (
+    (b'%PDF-', 'application/pdf'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+    (b'PK\x03\x04', 'application/zip'),
+    (b'\x1f\x8b', 'application/gzip'),
+)
+
+def sniff_mimetype(path: str) -> str:
+    """
+    Return the MIME type of a file from its extension, or else from its first bytes.
+
+    :param path: Path to the file.
+    """
+    mimetype, _ = mimetypes.guess_type(path, strict=False)
+    if mimetype is not None:
+        return mimetype
+    with open(path, 'rb') as f:
+        head = f.read(SNIFF_SIZE)
+    for magic, mimetype in MAGIC_NUMBERS:
+        if head.startswith(magic):
+            return mimetype
+    if b'\0' not in head:
+        try:
+            head.decode('utf-8')
+            return 'text/plain'
+        except UnicodeDecodeError as e:
+            # A multibyte character cut at the end of the sample is still text
+            if e.start >= len(head) - 3:
+                return 'text/plain'
+    return 'application/octet-stream'
+
+class ScanResult:
+    """
+    Counts of files by outcome of a scan.
+    """
+    def __init__(self) -> None:
+        self.added: int = 0
+        self.updated: int = 0
+        self.moved: int = 0
+        self.removed: int = 0
+        self.unchanged: int = 0
+        self.errors: list[str] = []
+
+    def __str__(self) -> str:
+        return (f"{self.added} added, {self.updated} updated, {self.moved} moved, {self.removed} removed, "
+                f"{self.unchanged} unchanged, {len(self.errors)} errors")
+
+class _DirectoryScan(NamedTuple):
+    """Outcome of scanning the entries of one directory."""
+    directory: str
+    subdirectories: list[str]
+    # Metadata, inode and mtime of new or changed files, their UUID in the previous scan (None if new)
+    # and whether their UUID was generated by this scan
+    changed: list[tuple[FileMetadata, int, int, str | None, bool]]
+    # Names, UUIDs, inodes, mtimes and sizes of files which are gone
+    removed: list[tuple[str, str, int, int, int]]
+    unchanged: int
+    errors: list[str]
+
+class Scanner:
+    """
+    Scanner of a storage root feeding a metadata store.
+
+    The scan state lives in the scan_state table of a SQLite database, which
+    may be the database of a SqliteMetadataStore.
+    """
+    def __init__(self, root: str, store: MetadataStore, state_path: str,
+                 workers: int = DEFAULT_SCAN_WORKERS) -> None:
+        """
+        Initialize the scanner.
+
+        :param root: Storage root to scan.
+        :param store: Store receiving the metadata of the files.
+        :param state_path: Path to the SQLite database keeping the scan state.
+        :param workers: Number of threads listing directories and examining files.
+        """
+        self.root = os.path.abspath(root)
+        self.store = store
+        self.state_path = state_path
+        self.workers = workers
+        self._local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._pending_metadata: list[FileMetadata] = []
+        self._pending_state: list[tuple[str, str, str, int, int, int]] = []
+        # UUIDs written by the current scan and those of its new files
+        self._added_uuids: set[str] = set()
+        self._new_uuids: set[str] = set()
+        # Directory, name and UUID of new files with a generated UUID, by inode, mtime and size
+        self._generated: dict[tuple[int, int, int], tuple[str, str, str]] = {}
+        # Files found gone as directory, name, UUID, inode, mtime and size, and UUIDs replaced by another one
+        self._removed: list[tuple[str, str, str, int, int, int]] = []
+        self._replaced_uuids: list[str] = []
+
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS scan_state ("
+            " directory TEXT NOT NULL,"
+            " name TEXT NOT NULL,"
+            " uuid TEXT NOT NULL,"
+            " inode INTEGER NOT NULL,"
+            " mtime_ns INTEGER NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " PRIMARY KEY (directory, name))"
+            " WITHOUT ROWID"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        Return the scan state connection of the current thread, opening it on first use.
+        """
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.state_path, timeout=30.0, check_same_thread=False,
+                                         isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            with self._connections_lock:
+                self._connections.append(connection)
+        return connection
+
+    def close(self) -> None:
+        """
+        Close the scan state connections of all threads.
+        """
+        with self._connections_lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+    def scan(self) -> ScanResult:
+        """
+        Scan the storage root and bring the store up to date.
+
+        Directories are listed in parallel, while all writes happen in the
+        calling thread in batches. Removals are applied last, so a file moved
+        within the scan keeps its UUID in the store whichever of its old and
+        new directories is listed first.
+
+        :return: Counts of added, updated, moved, removed and unchanged files.
+        """
+        result = ScanResult()
+        visited: set[str] = set()
+        self._added_uuids = set()
+        self._new_uuids = set()
+        self._generated = {}
+        self._removed = []
+        self._replaced_uuids = []
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='scanner') as executor:
+            pending: set[Future] = {executor.submit(self._scan_directory, self.root)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    directory_scan: _DirectoryScan = future.result()
+                    visited.add(directory_scan.directory)
+                    for subdirectory in directory_scan.subdirectories:
+                        pending.add(executor.submit(self._scan_directory, subdirectory))
+                    self._apply(directory_scan, result)
+        self._flush()
+        self._remove_vanished_directories(visited, result)
+        self._apply_removals(result)
+        return result
+
+    def _scan_directory(self, directory: str) -> _DirectoryScan:
+        """
+        List a directory and examine its new and changed files.
+
+        :param directory: Absolute path of the directory.
+        """
+        known: dict[str, tuple[str, int, int, int]] = {
+            name: (file_uuid, inode, mtime_ns, size)
+            for name, file_uuid, inode, mtime_ns, size in self._connection().execute(
+                "SELECT name, uuid, inode, mtime_ns, size FROM scan_state WHERE directory = ?", (directory,))
+        }
+        subdirectories: list[str] = []
+        changed: list[tuple[FileMetadata, int, int, str | None, bool]] = []
+        errors: list[str] = []
+        unchanged: int = 0
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirectories.append(entry.path)
+                            continue
+                        if not entry.is_file(follow_symlinks=False):
+                            continue
+                        stat = entry.stat(follow_symlinks=False)
+                        previous = known.pop(entry.name, None)
+                        if previous is not None and previous[1:] == (stat.st_ino, stat.st_mtime_ns, stat.st_size):
+                            unchanged += 1
+                            continue
+                        file_uuid, generated = self._file_uuid(entry.path,
+                                                               previous[0] if previous is not None else None)
+                        file_metadata = FileMetadata(
+                            uuid=file_uuid,
+                            create_datetime=datetime.fromtimestamp(stat.st_ctime, timezone.utc)
+                                                    .strftime('%Y-%m-%dT%H:%M:%SZ'),
+                            size=stat.st_size,
+                            mimetype=sniff_mimetype(entry.path),
+                            name=entry.name,
+                            path=entry.path
+                        )
+                        changed.append((file_metadata, stat.st_ino, stat.st_mtime_ns,
+                                        previous[0] if previous is not None else None, generated))
+                    except OSError as e:
+                        # Keep the file indexed as it was, it may be readable on the next scan
+                        known.pop(entry.name, None)
+                        errors.append(f"{entry.path}: {e}")
+        except OSError as e:
+            errors.append(f"{directory}: {e}")
+            known.clear()
+        removed = [(name, *previous) for name, previous in known.items()]
+        return _DirectoryScan(directory, subdirectories, changed, removed, unchanged, errors)
+
+    @staticmethod
+    def _file_uuid(path: str, previous_uuid: str | None) -> tuple[str, bool]:
+        """
+        Return the UUID of a file from its extended attribute, its previous scan or a new random one.
+
+        :param path: Path to the file.
+        :param previous_uuid: UUID of the file in the previous scan, or None.
+        :return: UUID and whether it is a new random one.
+        """
+        try:
+            return os.getxattr(path, UUID_XATTR, follow_symlinks=False).decode('ascii'), False
+        except (OSError, AttributeError, UnicodeDecodeError):
+            # No attribute, or extended attributes are not supported by the platform or file system
+            pass
+        if previous_uuid is not None:
+            return previous_uuid, False
+        return str(uuid_module.uuid4()), True
+
+    def _apply(self, directory_scan: _DirectoryScan, result: ScanResult) -> None:
+        """
+        Queue the changes found in one directory and count them.
+
+        A file whose UUID changed, e.g. because its extended attribute was
+        set, leaves its previous UUID to be removed.
+
+        :param directory_scan: Outcome of scanning the directory.
+        :param result: Counts updated with the outcome.
+        """
+        for file_metadata, inode, mtime_ns, previous_uuid, generated in directory_scan.changed:
+            self._pending_metadata.append(file_metadata)
+            self._pending_state.append((directory_scan.directory, file_metadata.name, file_metadata.uuid, inode,
+                                        mtime_ns, file_metadata.size))
+            self._added_uuids.add(file_metadata.uuid)
+            if previous_uuid is None:
+                result.added += 1
+                self._new_uuids.add(file_metadata.uuid)
+                if generated:
+                    self._generated[(inode, mtime_ns, file_metadata.size)] = \
+                        (directory_scan.directory, file_metadata.name, file_metadata.uuid)
+            else:
+                result.updated += 1
+                if previous_uuid != file_metadata.uuid:
+                    self._replaced_uuids.append(previous_uuid)
+        if len(self._pending_metadata) >= INSERT_BATCH_SIZE:
+            self._flush()
+        if directory_scan.removed:
+            self._remove(directory_scan.directory, directory_scan.removed)
+            result.removed += len(directory_scan.removed)
+        result.unchanged += directory_scan.unchanged
+        result.errors.extend(directory_scan.errors)
+
+    def _flush(self) -> None:
+        """
+        Write the queued metadata to the store and then the scan state.
+
+        The store is written first, so an interrupted scan examines the
+        files again instead of missing them.
+        """
+        if not self._pending_metadata:
+            return
+        self.store.add_many(self._pending_metadata)
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.executemany(
+                "INSERT OR REPLACE INTO scan_state (directory, name, uuid, inode, mtime_ns, size)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                self._pending_state
+            )
+            connection.execute("COMMIT")
+        except sqlite3.Error:
+            connection.execute("ROLLBACK")
+            raise
+        self._pending_metadata = []
+        self._pending_state = []
+
+    def _remove(self, directory: str, removed: list[tuple[str, str, int, int, int]]) -> None:
+        """
+        Queue the removal of files which are gone from the store and from the scan state.
+
+        :param directory: Absolute path of their directory.
+        :param removed: Names, UUIDs, inodes, mtimes and sizes of the files.
+        """
+        for name, file_uuid, inode, mtime_ns, size in removed:
+            self._removed.append((directory, name, file_uuid, inode, mtime_ns, size))
+
+    def _apply_removals(self, result: ScanResult) -> None:
+        """
+        Apply the queued removals, keeping the UUIDs of files which were moved.
+
+        A file is moved if its UUID was written for a new file of this scan,
+        or if a new file with a generated UUID has its inode, mtime and size;
+        that file is then given the UUID of the vanished one. The remaining
+        UUIDs are removed from the store, except those written by this scan,
+        and then the scan state rows.
+
+        The store is written first, so an interrupted scan finds the files
+        gone again instead of leaving them in the store.
+
+        :param result: Counts updated with the moved files.
+        """
+        moved_metadata: list[FileMetadata] = []
+        moved_state: list[tuple[str, str, str]] = []
+        discarded_uuids: list[str] = []
+        for directory, name, file_uuid, inode, mtime_ns, size in self._removed:
+            if file_uuid not in self._new_uuids:
+                match = self._generated.pop((inode, mtime_ns, size), None)
+                if match is None or file_uuid in self._added_uuids:
+                    continue
+                new_directory, new_name, new_uuid = match
+                file_metadata = self.store.get(new_uuid)
+                if file_metadata is None:
+                    continue
+                moved_metadata.append(FileMetadata(file_uuid, file_metadata.create_datetime, file_metadata.size,
+                                                   file_metadata.mimetype, file_metadata.name, file_metadata.path))
+                moved_state.append((file_uuid, new_directory, new_name))
+                discarded_uuids.append(new_uuid)
+                self._added_uuids.add(file_uuid)
+            result.moved += 1
+            result.added -= 1
+            result.removed -= 1
+
+        self.store.add_many(moved_metadata)
+        for file_uuid in discarded_uuids:
+            self.store.delete(file_uuid)
+        removed_uuids = [file_uuid for _, _, file_uuid, _, _, _ in self._removed] + self._replaced_uuids
+        for file_uuid in dict.fromkeys(removed_uuids):
+            if file_uuid not in self._added_uuids:
+                self.store.delete(file_uuid)
+        if self._removed or moved_state:
+            connection = self._connection()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                connection.executemany("UPDATE scan_state SET uuid = ? WHERE directory = ? AND name = ?",
+                                       moved_state)
+                connection.executemany("DELETE FROM scan_state WHERE directory = ? AND name = ?",
+                                       [(directory, name) for directory, name, _, _, _, _ in self._removed])
+                connection.execute("COMMIT")
+            except sqlite3.Error:
+                connection.execute("ROLLBACK")
+                raise
+        self._generated = {}
+        self._removed = []
+        self._replaced_uuids = []
+
+    def _remove_vanished_directories(self, visited: set[str], result: ScanResult) -> None:
+        """
+        Remove the files of directories under the root which no longer exist.
+
+        :param visited: Directories listed by this scan.
+        :param result: Counts updated with the removed files.
+        """
+        connection = self._connection()
+        prefix = os.path.join(self.root, '')
+        vanished = [
+            directory for (directory,) in connection.execute("SELECT DISTINCT directory FROM scan_state")
+            if directory not in visited and (directory == self.root or directory.startswith(prefix))
+        ]
+        for directory in vanished:
+            removed = connection.execute("SELECT name, uuid, inode, mtime_ns, size FROM scan_state WHERE directory = ?",
+                                         (directory,)).fetchall()
+            self._remove(directory, removed)
+            result.removed += len(removed)
+
+def main() -> None:
+    """
+    Parse command line arguments and scan the storage root into a SQLite metadata store.
+    """
+    parser = argparse.ArgumentParser(description='Build or refresh the file index of a storage root.')
+    parser.add_argument('root', help='Storage root to scan')
+    parser.add_argument('--db', required=True,
+                        help='SQLite metadata database, served by the REST server with FILE_METADATA_DB')
+    parser.add_argument('--workers', type=int,
+                        default=DEFAULT_SCAN_WORKERS,
+                        help=f'Number of threads listing directories and examining files (default: {DEFAULT_SCAN_WORKERS})')
+    args = parser.parse_args()
+
+    store = SqliteMetadataStore(args.db)
+    scanner = Scanner(args.root, store, args.db, workers=args.workers)
+    start = time.perf_counter()
+    try:
+        result = scanner.scan()
+    finally:
+        scanner.close()
+        store.close()
+    for error in result.errors:
+        sys.stderr.write(f"{error}\n")
+    sys.stderr.write(f"Scanned {args.root} in {time.perf_counter() - start:.1f} s: {result}\n")
+    if result.errors:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
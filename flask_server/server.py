@@ -1,57 +1,88 @@
-from flask import Flask, jsonify, send_file, abort, after_this_request
+from flask import Flask, Response, send_file, abort, request
+from werkzeug.exceptions import RequestedRangeNotSatisfiable
+from werkzeug.http import http_date, quote_etag
+import werkzeug.utils
+from collections import OrderedDict
+from typing import Iterable, Iterator, NamedTuple
+from urllib.parse import quote
 import os
+import sys
+import json
+import zlib
+import secrets
+import unicodedata
 import logging
+import threading
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from flask_server.store import FileMetadata, MetadataStore, DictMetadataStore, CompactMetadataStore, \
+    SqliteMetadataStore
+from flask_server.request_log import RequestLog, EVENT_STAT_MISS, EVENT_READ_MISS, EVENT_DISK_MISS
+from config import COMPRESSION_MIN_SIZE, COMPRESSIBLE_MIMETYPES, STAT_HEADERS
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 # Base directory of the application
 BASE_DIR: str = os.path.dirname(os.path.abspath(__file__))
 
+# Size of the blocks in which multipart range responses read files
+RANGE_BLOCK_SIZE: int = 64 * 1024
+
+# Compression levels favouring speed, responses are compressed on the fly
+GZIP_LEVEL: int = 6
+ZSTD_LEVEL: int = 3
+
+# Number of serialized stat responses kept by FileService
+STAT_RESPONSE_CACHE_SIZE: int = 100_000
+
+# Headers handing the transfer of a file over to the front proxy, by offload mode
+OFFLOAD_HEADERS: dict[str, str] = {
+    'x-sendfile': 'X-Sendfile',
+    'x-accel-redirect': 'X-Accel-Redirect',
+}
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 
-class FileMetadata:
-    """Represents the metadata of a file."""
-    
-    def __init__(self, uuid: str, create_datetime: str, size: int, mimetype: str, name: str, path: str) -> None:
-        """
-        Initialize file metadata.
-
-        :param uuid: UUID of the file.
-        :param create_datetime: Creation date and time of the file.
-        :param size: Size of the file in bytes.
-        :param mimetype: MIME type of the file.
-        :param name: Name of the file.
-        :param path: Path to the file on disk.
-        """
-        self.uuid = uuid
-        self.create_datetime = create_datetime
-        self.size = size
-        self.mimetype = mimetype
-        self.name = name
-        self.path = path
+# Log of request events, written from a background thread
+default_request_log = RequestLog()
 
-    def to_dict(self) -> dict:
-        """
-        Return the metadata of the file as a dictionary.
-        
-        :return: Dictionary representation of file metadata.
-        """
-        return {
-            "create_datetime": self.create_datetime,
-            "size": self.size,
-            "mimetype": self.mimetype,
-            "name": self.name
-        }
+class StatResponse(NamedTuple):
+    """Serialized stat response of a file with its validators as header values."""
+    body: bytes
+    etag: str
+    last_modified: str | None
 
 class FileService:
     """Provides services for managing files."""
     
-    def __init__(self, files_metadata: dict[str, FileMetadata] = None) -> None:
+    def __init__(self, files_metadata: dict[str, FileMetadata] = None, store: MetadataStore = None,
+                 stat_cache_size: int = STAT_RESPONSE_CACHE_SIZE) -> None:
         """
         Initialize the file service with metadata.
 
-        :param files_metadata: Dictionary of file metadata.
+        :param files_metadata: Dictionary of file metadata, kept in memory.
+        :param store: Store of file metadata used instead of the dictionary, e.g. SqliteMetadataStore.
+        :param stat_cache_size: Number of serialized stat responses kept, 0 to serialize on every request.
+        """
+        self.store: MetadataStore = store if store is not None else DictMetadataStore(files_metadata)
+        self.stat_cache_size = stat_cache_size
+        self._stat_responses: OrderedDict[str, StatResponse] = OrderedDict()
+        self._stat_lock = threading.Lock()
+        # Incremented on every change, so a response built while the file changes is not cached
+        self._generation = 0
+        # Version of the store the cached responses were built from
+        self._store_version = self.store.version()
+
+    @property
+    def files_metadata(self) -> MetadataStore:
         """
-        self.files_metadata = files_metadata or {}
+        Return the metadata store, which supports lookups as files_metadata[uuid].
+        """
+        return self.store
 
     def add_file_metadata(self, file_metadata: FileMetadata) -> None:
         """
@@ -59,7 +90,17 @@ class FileService:
 
         :param file_metadata: Metadata of the file to be added.
         """
-        self.files_metadata[file_metadata.uuid] = file_metadata
+        self.store.add(file_metadata)
+        self._forget_stat_responses([file_metadata.uuid])
+
+    def add_files_metadata(self, files_metadata: Iterable[FileMetadata]) -> None:
+        """
+        Add the metadata of many files at once, e.g. when ingesting a catalog.
+
+        :param files_metadata: Metadata of the files to be added.
+        """
+        self.store.add_many(files_metadata)
+        self._forget_stat_responses()
 
     def delete_file_metadata(self, uuid: str) -> None:
         """
@@ -67,7 +108,8 @@ class FileService:
 
         :param uuid: UUID of the file to be deleted.
         """
-        self.files_metadata.pop(uuid, None)
+        self.store.delete(uuid)
+        self._forget_stat_responses([uuid])
 
     def get_file_metadata(self, uuid: str) -> FileMetadata | None:
         """
@@ -76,7 +118,62 @@ class FileService:
         :param uuid: UUID of the file.
         :return: FileMetadata instance or None if not found.
         """
-        return self.files_metadata.get(uuid)
+        return self.store.get(uuid)
+
+    def get_stat_response(self, uuid: str) -> StatResponse | None:
+        """
+        Return the serialized stat response of a file, built on first use and then cached.
+
+        The body is the JSON which jsonify produces outside debug mode.
+        Metadata must be changed through add_file_metadata, which drops the
+        cached response, not by modifying a FileMetadata in place. Changes
+        written to the store by other processes drop all cached responses
+        once the store notices them.
+
+        :param uuid: UUID of the file.
+        :return: StatResponse or None if not found.
+        """
+        store_version = self.store.version()
+        if store_version != self._store_version:
+            self._forget_stat_responses()
+            self._store_version = store_version
+        with self._stat_lock:
+            stat_response = self._stat_responses.get(uuid)
+            if stat_response is not None:
+                self._stat_responses.move_to_end(uuid)
+                return stat_response
+            generation = self._generation
+
+        file_data = self.get_file_metadata(uuid)
+        if file_data is None:
+            return None
+        last_modified = file_data.last_modified
+        stat_response = StatResponse(
+            body=json.dumps(file_data.to_dict(), sort_keys=True, separators=(',', ':')).encode('utf-8') + b'\n',
+            etag=quote_etag(file_data.etag),
+            last_modified=http_date(last_modified) if last_modified is not None else None
+        )
+        if self.stat_cache_size > 0:
+            with self._stat_lock:
+                if generation == self._generation:
+                    self._stat_responses[uuid] = stat_response
+                    while len(self._stat_responses) > self.stat_cache_size:
+                        self._stat_responses.popitem(last=False)
+        return stat_response
+
+    def _forget_stat_responses(self, uuids: Iterable[str] = None) -> None:
+        """
+        Drop cached stat responses of changed files.
+
+        :param uuids: UUIDs of the changed files, or None to drop all responses.
+        """
+        with self._stat_lock:
+            self._generation += 1
+            if uuids is None:
+                self._stat_responses.clear()
+                return
+            for uuid in uuids:
+                self._stat_responses.pop(uuid, None)
 
     def file_exists(self, uuid: str) -> bool:
         """
@@ -91,15 +188,29 @@ class FileService:
 class FileAPI:
     """Handles API routes for file operations."""
 
-    def __init__(self, app: Flask, file_service: FileService) -> None:
+    def __init__(self, app: Flask, file_service: FileService, offload: str | None = None, offload_root: str = '/',
+                 offload_prefix: str = '/protected/', request_log: RequestLog | None = None) -> None:
         """
         Initialize the FileAPI with a Flask app and file service.
 
         :param app: Flask application instance.
         :param file_service: FileService instance to manage files.
+        :param offload: Let the front proxy send file content, 'x-sendfile' (Apache, lighttpd)
+                        or 'x-accel-redirect' (nginx), None to send it from the application.
+        :param offload_root: Directory served by the internal location of nginx.
+        :param offload_prefix: URI of the internal location of nginx.
+        :param request_log: Log of misses and other request events, the shared default log if not given.
         """
+        if offload is not None and offload not in OFFLOAD_HEADERS:
+            raise ValueError(f"Unknown offload mode {offload}, expected one of {', '.join(OFFLOAD_HEADERS)}.")
         self.app = app
         self.file_service = file_service
+        self.offload = offload
+        self.offload_root = os.path.abspath(offload_root)
+        self.offload_prefix = offload_prefix.rstrip('/') + '/'
+        self.request_log = default_request_log if request_log is None else request_log
+        # Servers stop the log with the application, before the process exits without running atexit
+        app.extensions['request_log'] = self.request_log
         self.register_routes()
 
     def register_routes(self) -> None:
@@ -114,55 +225,310 @@ class FileAPI:
         Endpoint for retrieving the metadata of a file.
 
         :param uuid: UUID of the file.
-        :return: JSON response with file metadata or 404 if not found.
+        :return: JSON response with file metadata, 304 if the client copy is
+                 still valid, or 404 if not found.
         """
-        file_data = self.file_service.get_file_metadata(uuid)
+        stat_response = self.file_service.get_stat_response(uuid)
         
-        if file_data:
-            return jsonify(file_data.to_dict())
+        if stat_response:
+            response = Response(stat_response.body, mimetype='application/json')
+            response.headers['ETag'] = stat_response.etag
+            if stat_response.last_modified is not None:
+                response.headers['Last-Modified'] = stat_response.last_modified
+            return self._compress(response.make_conditional(request))
         else:
-            logging.error(f"File with UUID {uuid} not found.")
+            self.request_log.event(EVENT_STAT_MISS, logging.WARNING, uuid=uuid)
             abort(404, description=f"File with UUID {uuid} not found.")
 
     def read_file(self, uuid: str):
         """
         Endpoint for reading the content of a file.
 
+        With the query parameter stat=1 the file metadata is sent along in
+        the X-File-* headers, saving clients a separate stat request.
+
         :param uuid: UUID of the file.
-        :return: File response for download or 404 if not found.
+        :return: File response for download, 304 if the client copy is still
+                 valid, or 404 if not found.
         """
         file_data = self.file_service.get_file_metadata(uuid)
         
         if file_data:
             if not os.path.exists(file_data.path):
-                logging.error(f"File with UUID {uuid} not found on disk.")
+                self.request_log.event(EVENT_DISK_MISS, logging.ERROR, uuid=uuid, path=file_data.path)
                 abort(404, description=f"File with UUID {uuid} not found.")
 
-            @after_this_request
-            def close_file(response):
-                """
-                Close the file stream after the request is complete.
-
-                :param response: Response object.
-                :return: Modified response object.
-                """
-                try:
-                    response.direct_passthrough = False
-                    response.stream.close()
-                except Exception as e:
-                    logging.exception("Error closing file stream.")
-                return response
-
-            return send_file(
+            if self.offload is not None:
+                response = self._offload_response(file_data)
+                if response is not None:
+                    return self._add_stat_headers(response, file_data)
+
+            if request.range is not None and self._if_range_matches(file_data):
+                # Several ranges need a multipart response
+                if len(request.range.ranges) > 1:
+                    return self._add_stat_headers(self._multi_range_response(file_data, request.range.ranges),
+                                                  file_data)
+                # The file wrapper of the server can send a range only from a file positioned at its start
+                if 'wsgi.file_wrapper' in request.environ:
+                    return self._add_stat_headers(self._file_range_response(file_data), file_data)
+
+            # The file is closed by the WSGI server through the close method of the response body,
+            # which stays a file wrapper so the server can send it with sendfile
+            response = send_file(
                 file_data.path,
                 mimetype=file_data.mimetype,
                 as_attachment=True,
-                download_name=file_data.name
+                download_name=file_data.name,
+                etag=file_data.etag,
+                last_modified=file_data.last_modified
             )
+            return self._add_stat_headers(self._compress(response), file_data)
         else:
-            logging.error(f"File with UUID {uuid} not found.")
+            self.request_log.event(EVENT_READ_MISS, logging.WARNING, uuid=uuid)
             abort(404, description=f"File with UUID {uuid} not found.")
 
+    def _offload_response(self, file_data: FileMetadata) -> Response | None:
+        """
+        Build a response without body which lets the front proxy send the file.
+
+        Conditional requests are answered here, ranges are left to the proxy.
+
+        :param file_data: Metadata of the requested file.
+        :return: The response, or None if the file is outside the directory served by the proxy.
+        """
+        path = os.path.abspath(file_data.path)
+        if self.offload == 'x-accel-redirect':
+            relative_path = os.path.relpath(path, self.offload_root)
+            if relative_path == os.pardir or relative_path.startswith(os.pardir + os.sep):
+                return None
+            target = self.offload_prefix + quote(os.fsencode(relative_path.replace(os.sep, '/')))
+        else:
+            target = path
+
+        # With use_x_sendfile the file is not opened, only its headers are set
+        response = werkzeug.utils.send_file(
+            path,
+            request.environ,
+            mimetype=file_data.mimetype,
+            as_attachment=True,
+            download_name=file_data.name,
+            conditional=False,
+            etag=file_data.etag,
+            last_modified=file_data.last_modified,
+            use_x_sendfile=True,
+            response_class=self.app.response_class
+        )
+        del response.headers['X-Sendfile']
+        response.headers[OFFLOAD_HEADERS[self.offload]] = target
+        return response.make_conditional(request, accept_ranges=True)
+
+    def _file_range_response(self, file_data: FileMetadata) -> Response:
+        """
+        Build a 206 response for a single byte range sent by the file wrapper of the server.
+
+        The file is positioned at the start of the range and the wrapper sends
+        no more than Content-Length bytes, with sendfile where the server supports it.
+
+        :param file_data: Metadata of the requested file.
+        :return: Partial content response, 304 if the client copy is still valid,
+                 or 416 if the range cannot be satisfied.
+        """
+        f = open(file_data.path, 'rb')
+        try:
+            file_size = os.fstat(f.fileno()).st_size
+            byte_range = request.range.range_for_length(file_size)
+            if byte_range is None:
+                raise RequestedRangeNotSatisfiable(length=file_size)
+            start, stop = byte_range
+            f.seek(start)
+            response = send_file(
+                f,
+                mimetype=file_data.mimetype,
+                as_attachment=True,
+                download_name=file_data.name,
+                conditional=False,
+                etag=file_data.etag,
+                last_modified=file_data.last_modified
+            )
+        except BaseException:
+            f.close()
+            raise
+        response.status_code = 206
+        response.content_length = stop - start
+        response.content_range = request.range.to_content_range_header(file_size)
+        response.accept_ranges = "bytes"
+        return response.make_conditional(request)
+
+    @staticmethod
+    def _add_stat_headers(response: Response, file_data: FileMetadata) -> Response:
+        """
+        Add the file metadata headers if the request asks for them with stat=1.
+
+        The name is percent-encoded, headers cannot carry arbitrary text.
+
+        :param response: Response of the read endpoint.
+        :param file_data: Metadata of the requested file.
+        :return: The response.
+        """
+        if request.args.get('stat') != '1':
+            return response
+        for key, value in file_data.to_dict().items():
+            response.headers[STAT_HEADERS[key]] = quote(value) if key == 'name' else str(value)
+        return response
+
+    @staticmethod
+    def _compress(response: Response) -> Response:
+        """
+        Compress a full response on the fly if the client accepts it and the content compresses well.
+
+        zstd is offered when the zstandard package is installed, gzip always.
+        Partial responses, small bodies and MIME types outside the allowlist
+        are left as they are. The ETag of a compressed response becomes weak,
+        so conditional requests still match the uncompressed representation.
+
+        :param response: Response of the endpoint.
+        :return: The response, compressed or unchanged.
+        """
+        if response.status_code not in (200, 304) or request.range is not None:
+            return response
+        response.vary.add('Accept-Encoding')
+        if response.status_code != 200 or not response.mimetype.startswith(COMPRESSIBLE_MIMETYPES):
+            return response
+        if response.content_length is not None and response.content_length < COMPRESSION_MIN_SIZE:
+            return response
+
+        encoding = request.accept_encodings.best_match(['zstd', 'gzip'] if zstandard is not None else ['gzip'])
+        if encoding is None:
+            return response
+        if encoding == 'zstd':
+            compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+        else:
+            compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+        response.response = FileAPI._iter_compressed(response.response, compressor)
+        response.direct_passthrough = False
+        response.content_encoding = encoding
+        del response.headers['Content-Length']
+        etag, weak = response.get_etag()
+        if etag is not None:
+            response.set_etag(etag, weak=True)
+        return response
+
+    @staticmethod
+    def _iter_compressed(chunks: Iterable[bytes], compressor) -> Iterator[bytes]:
+        """
+        Yield the compressed body and close the original one afterwards.
+
+        :param chunks: Original response body.
+        :param compressor: zlib or zstandard compression object.
+        """
+        try:
+            for chunk in chunks:
+                data = compressor.compress(chunk)
+                if data:
+                    yield data
+            yield compressor.flush()
+        finally:
+            if hasattr(chunks, 'close'):
+                chunks.close()
+
+    @staticmethod
+    def _if_range_matches(file_data: FileMetadata) -> bool:
+        """
+        Check whether the If-Range precondition of the request allows a partial response.
+
+        :param file_data: Metadata of the requested file.
+        :return: True if there is no If-Range header or it matches the file.
+        """
+        if_range = request.if_range
+        if if_range.etag is not None:
+            return if_range.etag == file_data.etag
+        if if_range.date is not None:
+            # HTTP dates have whole seconds
+            last_modified = file_data.last_modified
+            return last_modified is not None and last_modified.replace(microsecond=0) <= if_range.date
+        return True
+
+    @staticmethod
+    def _set_attachment_name(response: Response, name: str) -> None:
+        """
+        Set the Content-Disposition header of an attachment the way send_file does.
+
+        A name which is not ASCII is sent as an ASCII approximation in
+        filename and encoded in full in filename* (RFC 6266).
+
+        :param response: Response to set the header on.
+        :param name: Name of the file.
+        """
+        try:
+            name.encode('ascii')
+        except UnicodeEncodeError:
+            simple = unicodedata.normalize('NFKD', name).encode('ascii', 'ignore').decode('ascii')
+            # safe = RFC 5987 attr-char
+            names = {'filename': simple, 'filename*': f"UTF-8''{quote(name, safe='!#$&+-.^_`|~')}"}
+        else:
+            names = {'filename': name}
+        response.headers.set('Content-Disposition', 'attachment', **names)
+
+    def _multi_range_response(self, file_data: FileMetadata, byte_ranges: list[tuple[int, int | None]]) -> Response:
+        """
+        Build a 206 multipart/byteranges response for several byte ranges.
+
+        :param file_data: Metadata of the requested file.
+        :param byte_ranges: Parsed ranges as (start, stop) pairs, stop exclusive.
+        :return: Partial content response, 304 if the client copy is still valid,
+                 or 416 if no range can be satisfied.
+        """
+        file_size = os.path.getsize(file_data.path)
+        resolved_ranges = []
+        for start, stop in byte_ranges:
+            if start < 0:
+                start, stop = max(file_size + start, 0), file_size
+            else:
+                stop = file_size if stop is None else min(stop, file_size)
+            if start < stop:
+                resolved_ranges.append((start, stop))
+        if not resolved_ranges:
+            abort(416)
+
+        boundary = secrets.token_hex(16)
+        response = Response(
+            self._iter_multi_range(file_data, file_size, resolved_ranges, boundary),
+            status=206,
+            mimetype=f"multipart/byteranges; boundary={boundary}"
+        )
+        self._set_attachment_name(response, file_data.name)
+        response.accept_ranges = "bytes"
+        response.set_etag(file_data.etag)
+        response.last_modified = file_data.last_modified
+        return response.make_conditional(request, accept_ranges=False)
+
+    @staticmethod
+    def _iter_multi_range(file_data: FileMetadata, file_size: int, byte_ranges: list[tuple[int, int]],
+                          boundary: str) -> Iterator[bytes]:
+        """
+        Yield the parts of a multipart/byteranges body.
+
+        :param file_data: Metadata of the requested file.
+        :param file_size: Size of the file on disk.
+        :param byte_ranges: Satisfiable ranges as (start, stop) pairs, stop exclusive.
+        :param boundary: Multipart boundary.
+        """
+        with open(file_data.path, 'rb') as f:
+            for start, stop in byte_ranges:
+                yield (f"\r\n--{boundary}\r\n"
+                       f"Content-Type: {file_data.mimetype}\r\n"
+                       f"Content-Range: bytes {start}-{stop - 1}/{file_size}\r\n\r\n").encode('latin-1')
+                f.seek(start)
+                remaining = stop - start
+                while remaining > 0:
+                    block = f.read(min(RANGE_BLOCK_SIZE, remaining))
+                    if not block:
+                        break
+                    remaining -= len(block)
+                    yield block
+            yield f"\r\n--{boundary}--\r\n".encode('latin-1')
+
 # Initialize Flask app
 app = Flask(__name__)
 
@@ -178,8 +544,29 @@ initial_metadata: dict[str, FileMetadata] = {
     )
 }
 
-file_service = FileService(files_metadata=initial_metadata)
-file_api = FileAPI(app, file_service)
+# Path of a SQLite metadata database to serve instead of the predefined metadata
+METADATA_DB: str | None = os.environ.get('FILE_METADATA_DB')
+
+# Load the whole database into memory at startup instead of querying it on each request
+METADATA_COMPACT: bool = os.environ.get('FILE_METADATA_COMPACT') == '1'
+
+# Let the front proxy send file content: 'x-sendfile' or 'x-accel-redirect'
+FILE_OFFLOAD: str | None = os.environ.get('FILE_OFFLOAD') or None
+
+# Directory served by the internal location of nginx and the URI of that location
+FILE_OFFLOAD_ROOT: str = os.environ.get('FILE_OFFLOAD_ROOT', '/')
+FILE_OFFLOAD_PREFIX: str = os.environ.get('FILE_OFFLOAD_PREFIX', '/protected/')
+
+if METADATA_DB and METADATA_COMPACT:
+    database = SqliteMetadataStore(METADATA_DB, lru_size=0)
+    file_service = FileService(store=CompactMetadataStore(database))
+    database.close()
+elif METADATA_DB:
+    file_service = FileService(store=SqliteMetadataStore(METADATA_DB))
+else:
+    file_service = FileService(files_metadata=initial_metadata)
+file_api = FileAPI(app, file_service, offload=FILE_OFFLOAD, offload_root=FILE_OFFLOAD_ROOT,
+                   offload_prefix=FILE_OFFLOAD_PREFIX)
 
 if __name__ == "__main__":
     app.run(debug=True)
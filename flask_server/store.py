@@ -0,0 +1,725 @@
+"""
+Metadata stores behind FileService.
+
+DictMetadataStore keeps every FileMetadata in memory, which suits tests and
+small catalogs. CompactMetadataStore keeps a large catalog in memory packed
+into typed arrays at a fraction of the size. SqliteMetadataStore keeps the
+catalog in a SQLite database with the UUID as primary key, so lookups are a
+single indexed search, the catalog survives restarts and only recently used
+entries stay in memory.
+"""
+import os
+import time
+import sqlite3
+import hashlib
+import weakref
+import threading
+import uuid as uuid_module
+from abc import ABC, abstractmethod
+from array import array
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Iterable, Iterator
+
+# Number of entries kept by the read-through cache of SqliteMetadataStore
+DEFAULT_LRU_SIZE: int = 10_000
+
+# Seconds between checks of SqliteMetadataStore for changes written by other processes
+DEFAULT_CHANGE_CHECK_INTERVAL: float = 1.0
+
+# Number of rows inserted per transaction by bulk ingestion
+INSERT_BATCH_SIZE: int = 10_000
+
+# SQLite connections inherited by a forked process, kept open but never used
+_inherited_connections: list = []
+
+# Open SqliteMetadataStores, which a forked process must not use the connections of
+_stores: weakref.WeakSet = weakref.WeakSet()
+
+def _after_fork_in_child() -> None:
+    for store in list(_stores):
+        store._after_fork()
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
+
+class FileMetadata:
+    """Represents the metadata of a file."""
+    __slots__ = ('uuid', 'create_datetime', 'size', 'mimetype', 'name', 'path')
+
+    def __init__(self, uuid: str, create_datetime: str, size: int, mimetype: str, name: str, path: str) -> None:
+        """
+        Initialize file metadata.
+
+        :param uuid: UUID of the file.
+        :param create_datetime: Creation date and time of the file.
+        :param size: Size of the file in bytes.
+        :param mimetype: MIME type of the file.
+        :param name: Name of the file.
+        :param path: Path to the file on disk.
+        """
+        self.uuid = uuid
+        self.create_datetime = create_datetime
+        self.size = size
+        self.mimetype = mimetype
+        self.name = name
+        self.path = path
+
+    def to_dict(self) -> dict:
+        """
+        Return the metadata of the file as a dictionary.
+
+        :return: Dictionary representation of file metadata.
+        """
+        return {
+            "create_datetime": self.create_datetime,
+            "size": self.size,
+            "mimetype": self.mimetype,
+            "name": self.name
+        }
+
+    @property
+    def etag(self) -> str:
+        """
+        Return a strong entity tag derived from the file metadata.
+
+        :return: ETag value without quotes.
+        """
+        fingerprint = f"{self.uuid}\0{self.create_datetime}\0{self.size}\0{self.mimetype}\0{self.name}"
+        return hashlib.sha256(fingerprint.encode('utf-8')).hexdigest()[:32]
+
+    @property
+    def last_modified(self) -> datetime | None:
+        """
+        Return the creation date and time of the file as its modification time.
+
+        A creation time without an offset is taken as UTC, so the result can
+        always be compared with the dates of HTTP headers.
+
+        :return: Timezone-aware datetime or None if the creation time cannot be parsed.
+        """
+        try:
+            dt = datetime.fromisoformat(self.create_datetime.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+        return dt if dt.tzinfo is not None else dt.replace(tzinfo=timezone.utc)
+
+class MetadataStore(ABC):
+    """
+    Interface of a store of file metadata keyed by UUID.
+
+    Besides its methods a store supports store[uuid], uuid in store, len(store)
+    and iterating over the metadata of all files.
+    """
+    @abstractmethod
+    def get(self, uuid: str) -> FileMetadata | None:
+        """
+        Return the metadata of a file.
+
+        :param uuid: UUID of the file.
+        :return: FileMetadata instance or None if not found.
+        """
+
+    @abstractmethod
+    def add(self, file_metadata: FileMetadata) -> None:
+        """
+        Add or replace the metadata of a file.
+
+        :param file_metadata: Metadata of the file.
+        """
+
+    def add_many(self, files_metadata: Iterable[FileMetadata]) -> None:
+        """
+        Add or replace the metadata of many files.
+
+        :param files_metadata: Metadata of the files.
+        """
+        for file_metadata in files_metadata:
+            self.add(file_metadata)
+
+    @abstractmethod
+    def delete(self, uuid: str) -> None:
+        """
+        Delete the metadata of a file if it exists.
+
+        :param uuid: UUID of the file.
+        """
+
+    def version(self) -> int:
+        """
+        Return a number which changes whenever the content of the store may have changed.
+
+        Entries cached outside the store stay valid while it does not change.
+        Stores in memory change only through their own methods, whose callers
+        know what they changed, so by default it never changes.
+        """
+        return 0
+
+    def close(self) -> None:
+        """
+        Release the resources of the store.
+        """
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+    @abstractmethod
+    def __iter__(self) -> Iterator[FileMetadata]:
+        ...
+
+    def __getitem__(self, uuid: str) -> FileMetadata:
+        file_metadata = self.get(uuid)
+        if file_metadata is None:
+            raise KeyError(uuid)
+        return file_metadata
+
+    def __contains__(self, uuid: str) -> bool:
+        return self.get(uuid) is not None
+
+class DictMetadataStore(MetadataStore):
+    """
+    Store keeping all metadata in a dictionary in memory.
+    """
+    def __init__(self, files_metadata: dict[str, FileMetadata] = None) -> None:
+        """
+        Initialize the store.
+
+        :param files_metadata: Dictionary of file metadata by UUID, used as is.
+        """
+        self.files_metadata = files_metadata if files_metadata is not None else {}
+
+    def get(self, uuid: str) -> FileMetadata | None:
+        return self.files_metadata.get(uuid)
+
+    def add(self, file_metadata: FileMetadata) -> None:
+        self.files_metadata[file_metadata.uuid] = file_metadata
+
+    def delete(self, uuid: str) -> None:
+        self.files_metadata.pop(uuid, None)
+
+    def __len__(self) -> int:
+        return len(self.files_metadata)
+
+    def __iter__(self) -> Iterator[FileMetadata]:
+        return iter(list(self.files_metadata.values()))
+
+# Hash table slots of CompactMetadataStore which hold no row
+_EMPTY: int = -1
+_DELETED: int = -2
+
+# Creation time formats which CompactMetadataStore rebuilds from a UTC timestamp
+_EPOCH: datetime = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_DATETIME_FORMATS: tuple[Callable[[datetime], str], ...] = (
+    lambda dt: dt.replace(tzinfo=None).isoformat() + 'Z',
+    lambda dt: dt.replace(tzinfo=None).isoformat(),
+    lambda dt: dt.isoformat(),
+)
+_RAW_DATETIME: int = 255
+
+class CompactMetadataStore(MetadataStore):
+    """
+    Store keeping all metadata in memory packed into typed arrays.
+
+    Every file is a row across column arrays: its UUID as 16 bytes of one
+    bytearray, size and creation timestamp as 64-bit integers, MIME type
+    and directory as indexes into interned tables and name as UTF-8 in one
+    shared buffer. An open addressing hash table of row numbers finds the
+    row of a UUID. A FileMetadata is built only when a file is looked up, so
+    changing it does not change the store.
+
+    Values which do not fit the packed form (UUIDs not in canonical form,
+    creation times in other formats, paths not ending with the name) are
+    kept as they are in side tables. Space of deleted rows and replaced
+    names is not reused.
+    """
+    def __init__(self, files_metadata: Iterable[FileMetadata] = ()) -> None:
+        """
+        Initialize the store.
+
+        :param files_metadata: Metadata of the files to load.
+        """
+        self._lock = threading.Lock()
+        self._slots = array('i', [_EMPTY]) * 8
+        # Slots holding a row or a deletion mark
+        self._used_slots = 0
+        self._count = 0
+        self._uuids = bytearray()
+        self._sizes = array('Q')
+        self._created = array('q')
+        self._created_formats = array('B')
+        self._mimetypes = array('I')
+        self._directories = array('I')
+        self._name_offsets = array('Q')
+        self._name_lengths = array('I')
+        self._names = bytearray()
+        self._mimetype_table: list[str] = []
+        self._mimetype_ids: dict[str, int] = {}
+        self._directory_table: list[str] = []
+        self._directory_ids: dict[str, int] = {}
+        self._other_rows: dict[str, int] = {}
+        self._other_created: dict[int, str] = {}
+        self._other_paths: dict[int, str] = {}
+        self.add_many(files_metadata)
+
+    def get(self, uuid: str) -> FileMetadata | None:
+        with self._lock:
+            row = self._find(uuid)[1]
+            return self._view(row, uuid) if row >= 0 else None
+
+    def add(self, file_metadata: FileMetadata) -> None:
+        with self._lock:
+            self._add(file_metadata)
+
+    def add_many(self, files_metadata: Iterable[FileMetadata]) -> None:
+        with self._lock:
+            for file_metadata in files_metadata:
+                self._add(file_metadata)
+
+    def _add(self, file_metadata: FileMetadata) -> None:
+        """
+        Add or replace the metadata of a file while holding the lock.
+
+        :param file_metadata: Metadata of the file.
+        """
+        key = self._key(file_metadata.uuid)
+        if isinstance(key, str):
+            row = self._other_rows.get(key)
+            if row is None:
+                row = self._other_rows[key] = self._append_row(bytes(16))
+                self._count += 1
+        else:
+            if (self._used_slots + 1) * 10 > len(self._slots) * 7:
+                self._resize()
+            slot, row = self._probe(key)
+            if row < 0:
+                row = self._append_row(key)
+                if self._slots[slot] == _EMPTY:
+                    self._used_slots += 1
+                self._slots[slot] = row
+                self._count += 1
+        self._set_row(row, file_metadata)
+
+    def delete(self, uuid: str) -> None:
+        with self._lock:
+            slot, row = self._find(uuid)
+            if row < 0:
+                return
+            if slot < 0:
+                del self._other_rows[uuid]
+            else:
+                self._slots[slot] = _DELETED
+            self._other_created.pop(row, None)
+            self._other_paths.pop(row, None)
+            self._count -= 1
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[FileMetadata]:
+        with self._lock:
+            rows = [row for row in self._slots if row >= 0]
+            other_rows = list(self._other_rows.items())
+        for row in rows:
+            with self._lock:
+                file_metadata = self._view(row, str(uuid_module.UUID(bytes=bytes(self._uuids[row * 16:row * 16 + 16]))))
+            yield file_metadata
+        for uuid, row in other_rows:
+            with self._lock:
+                file_metadata = self._view(row, uuid)
+            yield file_metadata
+
+    @staticmethod
+    def _key(uuid: str) -> bytes | str:
+        """
+        Return the 16 bytes of a UUID in canonical form, or the UUID itself for any other string.
+
+        :param uuid: UUID of the file.
+        """
+        try:
+            parsed = uuid_module.UUID(uuid)
+        except ValueError:
+            return uuid
+        return parsed.bytes if str(parsed) == uuid else uuid
+
+    def _find(self, uuid: str) -> tuple[int, int]:
+        """
+        Return the hash table slot (-1 for side table UUIDs) and the row of a UUID, row -1 if missing.
+
+        :param uuid: UUID of the file.
+        """
+        key = self._key(uuid)
+        if isinstance(key, str):
+            return -1, self._other_rows.get(key, -1)
+        return self._probe(key)
+
+    def _probe(self, key: bytes) -> tuple[int, int]:
+        """
+        Look a packed UUID up in the hash table with linear probing.
+
+        :param key: 16 bytes of the UUID.
+        :return: Slot and row of the UUID, or a free slot for it and row -1.
+        """
+        slots = self._slots
+        uuids = self._uuids
+        mask = len(slots) - 1
+        slot = hash(key) & mask
+        free = -1
+        while True:
+            row = slots[slot]
+            if row == _EMPTY:
+                return (slot if free < 0 else free), -1
+            if row == _DELETED:
+                if free < 0:
+                    free = slot
+            elif uuids[row * 16:row * 16 + 16] == key:
+                return slot, row
+            slot = (slot + 1) & mask
+
+    def _resize(self) -> None:
+        """
+        Rebuild the hash table without deletion marks, at least twice as large as the live rows.
+        """
+        size = len(self._slots)
+        while size < 4 * max(self._count, 1):
+            size *= 2
+        old_slots = self._slots
+        self._slots = array('i', [_EMPTY]) * size
+        self._used_slots = 0
+        for row in old_slots:
+            if row >= 0:
+                slot = self._probe(bytes(self._uuids[row * 16:row * 16 + 16]))[0]
+                self._slots[slot] = row
+                self._used_slots += 1
+
+    def _append_row(self, key: bytes) -> int:
+        """
+        Append an empty row and return its number.
+
+        :param key: 16 bytes of the UUID, zeros for side table UUIDs.
+        """
+        row = len(self._sizes)
+        self._uuids += key
+        for column in (self._sizes, self._created, self._created_formats, self._mimetypes, self._directories,
+                       self._name_offsets, self._name_lengths):
+            column.append(0)
+        return row
+
+    def _set_row(self, row: int, file_metadata: FileMetadata) -> None:
+        """
+        Pack metadata into a row.
+
+        :param row: Row number.
+        :param file_metadata: Metadata of the file.
+        """
+        self._sizes[row] = file_metadata.size
+        packed = self._pack_datetime(file_metadata.create_datetime)
+        if packed is None:
+            self._created_formats[row] = _RAW_DATETIME
+            self._other_created[row] = file_metadata.create_datetime
+        else:
+            self._created[row], self._created_formats[row] = packed
+            self._other_created.pop(row, None)
+        self._mimetypes[row] = self._intern(file_metadata.mimetype, self._mimetype_table, self._mimetype_ids)
+        name = file_metadata.name.encode('utf-8', 'surrogateescape')
+        self._name_offsets[row] = len(self._names)
+        self._name_lengths[row] = len(name)
+        self._names += name
+        directory, tail = os.path.split(file_metadata.path)
+        if tail == file_metadata.name and os.path.join(directory, tail) == file_metadata.path:
+            self._directories[row] = self._intern(directory, self._directory_table, self._directory_ids)
+            self._other_paths.pop(row, None)
+        else:
+            self._other_paths[row] = file_metadata.path
+
+    def _view(self, row: int, uuid: str) -> FileMetadata:
+        """
+        Build the metadata of a row.
+
+        :param row: Row number.
+        :param uuid: UUID of the file.
+        """
+        start = self._name_offsets[row]
+        name = self._names[start:start + self._name_lengths[row]].decode('utf-8', 'surrogateescape')
+        created_format = self._created_formats[row]
+        if created_format == _RAW_DATETIME:
+            create_datetime = self._other_created[row]
+        else:
+            create_datetime = _DATETIME_FORMATS[created_format](_EPOCH + timedelta(microseconds=self._created[row]))
+        path = self._other_paths.get(row)
+        if path is None:
+            path = os.path.join(self._directory_table[self._directories[row]], name)
+        return FileMetadata(uuid, create_datetime, self._sizes[row], self._mimetype_table[self._mimetypes[row]],
+                            name, path)
+
+    @staticmethod
+    def _pack_datetime(text: str) -> tuple[int, int] | None:
+        """
+        Return a UTC creation time as microseconds since the epoch and the number of its format.
+
+        :param text: Creation time in ISO 8601 format.
+        :return: Timestamp and format, or None if the text cannot be rebuilt from them.
+        """
+        try:
+            dt = datetime.fromisoformat(text.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        elif dt.utcoffset():
+            return None
+        micros = (dt - _EPOCH) // timedelta(microseconds=1)
+        for number, format_datetime in enumerate(_DATETIME_FORMATS):
+            if format_datetime(dt) == text:
+                return micros, number
+        return None
+
+    @staticmethod
+    def _intern(value: str, table: list[str], ids: dict[str, int]) -> int:
+        """
+        Return the index of a value in an interned table, adding it if new.
+
+        :param value: Value to intern.
+        :param table: Interned values by index.
+        :param ids: Indexes by interned value.
+        """
+        index = ids.get(value)
+        if index is None:
+            index = ids[value] = len(table)
+            table.append(value)
+        return index
+
+class SqliteMetadataStore(MetadataStore):
+    """
+    Store keeping metadata in a SQLite database with a read-through LRU cache.
+
+    Every thread uses its own connection, so request threads read
+    concurrently; WAL mode lets them read while another thread writes. The
+    SQL statements are constant, so sqlite3 prepares each of them once per
+    connection and reuses it from its statement cache.
+
+    Other processes, such as the scanner, may write the database too. Their
+    changes are noticed by PRAGMA data_version, checked at most once per
+    check interval, which drops the whole cache; until then the cache may
+    serve entries they changed.
+    """
+    def __init__(self, path: str, lru_size: int = DEFAULT_LRU_SIZE,
+                 check_interval: float = DEFAULT_CHANGE_CHECK_INTERVAL) -> None:
+        """
+        Open (and create if needed) the database.
+
+        :param path: Path to the SQLite database file.
+        :param lru_size: Number of recently read entries kept in memory, 0 to disable the cache.
+        :param check_interval: Seconds between checks for changes written by other connections.
+        """
+        self.path = path
+        self.lru_size = lru_size
+        self.check_interval = check_interval
+        self._lru: OrderedDict[str, FileMetadata] = OrderedDict()
+        self._lru_lock = threading.Lock()
+        # Incremented on every change, so a read racing with a change does not cache the old entry
+        self._generation = 0
+        self._local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        _stores.add(self)
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            " uuid TEXT PRIMARY KEY,"
+            " create_datetime TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " mimetype TEXT NOT NULL,"
+            " name TEXT NOT NULL,"
+            " path TEXT NOT NULL)"
+            " WITHOUT ROWID"
+        )
+        self._version_lock = threading.Lock()
+        self._version_connection: sqlite3.Connection | None = None
+        self._data_version = self._read_data_version()
+        self._next_check = time.monotonic() + check_interval
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        Return the connection of the current thread, opening it on first use.
+        """
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            with self._connections_lock:
+                self._connections.append(connection)
+        return connection
+
+    def _after_fork(self) -> None:
+        """
+        Let a forked process open its own connections instead of those of the parent.
+
+        The inherited connections are not closed, closing them could checkpoint
+        and remove the WAL file while the parent still uses the database.
+        """
+        _inherited_connections.extend(self._connections)
+        if self._version_connection is not None:
+            _inherited_connections.append(self._version_connection)
+            self._version_connection = None
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._lru_lock = threading.Lock()
+        self._version_lock = threading.Lock()
+        self._local = threading.local()
+
+    def close(self) -> None:
+        """
+        Close the connections of all threads.
+        """
+        with self._connections_lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
+        with self._version_lock:
+            if self._version_connection is not None:
+                self._version_connection.close()
+                self._version_connection = None
+        self._local = threading.local()
+
+    def version(self) -> int:
+        self._check_changes()
+        return self._generation
+
+    def get(self, uuid: str) -> FileMetadata | None:
+        self._check_changes()
+        with self._lru_lock:
+            file_metadata = self._lru.get(uuid)
+            if file_metadata is not None:
+                self._lru.move_to_end(uuid)
+                return file_metadata
+            generation = self._generation
+
+        row = self._connection().execute(
+            "SELECT uuid, create_datetime, size, mimetype, name, path FROM files WHERE uuid = ?", (uuid,)
+        ).fetchone()
+        if row is None:
+            return None
+        file_metadata = FileMetadata(*row)
+        self._remember(file_metadata, generation)
+        return file_metadata
+
+    def add(self, file_metadata: FileMetadata) -> None:
+        self.add_many([file_metadata])
+
+    def add_many(self, files_metadata: Iterable[FileMetadata]) -> None:
+        """
+        Add or replace the metadata of many files with batched inserts.
+
+        Each batch of INSERT_BATCH_SIZE rows is written by one executemany in
+        one transaction, which is orders of magnitude faster than committing
+        every row.
+
+        :param files_metadata: Metadata of the files.
+        """
+        connection = self._connection()
+        for batch in self._batches(files_metadata):
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                connection.executemany(
+                    "INSERT OR REPLACE INTO files (uuid, create_datetime, size, mimetype, name, path)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    [(f.uuid, f.create_datetime, f.size, f.mimetype, f.name, f.path) for f in batch]
+                )
+                connection.execute("COMMIT")
+            except sqlite3.Error:
+                connection.execute("ROLLBACK")
+                raise
+            self._forget(f.uuid for f in batch)
+
+    def delete(self, uuid: str) -> None:
+        self._connection().execute("DELETE FROM files WHERE uuid = ?", (uuid,))
+        self._forget([uuid])
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    def __iter__(self) -> Iterator[FileMetadata]:
+        cursor = self._connection().execute("SELECT uuid, create_datetime, size, mimetype, name, path FROM files")
+        return (FileMetadata(*row) for row in cursor)
+
+    def _remember(self, file_metadata: FileMetadata, generation: int) -> None:
+        """
+        Put an entry read from the database in the LRU cache, evicting the oldest ones over its size.
+
+        :param file_metadata: Metadata read from the database.
+        :param generation: Change counter at the time of the read.
+        """
+        if self.lru_size <= 0:
+            return
+        with self._lru_lock:
+            if generation != self._generation:
+                return
+            self._lru[file_metadata.uuid] = file_metadata
+            self._lru.move_to_end(file_metadata.uuid)
+            while len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
+
+    def _forget(self, uuids: Iterable[str] | None) -> None:
+        """
+        Drop changed entries from the LRU cache.
+
+        :param uuids: UUIDs of the changed files, or None to drop all entries.
+        """
+        with self._lru_lock:
+            self._generation += 1
+            if uuids is None:
+                self._lru.clear()
+                return
+            for uuid in uuids:
+                self._lru.pop(uuid, None)
+
+    def _read_data_version(self) -> int:
+        """
+        Return the data version of the database, which changes when another connection commits a change.
+
+        It is read on a connection of its own which never writes, so that
+        changes of every other connection, in this process or another one,
+        change it. The caller holds the version lock, or no other thread
+        uses the store yet.
+        """
+        if self._version_connection is None:
+            self._version_connection = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False,
+                                                       isolation_level=None)
+        return self._version_connection.execute("PRAGMA data_version").fetchone()[0]
+
+    def _check_changes(self) -> None:
+        """
+        Drop the LRU cache if the database changed since the last check, at most once per check interval.
+        """
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        with self._version_lock:
+            if now < self._next_check:
+                return
+            self._next_check = now + self.check_interval
+            data_version = self._read_data_version()
+            changed = data_version != self._data_version
+            self._data_version = data_version
+        if changed:
+            self._forget(None)
+
+    @staticmethod
+    def _batches(files_metadata: Iterable[FileMetadata]) -> Iterator[list[FileMetadata]]:
+        """
+        Split metadata into lists of at most INSERT_BATCH_SIZE entries.
+
+        :param files_metadata: Metadata of the files.
+        """
+        batch: list[FileMetadata] = []
+        for file_metadata in files_metadata:
+            batch.append(file_metadata)
+            if len(batch) >= INSERT_BATCH_SIZE:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
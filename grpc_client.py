@@ -1,22 +1,181 @@
+import time
+import threading
+from typing import Iterator
 import grpc
 import service_file_pb2
 import service_file_pb2_grpc
+from config import DEFAULT_CHUNK_SIZE, GRPC_COMPRESSION_METADATA
+from timings import Timings, NO_TIMINGS
+from retry import RetryPolicy, DEFAULT_RETRY_POLICY
+
+# Seconds to wait for the channel when measuring the connection setup
+CONNECT_TIMEOUT = 10
+
+# Name of the service in service_file.proto, which declares no package
+SERVICE_NAME = 'File'
+
+def call_compression(compression: str | None) -> tuple[grpc.Compression, tuple]:
+    """
+    Return the channel compression and the call metadata for the requested compression.
+
+    The server compresses replies only for calls carrying the opt-in metadata.
+    gRPC has no zstd codec, so only gzip is supported.
+
+    :param compression: 'gzip' or None for no compression.
+    :raises ValueError: If the compression is not supported by gRPC.
+    """
+    match compression:
+        case None:
+            return grpc.Compression.NoCompression, ()
+        case 'gzip':
+            return grpc.Compression.Gzip, ((GRPC_COMPRESSION_METADATA, 'gzip'),)
+        case _:
+            raise ValueError(f"Compression {compression} is not supported by the gRPC backend, use gzip.")
+
+def is_not_found(error: grpc.RpcError) -> bool:
+    """
+    Check whether a call failed because the server has no file with the requested UUID.
+
+    :param error: Error raised by the call.
+    """
+    code = getattr(error, 'code', None)
+    return code is not None and code() == grpc.StatusCode.NOT_FOUND
+
+class ReplyChunks:
+    """
+    Content of a streaming read call, iterable in chunks.
+
+    Closing it cancels the call so the server stops sending, also if it is
+    closed before it was iterated. With an idle timeout, the call is
+    cancelled when the server sends no reply for that long, like the REST
+    timeout between bytes.
+    """
+    def __init__(self, response, idle_timeout: float | None = None) -> None:
+        """
+        Initialize the chunks of a call.
+
+        :param response: Streaming read call.
+        :param idle_timeout: Seconds to wait for each reply, or None for no limit.
+        """
+        self.response = response
+        self.idle_timeout = idle_timeout
+        self.first_chunk = None
+        self._waiting_since: float | None = None
+        self._timed_out = False
+        self._closed = threading.Event()
+        if idle_timeout is not None:
+            threading.Thread(target=self._watch, name='grpc-idle-timeout', daemon=True).start()
+
+    def next_reply(self):
+        """
+        Wait for the next reply of the call.
+
+        :return: Reply, or None at the end of the call.
+        :raises TimeoutError: If no reply arrived within the idle timeout.
+        """
+        self._waiting_since = time.monotonic()
+        try:
+            return next(self.response, None)
+        except grpc.RpcError:
+            if self._timed_out:
+                raise TimeoutError(f"No reply from the server for {self.idle_timeout} seconds.") from None
+            raise
+        finally:
+            self._waiting_since = None
+
+    def __iter__(self) -> Iterator[bytes]:
+        return self
+
+    def __next__(self) -> bytes:
+        try:
+            if self.first_chunk is not None:
+                chunk, self.first_chunk = self.first_chunk, None
+            else:
+                chunk = self.next_reply()
+                if chunk is None:
+                    raise StopIteration
+            return chunk.data.data
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        self._closed.set()
+        self.response.cancel()
+
+    def _watch(self) -> None:
+        """
+        Cancel the call once a reply has been awaited for longer than the idle timeout.
+        """
+        delay = self.idle_timeout
+        while not self._closed.wait(delay):
+            waiting_since = self._waiting_since
+            if waiting_since is None:
+                delay = self.idle_timeout
+                continue
+            delay = waiting_since + self.idle_timeout - time.monotonic()
+            if delay <= 0:
+                self._timed_out = True
+                self.response.cancel()
+                return
 
 class GrpcClient:
     """
     Client for interacting with the gRPC backend.
     """
 
-    def __init__(self, server_address):
+    def __init__(self, server_address, chunk_size=DEFAULT_CHUNK_SIZE, timings: Timings = NO_TIMINGS,
+                 compression: str = None, retry_policy: RetryPolicy = DEFAULT_RETRY_POLICY):
         """
         Initialize the gRPC client with the server address.
 
         :param server_address: Address of the gRPC server.
+        :param chunk_size: Maximum size of a chunk requested from the server.
+        :param timings: Recorder of the connect, send and ttfb phases of each call.
+        :param compression: Compress the channel and ask for compressed replies with 'gzip', or None.
+        :param retry_policy: Timeouts, deadline and retries of the calls, retried natively by the channel.
         """
         self.server_address = server_address
-        self.channel = grpc.insecure_channel(self.server_address)
+        self.chunk_size = chunk_size
+        self.timings = timings
+        self.retry_policy = retry_policy
+        self._connected = False
+        channel_compression, self.metadata = call_compression(compression)
+        self.channel = grpc.insecure_channel(self.server_address, compression=channel_compression,
+                                             options=retry_policy.grpc_options(SERVICE_NAME))
         self.stub = service_file_pb2_grpc.FileStub(self.channel)  # Corrected to FileStub
 
+    def close(self):
+        """
+        Close the channel to the server.
+        """
+        self.channel.close()
+
+    def _connect(self):
+        """
+        Wait for the channel to connect on first use when timings are recorded.
+
+        The channel otherwise connects lazily inside the first call, which
+        would hide the connection setup in the time to first byte.
+        """
+        if self.timings.enabled and not self._connected:
+            with self.timings.span('connect', host=self.server_address):
+                try:
+                    grpc.channel_ready_future(self.channel).result(timeout=CONNECT_TIMEOUT)
+                except grpc.FutureTimeoutError:
+                    # Let the call itself report the unavailable server
+                    return
+            self._connected = True
+
+    def _unary_timeout(self) -> float | None:
+        """
+        Return the timeout of a unary call.
+
+        A gRPC timeout covers all attempts of the call, so it is the per-call
+        timeout shortened to the operation deadline.
+        """
+        return self.retry_policy.call_timeout(self.retry_policy.start())
+
     def get_file_stat(self, uuid):
         """
         Get file metadata from the server.
@@ -25,12 +184,28 @@ class GrpcClient:
         :return: File metadata.
         """
         request = service_file_pb2.StatRequest(uuid=service_file_pb2.Uuid(value=uuid))
-        response = self.stub.stat(request)
+        self._connect()
+        try:
+            with self.timings.span('ttfb'):
+                response = self.stub.stat(request, metadata=self.metadata, timeout=self._unary_timeout())
+        except grpc.RpcError as e:
+            if is_not_found(e):
+                raise FileNotFoundError(f"File with UUID {uuid} not found.") from e
+            raise
+        return self._stat_dict(response.data)
+
+    @staticmethod
+    def _stat_dict(data) -> dict:
+        """
+        Return file metadata received from the server as a dictionary.
+
+        :param data: StatReply.Data message.
+        """
         return {
-            'name': response.data.name,
-            'size': response.data.size,
-            'create_datetime': response.data.create_datetime,
-            'mimetype': response.data.mimetype
+            'name': data.name,
+            'size': data.size,
+            'create_datetime': data.create_datetime.ToJsonString(),
+            'mimetype': data.mimetype
         }
 
     def read_file(self, uuid):
@@ -40,7 +215,83 @@ class GrpcClient:
         :param uuid: UUID of the file.
         :return: File name and file content.
         """
-        request = service_file_pb2.ReadRequest(uuid=service_file_pb2.Uuid(value=uuid))
-        response = self.stub.read(request)
-        for file_chunk in response:
-            return file_chunk.data.data
+        file_name, chunks = self.read_file_stream(uuid)
+        return file_name, b''.join(chunks)
+
+    def read_file_stream(self, uuid, offset: int = 0) -> tuple[str, Iterator[bytes]]:
+        """
+        Read file content from the server chunk by chunk.
+
+        The first chunk is fetched eagerly so that errors (e.g. NOT_FOUND,
+        raised as FileNotFoundError) are raised before the caller starts writing any output. The read reply
+        carries no file name, so the UUID is returned in its place. The
+        timeout of the call bounds the whole transfer, so it is the operation
+        deadline, while the per-call timeout applies to each reply.
+
+        :param uuid: UUID of the file.
+        :param offset: Offset of the first byte to read, used to resume an interrupted read.
+        :return: File name and an iterator over the file content chunks.
+        """
+        request = service_file_pb2.ReadRequest(
+            uuid=service_file_pb2.Uuid(value=uuid),
+            size=self.chunk_size,
+            offset=offset
+        )
+        self._connect()
+        with self.timings.span('send'):
+            response = self.stub.read(request, metadata=self.metadata, timeout=self.retry_policy.deadline)
+        chunks = ReplyChunks(response, self.retry_policy.timeout)
+        try:
+            with self.timings.span('ttfb'):
+                chunks.first_chunk = chunks.next_reply()
+        except grpc.RpcError as e:
+            chunks.close()
+            if is_not_found(e):
+                raise FileNotFoundError(f"File with UUID {uuid} not found.") from e
+            raise
+        except BaseException:
+            chunks.close()
+            raise
+        if chunks.first_chunk is None:
+            chunks.close()
+            return uuid, iter(())
+        return uuid, chunks
+
+    def stat_read_file(self, uuid) -> tuple[dict, Iterator[bytes]]:
+        """
+        Get file metadata and read file content from the server with a single call.
+
+        The metadata arrives in the first reply of the stream, so it costs no
+        round trip of its own.
+
+        :param uuid: UUID of the file.
+        :return: Metadata dictionary and an iterator over the file content chunks.
+        :raises ValueError: If the first reply carries no metadata.
+        """
+        request = service_file_pb2.ReadRequest(
+            uuid=service_file_pb2.Uuid(value=uuid),
+            size=self.chunk_size
+        )
+        self._connect()
+        with self.timings.span('send'):
+            response = self.stub.stat_read(request, metadata=self.metadata, timeout=self.retry_policy.deadline)
+        chunks = ReplyChunks(response, self.retry_policy.timeout)
+        try:
+            with self.timings.span('ttfb'):
+                first_reply = chunks.next_reply()
+            if first_reply is None or first_reply.WhichOneof('reply') != 'stat':
+                raise ValueError(f"Server sent no metadata before the content of UUID {uuid}.")
+            chunks.first_chunk = chunks.next_reply()
+        except grpc.RpcError as e:
+            chunks.close()
+            if is_not_found(e):
+                raise FileNotFoundError(f"File with UUID {uuid} not found.") from e
+            raise
+        except BaseException:
+            chunks.close()
+            raise
+        stat_data = self._stat_dict(first_reply.stat)
+        if chunks.first_chunk is None:
+            chunks.close()
+            return stat_data, iter(())
+        return stat_data, chunks
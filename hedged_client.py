@@ -0,0 +1,235 @@
+"""
+Client sending each call to the faster of several backends serving the same files.
+
+Latency of every backend is tracked over a rolling window. A call goes to the
+backend with the lowest median latency; if it has not answered after the
+configured percentile of that backend's latency, a hedged duplicate is sent to
+the next backend and whichever answers first wins.
+"""
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from typing import Callable, Iterator
+from config import DEFAULT_HEDGE_PERCENTILE, DEFAULT_HEDGE_DELAY, DEFAULT_LATENCY_WINDOW
+
+# Samples needed before the latency of a backend is trusted
+MIN_SAMPLES = 5
+
+# Seconds added to the latency recorded for a failed call, so that failing backends rank last
+FAILURE_PENALTY = 1.0
+
+class LatencyTracker:
+    """
+    Rolling window of call latencies of one backend.
+    """
+    def __init__(self, window: int = DEFAULT_LATENCY_WINDOW) -> None:
+        """
+        Initialize an empty window.
+
+        :param window: Number of most recent latencies kept.
+        """
+        self.samples: deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def add(self, latency: float) -> None:
+        """
+        Record the latency of a finished call.
+
+        :param latency: Latency in seconds.
+        """
+        with self._lock:
+            self.samples.append(latency)
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+    def percentile(self, percent: float) -> float | None:
+        """
+        Return the given percentile of the recorded latencies.
+
+        :param percent: Percentile between 0 and 100.
+        :return: Latency in seconds, or None without enough samples.
+        """
+        with self._lock:
+            if len(self.samples) < MIN_SAMPLES:
+                return None
+            ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(percent / 100 * len(ordered)))]
+
+class HedgedClient:
+    """
+    Backend client dispatching calls to several equivalent backends.
+    """
+    def __init__(self, clients: dict[str, object], hedge_percentile: float = DEFAULT_HEDGE_PERCENTILE,
+                 hedge_delay: float = DEFAULT_HEDGE_DELAY, window: int = DEFAULT_LATENCY_WINDOW,
+                 max_workers: int = None) -> None:
+        """
+        Initialize the client over already created backend clients.
+
+        :param clients: Backend clients by backend name, in order of preference without measurements.
+        :param hedge_percentile: Percentile of the primary backend latency after which a hedged call is sent.
+        :param hedge_delay: Delay before a hedged call while the primary backend has too few measurements.
+        :param window: Number of most recent latencies kept per backend.
+        :param max_workers: Maximum number of backend calls in flight, up to one per backend for each caller.
+        """
+        self.clients = clients
+        self.hedge_percentile = hedge_percentile
+        self.hedge_delay = hedge_delay
+        self.latencies: dict[str, LatencyTracker] = {name: LatencyTracker(window) for name in clients}
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='hedged-client')
+
+    def close(self) -> None:
+        """
+        Stop the worker threads and close all backend clients.
+        """
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        for client in self.clients.values():
+            client.close()
+
+    def get_file_stat(self, uuid):
+        """
+        Get file metadata by UUID from the fastest backend.
+
+        :param uuid: UUID of the file.
+        """
+        return self._call(lambda client: client.get_file_stat(uuid))
+
+    def read_file(self, uuid):
+        """
+        Read file content by UUID from the fastest backend.
+
+        :param uuid: UUID of the file.
+        """
+        file_name, chunks = self.read_file_stream(uuid)
+        return file_name, b''.join(chunks)
+
+    def read_file_stream(self, uuid, offset: int = 0) -> tuple[str, Iterator[bytes]]:
+        """
+        Read file content by UUID chunk by chunk from the fastest backend.
+
+        Only opening the stream is hedged, the content then comes from the
+        winning backend. The stream of a losing backend is closed unread.
+
+        :param uuid: UUID of the file.
+        :param offset: Offset of the first byte to read.
+        :return: File name and an iterator over the file content chunks.
+        """
+        if offset:
+            return self._call(lambda client: client.read_file_stream(uuid, offset=offset), self._close_stream)
+        return self._call(lambda client: client.read_file_stream(uuid), self._close_stream)
+
+    def stat_read_file(self, uuid) -> tuple[dict, Iterator[bytes]]:
+        """
+        Get file metadata and read file content by UUID with a single call to the fastest backend.
+
+        :param uuid: UUID of the file.
+        :return: Metadata dictionary and an iterator over the file content chunks.
+        """
+        return self._call(lambda client: client.stat_read_file(uuid), self._close_stream)
+
+    def ranked_backends(self) -> list[str]:
+        """
+        Return backend names ordered from the fastest by median latency.
+
+        Backends with too few measurements come first, so that every backend
+        gets measured.
+        """
+        def rank(name: str) -> tuple[int, float]:
+            median = self.latencies[name].percentile(50)
+            return (0, 0.0) if median is None else (1, median)
+        return sorted(self.clients, key=rank)
+
+    def _hedge_delay(self, name: str) -> float:
+        """
+        Return how long to wait for a backend before sending a hedged call.
+
+        :param name: Name of the primary backend.
+        """
+        delay = self.latencies[name].percentile(self.hedge_percentile)
+        return self.hedge_delay if delay is None else delay
+
+    def _call(self, call: Callable[[object], object], discard: Callable[[object], None] = None):
+        """
+        Run a call on the fastest backend, hedged on the next ones.
+
+        A hedged call is sent when the current calls have not answered in
+        time or when one of them failed with anything but FileNotFoundError,
+        which every backend would report alike.
+
+        :param call: Function calling a backend client.
+        :param discard: Function releasing the result of a call which lost the race.
+        :return: Result of the first successful call.
+        """
+        backends = self.ranked_backends()
+        pending: dict[Future, str] = {}
+        errors: list[Exception] = []
+
+        def submit(name: str) -> None:
+            future = self.executor.submit(self._timed, name, call)
+            pending[future] = name
+
+        submit(backends.pop(0))
+        delay = self._hedge_delay(pending[next(iter(pending))])
+        while pending:
+            done, _ = wait(pending, timeout=delay if backends else None, return_when=FIRST_COMPLETED)
+            if not done:
+                submit(backends.pop(0))
+                continue
+            for future in done:
+                pending.pop(future)
+                error = future.exception()
+                if error is None:
+                    for loser in pending:
+                        loser.add_done_callback(lambda f: self._discard(f, discard))
+                    return future.result()
+                if isinstance(error, FileNotFoundError):
+                    raise error
+                errors.append(error)
+                if backends:
+                    submit(backends.pop(0))
+        raise errors[0]
+
+    def _timed(self, name: str, call: Callable[[object], object]):
+        """
+        Run a call on one backend and record its latency.
+
+        A missing file is an answer like any other, other failures are
+        recorded with a penalty.
+
+        :param name: Name of the backend.
+        :param call: Function calling a backend client.
+        """
+        start = time.perf_counter()
+        try:
+            result = call(self.clients[name])
+        except FileNotFoundError:
+            self.latencies[name].add(time.perf_counter() - start)
+            raise
+        except Exception:
+            self.latencies[name].add(time.perf_counter() - start + FAILURE_PENALTY)
+            raise
+        self.latencies[name].add(time.perf_counter() - start)
+        return result
+
+    @staticmethod
+    def _discard(future: Future, discard: Callable[[object], None] | None) -> None:
+        """
+        Release the result of a call which lost the race.
+
+        :param future: Finished losing call.
+        :param discard: Function releasing the result, or None.
+        """
+        if discard is not None and not future.cancelled() and future.exception() is None:
+            discard(future.result())
+
+    @staticmethod
+    def _close_stream(result: tuple[str, Iterator[bytes]]) -> None:
+        """
+        Close the content stream of a read which lost the race.
+
+        :param result: File name or metadata, and content iterator.
+        """
+        close = getattr(result[1], 'close', None)
+        if close is not None:
+            close()
@@ -0,0 +1,149 @@
+import os
+import sys
+import errno
+from typing import BinaryIO, Iterable, Iterator
+from config import DEFAULT_CHUNK_SIZE
+
+class FileChunks:
+    """
+    Remaining content of an open local file, iterable in chunks.
+
+    An OutputSink copies it with os.sendfile instead of iterating, so the
+    bytes are moved by the kernel without passing through Python.
+    """
+    def __init__(self, file: BinaryIO, chunk_size: int = DEFAULT_CHUNK_SIZE) -> None:
+        """
+        Initialize the chunks from the current position of the file to its end.
+
+        :param file: Open binary file.
+        :param chunk_size: Maximum size of a chunk when iterated.
+        """
+        self.file = file
+        self.chunk_size = chunk_size
+        self.offset: int = file.tell()
+        self.size: int = os.fstat(file.fileno()).st_size - self.offset
+
+    def __iter__(self) -> Iterator[bytes]:
+        with self.file:
+            self.file.seek(self.offset)
+            while chunk := self.file.read(self.chunk_size):
+                yield chunk
+
+    def fileno(self) -> int:
+        return self.file.fileno()
+
+    def close(self) -> None:
+        self.file.close()
+
+class OutputSink:
+    """
+    Raw byte sink writing to the stdout file descriptor or an output file.
+
+    Content is written unchanged, without any decoding, and chunks are passed
+    to the operating system as they are instead of being copied into a
+    text layer.
+    """
+    def __init__(self, output: str, append: bool = False) -> None:
+        """
+        Open the output destination.
+
+        :param output: Output file path or '-' for stdout.
+        :param append: Append to the output file instead of overwriting it.
+        """
+        self.output = output
+        if output == '-':
+            # Flush any text already written through sys.stdout before writing to its descriptor
+            sys.stdout.flush()
+            self.file = None
+        else:
+            self.file = open(output, 'ab' if append else 'wb')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self) -> None:
+        """
+        Close the output file; stdout stays open.
+        """
+        if self.file is not None:
+            self.file.close()
+
+    def fileno(self) -> int:
+        """
+        Return the file descriptor of the output, flushing any buffered bytes first.
+        """
+        if self.file is None:
+            return sys.stdout.fileno()
+        self.file.flush()
+        return self.file.fileno()
+
+    def write(self, chunk: bytes) -> None:
+        """
+        Write a chunk of bytes to the output.
+
+        :param chunk: Bytes to write.
+        """
+        if self.file is not None:
+            self.file.write(chunk)
+            return
+        fd = self.fileno()
+        view = memoryview(chunk)
+        while view:
+            view = view[os.write(fd, view):]
+
+    def write_all(self, chunks: Iterable[bytes]) -> None:
+        """
+        Write all chunks to the output, using os.sendfile for local files.
+
+        :param chunks: Chunks of content, or FileChunks of a local file.
+        """
+        if isinstance(chunks, FileChunks) and self._sendfile(chunks):
+            return
+        for chunk in chunks:
+            self.write(chunk)
+
+    def preallocate(self, size: int) -> None:
+        """
+        Reserve disk space for size more bytes of the output file.
+
+        Preallocation is an optimization only; it is skipped for stdout and on
+        file systems which do not support it.
+
+        :param size: Number of bytes to reserve after the current end of the file.
+        """
+        if self.file is None or size <= 0 or not hasattr(os, 'posix_fallocate'):
+            return
+        fd = self.fileno()
+        try:
+            os.posix_fallocate(fd, os.fstat(fd).st_size, size)
+        except OSError:
+            pass
+
+    def _sendfile(self, chunks: FileChunks) -> bool:
+        """
+        Copy a local file region to the output inside the kernel.
+
+        :param chunks: Region of the local file.
+        :return: True if the region was copied, False if sendfile cannot be used
+                 and nothing was written.
+        """
+        out_fd = self.fileno()
+        offset, remaining = chunks.offset, chunks.size
+        self.preallocate(remaining)
+        try:
+            while remaining > 0:
+                sent = os.sendfile(out_fd, chunks.fileno(), offset, remaining)
+                if sent == 0:
+                    break
+                offset += sent
+                remaining -= sent
+        except OSError as e:
+            if offset == chunks.offset and e.errno in (errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP):
+                # E.g. an output file opened in append mode, fall back to copying through Python
+                return False
+            raise
+        chunks.close()
+        return True
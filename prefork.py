@@ -0,0 +1,497 @@
+#!/usr/bin/env python3
+"""
+Production launcher running the REST or gRPC server in several worker processes.
+
+The master process loads the application and its file index once, freezes
+the loaded objects out of the garbage collector and forks the workers, which
+share the index copy-on-write. The compact metadata store (FILE_METADATA_COMPACT=1)
+keeps it in a few large arrays, so workers touch few of its pages; objects
+of the dictionary store get copied as their reference counts change.
+
+REST workers accept connections from a socket bound by the master, or with
+--reuse-port each bind their own SO_REUSEPORT socket and the kernel spreads
+connections among them. REST workers offer wsgi.file_wrapper, so files are
+sent with sendfile after the response headers unless the body is compressed
+or has no Content-Length. gRPC workers always listen with SO_REUSEPORT, a
+gRPC server cannot be created before the fork.
+
+Signals of the master:
+    SIGHUP          reload the application and its index, start new workers and
+                    stop the old ones gracefully
+    SIGTERM, SIGINT stop the workers gracefully and exit
+
+Workers stop accepting connections on SIGTERM, finish the requests in progress
+and are killed if they are not done within the graceful timeout.
+
+Usage: python prefork.py {rest,grpc} [--host HOST] [--port PORT] [--workers N]
+                         [--threads N] [--reuse-port] [--graceful-timeout SECONDS]
+"""
+import os
+import gc
+import sys
+import time
+import errno
+import select
+import signal
+import socket
+import logging
+import argparse
+import functools
+import importlib
+import threading
+from typing import Callable
+from werkzeug.serving import make_server, select_address_family, get_sockaddr, WSGIRequestHandler
+from werkzeug.wsgi import FileWrapper
+
+# Exit status of a worker which could not start serving; the master then gives up
+WORKER_BOOT_ERROR = 3
+
+# Seconds a worker may take to finish its requests after SIGTERM before it is killed
+DEFAULT_GRACEFUL_TIMEOUT = 30.0
+
+# Length of the accept queue of the listening sockets
+LISTEN_BACKLOG = 2048
+
+# Seconds a REST connection may stay idle before the worker closes it
+IDLE_TIMEOUT = 30.0
+
+# Signals the master handles
+MASTER_SIGNALS: tuple[signal.Signals, ...] = (signal.SIGHUP, signal.SIGTERM, signal.SIGINT, signal.SIGCHLD)
+
+# Signals stopping a worker
+WORKER_SIGNALS: set[signal.Signals] = {signal.SIGTERM, signal.SIGINT}
+
+logger = logging.getLogger('prefork')
+
+class Prefork:
+    """
+    Master process forking workers which serve a preloaded application.
+    """
+
+    def __init__(self, load: Callable[[], object], start: Callable[[object], Callable[[], None]], workers: int,
+                 graceful_timeout: float = DEFAULT_GRACEFUL_TIMEOUT) -> None:
+        """
+        Initialize the master.
+
+        :param load: Function loading the application in the master, called again on SIGHUP.
+        :param start: Function starting to serve the application in a worker, in background threads.
+                      It returns a function which stops serving gracefully and blocks until it is done.
+        :param workers: Number of worker processes.
+        :param graceful_timeout: Seconds a stopped worker may take before it is killed.
+        """
+        if workers < 1:
+            raise ValueError("At least one worker is needed.")
+        self.load = load
+        self.start = start
+        self.workers = workers
+        self.graceful_timeout = graceful_timeout
+        self.app: object | None = None
+        self._current: set[int] = set()  # workers serving the current application
+        self._stopping: dict[int, float] = {}  # stopped workers and when they are killed
+        self._signals: list[int] = []
+        self._wakeup_read: int | None = None
+        self._wakeup_write: int | None = None
+
+    def run(self) -> bool:
+        """
+        Load the application, start the workers and manage them until the master is stopped.
+
+        :return: True if the master was stopped by a signal, False if a worker could not start serving.
+        """
+        self.app = self.load()
+        self._freeze()
+        self._wakeup_read, self._wakeup_write = os.pipe()
+        os.set_blocking(self._wakeup_read, False)
+        os.set_blocking(self._wakeup_write, False)
+        signal.set_wakeup_fd(self._wakeup_write)
+        for signum in MASTER_SIGNALS:
+            signal.signal(signum, self._on_signal)
+        logger.info("Master %d started.", os.getpid())
+        booted = True
+        try:
+            self._spawn_workers()
+            while True:
+                self._wait()
+                if not self._handle_signals():
+                    break
+                if not self._reap():
+                    booted = False
+                    break
+                self._kill_overdue()
+        finally:
+            self._stop_all()
+            signal.set_wakeup_fd(-1)
+            for signum in MASTER_SIGNALS:
+                signal.signal(signum, signal.SIG_DFL)
+            os.close(self._wakeup_read)
+            os.close(self._wakeup_write)
+        logger.info("Master %d stopped.", os.getpid())
+        return booted
+
+    def _on_signal(self, signum: int, frame) -> None:
+        self._signals.append(signum)
+
+    def _wait(self) -> None:
+        """
+        Sleep until a signal arrives or a stopped worker is due to be killed.
+        """
+        timeout = 1.0
+        if self._stopping:
+            timeout = min(timeout, max(min(self._stopping.values()) - time.monotonic(), 0.0))
+        if not self._signals:
+            select.select([self._wakeup_read], [], [], timeout)
+        try:
+            while os.read(self._wakeup_read, 4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def _handle_signals(self) -> bool:
+        """
+        Act on the signals received since the last call.
+
+        :return: False if the master should stop.
+        """
+        while self._signals:
+            signum = self._signals.pop(0)
+            if signum in (signal.SIGTERM, signal.SIGINT):
+                logger.info("Master %d stopping.", os.getpid())
+                return False
+            if signum == signal.SIGHUP:
+                self._reload()
+        return True
+
+    def _reload(self) -> None:
+        """
+        Load the application again, replace the workers by new ones and stop the old ones gracefully.
+        """
+        logger.info("Reloading.")
+        gc.unfreeze()
+        previous_app, self.app = self.app, None
+        try:
+            self.app = self.load()
+        except Exception:
+            logger.exception("Reload failed, the workers keep serving.")
+            self.app = previous_app
+            self._freeze()
+            return
+        del previous_app
+        self._freeze()
+        old_workers = self._current
+        self._current = set()
+        self._spawn_workers()
+        self._stop_workers(old_workers)
+
+    @staticmethod
+    def _freeze() -> None:
+        """
+        Move the loaded objects out of the reach of the garbage collector, whose
+        bookkeeping would otherwise copy their pages into every worker.
+        """
+        gc.collect()
+        gc.freeze()
+
+    def _spawn_workers(self) -> None:
+        while len(self._current) < self.workers:
+            self._current.add(self._spawn_worker())
+
+    def _spawn_worker(self) -> int:
+        """
+        Fork a worker serving the current application.
+
+        Signals are blocked across the fork, so a worker never runs the handlers of the master.
+
+        :return: PID of the worker.
+        """
+        mask = signal.pthread_sigmask(signal.SIG_BLOCK, MASTER_SIGNALS)
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 1
+            try:
+                exit_code = self._run_worker()
+            except BaseException:
+                logger.exception("Worker %d failed.", os.getpid())
+            finally:
+                logging.shutdown()
+                os._exit(exit_code)
+        signal.pthread_sigmask(signal.SIG_SETMASK, mask)
+        logger.info("Worker %d started.", pid)
+        return pid
+
+    def _run_worker(self) -> int:
+        """
+        Serve in a forked worker until it is told to stop.
+
+        :return: Exit status of the worker.
+        """
+        signal.set_wakeup_fd(-1)
+        for signum in MASTER_SIGNALS:
+            signal.signal(signum, signal.SIG_DFL)
+        os.close(self._wakeup_read)
+        os.close(self._wakeup_write)
+        # Stop signals stay blocked in every thread and are taken by sigwait below
+        signal.pthread_sigmask(signal.SIG_SETMASK, WORKER_SIGNALS)
+        try:
+            stop = self.start(self.app)
+        except Exception:
+            logger.exception("Worker %d could not start serving.", os.getpid())
+            return WORKER_BOOT_ERROR
+        signal.sigwait(WORKER_SIGNALS)
+        stop()
+        return 0
+
+    def _reap(self) -> bool:
+        """
+        Collect exited workers and replace those which serve the current application.
+
+        :return: False if a worker could not start serving and the master should stop.
+        """
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return True
+            if pid == 0:
+                return True
+            self._stopping.pop(pid, None)
+            if pid not in self._current:
+                continue
+            self._current.discard(pid)
+            exit_code = os.waitstatus_to_exitcode(status)
+            if exit_code == WORKER_BOOT_ERROR:
+                logger.error("Worker %d could not start serving, stopping.", pid)
+                return False
+            logger.warning("Worker %d exited with status %d, replacing it.", pid, exit_code)
+            self._spawn_workers()
+
+    def _stop_workers(self, pids: set[int]) -> None:
+        """
+        Ask workers to stop gracefully and note when they are to be killed.
+
+        :param pids: PIDs of the workers.
+        """
+        deadline = time.monotonic() + self.graceful_timeout
+        for pid in pids:
+            self._signal(pid, signal.SIGTERM)
+            self._stopping[pid] = deadline
+
+    def _kill_overdue(self) -> None:
+        """
+        Kill stopped workers which did not finish within the graceful timeout.
+        """
+        now = time.monotonic()
+        for pid, deadline in list(self._stopping.items()):
+            if deadline <= now:
+                logger.warning("Worker %d did not stop in time, killing it.", pid)
+                self._signal(pid, signal.SIGKILL)
+                self._stopping[pid] = float('inf')
+
+    def _stop_all(self) -> None:
+        """
+        Stop all workers gracefully, kill those which do not finish in time, and wait for them.
+        """
+        self._stop_workers(self._current)
+        self._current = set()
+        while self._stopping:
+            self._kill_overdue()
+            self._reap()
+            if self._stopping:
+                time.sleep(0.05)
+
+    def _signal(self, pid: int, signum: int) -> None:
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            self._stopping.pop(pid, None)
+
+class _RequestHandler(WSGIRequestHandler):
+    """
+    Request handler closing connections which stay idle, so a stopping worker is not held up by them,
+    and offering a file wrapper sent with sendfile.
+    """
+    timeout = IDLE_TIMEOUT
+
+    def make_environ(self) -> dict:
+        environ = super().make_environ()
+        # Content-Length of the response, once its headers are sent
+        self.sent_content_length: int | None = None
+        environ['wsgi.file_wrapper'] = functools.partial(_SendfileWrapper, self)
+        return environ
+
+    def send_header(self, keyword: str, value: str) -> None:
+        if keyword.lower() == 'content-length':
+            self.sent_content_length = int(value)
+        super().send_header(keyword, value)
+
+class _SendfileWrapper(FileWrapper):
+    """
+    File wrapper sending Content-Length bytes from the current position of the file with sendfile.
+
+    Its first chunk is empty, on which the server sends the headers. The file
+    is then sent directly to the socket if the headers carry a Content-Length,
+    which they do not when the body is chunked or transformed on the way, as
+    by compression; it is then read in blocks as by the default wrapper.
+    """
+
+    def __init__(self, handler: _RequestHandler, file, buffer_size: int = 8192) -> None:
+        """
+        :param handler: Handler of the request.
+        :param file: File opened in binary mode.
+        :param buffer_size: Size of the blocks read when the file is not sent with sendfile.
+        """
+        super().__init__(file, buffer_size)
+        self.handler = handler
+        self._headers_pending = True
+        self._sent = False
+
+    def __next__(self) -> bytes:
+        if self._headers_pending:
+            self._headers_pending = False
+            return b''
+        if self._sent:
+            raise StopIteration()
+        length = self.handler.sent_content_length
+        try:
+            self.file.fileno()
+        except (AttributeError, OSError):
+            length = None
+        if length is None:
+            return super().__next__()
+        self._sent = True
+        if length:
+            self.handler.connection.sendfile(self.file, self.file.tell(), length)
+        raise StopIteration()
+
+def load_rest_app():
+    """
+    Import the REST application with its file index, or import it again to reload the index.
+    """
+    module = sys.modules.get('flask_server.server')
+    if module is None:
+        return importlib.import_module('flask_server.server').app
+    previous_store = module.file_service.store
+    app = importlib.reload(module).app
+    # The reloaded module opened a store of its own
+    previous_store.close()
+    return app
+
+def load_grpc_server():
+    """
+    Import the gRPC server module with its files, or import both again to reload them.
+    """
+    if 'server_grpc.grpc_server' not in sys.modules:
+        return importlib.import_module('server_grpc.grpc_server')
+    importlib.reload(sys.modules['server_grpc.file_data'])
+    return importlib.reload(sys.modules['server_grpc.grpc_server'])
+
+def rest_starter(host: str, port: int, reuse_port: bool) -> tuple[Callable[[object], Callable[[], None]], str]:
+    """
+    Prepare the listening socket of the REST workers and the function starting a worker.
+
+    :param host: Host to listen on.
+    :param port: Port to listen on, 0 for any free port when the socket is shared.
+    :param reuse_port: Let each worker bind its own socket with SO_REUSEPORT instead of sharing one.
+    :return: The function starting a worker and the address listened on.
+    """
+    family = select_address_family(host, port)
+    address = get_sockaddr(host, port, family)
+    listener = None
+    if not reuse_port:
+        listener = socket.create_server(address, family=family, backlog=LISTEN_BACKLOG)
+        address = listener.getsockname()
+
+    def start(app) -> Callable[[], None]:
+        """
+        Start serving the application from background threads.
+
+        :param app: The Flask application.
+        :return: Function stopping the server gracefully.
+        """
+        if listener is None:
+            worker_listener = socket.create_server(address, family=family, backlog=LISTEN_BACKLOG, reuse_port=True)
+        else:
+            worker_listener = listener
+        # The server works on a duplicate of the socket
+        server = make_server(host, port, app, threaded=True, request_handler=_RequestHandler,
+                             fd=worker_listener.fileno())
+        worker_listener.close()
+        # Join the request threads on server_close instead of abandoning them
+        server.daemon_threads = False
+        server.block_on_close = True
+        thread = threading.Thread(target=server.serve_forever, name='rest-server')
+        thread.start()
+
+        def stop() -> None:
+            server.shutdown()
+            thread.join()
+            server.server_close()
+            # Workers leave with os._exit, which skips the atexit hook writing the last records
+            request_log = app.extensions.get('request_log')
+            if request_log is not None:
+                request_log.stop()
+
+        return stop
+
+    return start, f"{address[0]}:{address[1]}"
+
+def grpc_starter(port: int, threads: int, graceful_timeout: float) -> Callable[[object], Callable[[], None]]:
+    """
+    Return the function starting a gRPC worker.
+
+    :param port: Port to listen on.
+    :param threads: Number of threads handling calls in each worker.
+    :param graceful_timeout: Seconds calls in progress may take after the worker is stopped.
+    """
+    def start(module) -> Callable[[], None]:
+        """
+        Start serving from the threads of the gRPC server.
+
+        :param module: The gRPC server module.
+        :return: Function stopping the server gracefully.
+        """
+        server = module.create_server(port, max_workers=threads, reuse_port=True)
+        server.start()
+        return lambda: server.stop(graceful_timeout).wait()
+
+    return start
+
+def main() -> None:
+    """
+    Parse command line arguments and run the master.
+    """
+    parser = argparse.ArgumentParser(description='Run the REST or gRPC server in several preforked worker processes.')
+    parser.add_argument('server', choices=['rest', 'grpc'], help='Server to run')
+    parser.add_argument('--host', default='127.0.0.1', help='Host of the REST server (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, help='Port to listen on (default: 5000 for REST, 50051 for gRPC)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Number of worker processes (default: number of CPUs)')
+    parser.add_argument('--threads', type=int, default=10,
+                        help='Number of threads handling calls in each gRPC worker (default: 10)')
+    parser.add_argument('--reuse-port', action='store_true',
+                        help='Let each REST worker listen on its own SO_REUSEPORT socket')
+    parser.add_argument('--graceful-timeout', type=float, default=DEFAULT_GRACEFUL_TIMEOUT,
+                        help=f'Seconds stopped workers may take to finish requests (default: {DEFAULT_GRACEFUL_TIMEOUT:g})')
+    args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(process)d] %(levelname)s %(message)s')
+    if args.server == 'rest':
+        try:
+            start, address = rest_starter(args.host, 5000 if args.port is None else args.port, args.reuse_port)
+        except OSError as e:
+            if e.errno != errno.EADDRINUSE:
+                raise
+            parser.exit(1, f"{e.strerror}\n")
+        logger.info("REST server listening on %s.", address)
+        prefork = Prefork(load_rest_app, start, args.workers, args.graceful_timeout)
+    else:
+        port = 50051 if args.port is None else args.port
+        logger.info("gRPC server listening on port %d.", port)
+        prefork = Prefork(load_grpc_server, grpc_starter(port, args.threads, args.graceful_timeout), args.workers,
+                          args.graceful_timeout)
+    if not prefork.run():
+        sys.exit(WORKER_BOOT_ERROR)
+
+if __name__ == '__main__':
+    main()
@@ -1,16 +1,177 @@
+from typing import Iterator, Mapping
+from urllib.parse import unquote
 import requests
+from requests.adapters import HTTPAdapter
+from config import DEFAULT_CHUNK_SIZE, DEFAULT_POOL_CONNECTIONS, DEFAULT_POOL_MAXSIZE, STAT_HEADERS
+from content_cache import ContentCache
+from timings import Timings, NO_TIMINGS
+from compression import accept_encoding
+from retry import RetryPolicy, DEFAULT_RETRY_POLICY, RETRY_STATUSES
+
+class ResponseChunks:
+    """
+    Body of a streamed read response, iterable in chunks.
+
+    The connection goes back to the pool when the body is exhausted or
+    closed, also if it is closed before it was iterated.
+    """
+    def __init__(self, response: requests.Response, chunk_size: int = DEFAULT_CHUNK_SIZE, offset: int = 0,
+                 skip: int = 0) -> None:
+        """
+        Initialize the chunks of a response.
+
+        :param response: Streamed response.
+        :param chunk_size: Maximum size of a chunk read from the response body.
+        :param offset: Offset in the file of the first byte yielded.
+        :param skip: Number of bytes at the start of the body which are not yielded.
+        """
+        self.response = response
+        self.offset = offset
+        self._skip = skip
+        self._chunks = response.iter_content(chunk_size=chunk_size)
+
+    @property
+    def validator(self) -> str | None:
+        """
+        Return the validator identifying this version of the file in an If-Range header.
+
+        Weak ETags cannot be used in If-Range, Last-Modified is used instead.
+        """
+        etag = self.response.headers.get('ETag')
+        if etag and not etag.startswith('W/'):
+            return etag
+        return self.response.headers.get('Last-Modified')
+
+    def __iter__(self) -> Iterator[bytes]:
+        return self
+
+    def __next__(self) -> bytes:
+        try:
+            chunk = next(self._chunks)
+            while self._skip:
+                if self._skip >= len(chunk):
+                    self._skip -= len(chunk)
+                    chunk = next(self._chunks)
+                else:
+                    chunk, self._skip = chunk[self._skip:], 0
+            return chunk
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        self.response.close()
 
 class RestClient:
     """
     Client for interacting with a REST API to manage files.
     """
-    def __init__(self, base_url):
+    # Resumed reads can be validated with If-Range
+    validates_ranges = True
+
+    def __init__(self, base_url, chunk_size=DEFAULT_CHUNK_SIZE, pool_connections=DEFAULT_POOL_CONNECTIONS,
+                 pool_maxsize=DEFAULT_POOL_MAXSIZE, keep_alive=True, content_cache: ContentCache = None,
+                 timings: Timings = NO_TIMINGS, compression: str = None,
+                 retry_policy: RetryPolicy = DEFAULT_RETRY_POLICY):
         """
         Initialize RestClient with base URL.
+
+        All requests go through one pooled session owned by the client, so
+        connections are reused across operations instead of being opened
+        for every request.
         
         :param base_url: Base URL for the REST API.
+        :param chunk_size: Maximum size of a chunk read from the response body.
+        :param pool_connections: Number of per-host connection pools to keep.
+        :param pool_maxsize: Maximum number of connections to a single host.
+        :param keep_alive: Keep connections open between requests.
+        :param content_cache: Cache of downloaded contents revalidated on each read, or None.
+        :param timings: Recorder of the connect, send and ttfb phases of each request.
+        :param compression: Ask the server to compress responses with 'gzip' or 'zstd', or None.
+        :param retry_policy: Timeouts, deadline and retries of the requests.
         """
         self.base_url = base_url
+        self.chunk_size = chunk_size
+        self.content_cache = content_cache
+        self.retry_policy = retry_policy
+        self.session = self._create_session(pool_connections, pool_maxsize, keep_alive, timings)
+        self.session.headers['Accept-Encoding'] = accept_encoding(compression)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """
+        Close all pooled connections.
+        """
+        self.session.close()
+
+    @staticmethod
+    def _create_session(pool_connections: int, pool_maxsize: int, keep_alive: bool,
+                        timings: Timings = NO_TIMINGS) -> requests.Session:
+        """
+        Create a session with a bounded connection pool.
+
+        The pool blocks when all connections to a host are in use, which keeps
+        the number of connections per host within pool_maxsize.
+
+        :param pool_connections: Number of per-host connection pools to keep.
+        :param pool_maxsize: Maximum number of connections to a single host.
+        :param keep_alive: Keep connections open between requests.
+        :param timings: Recorder of the connect, send and ttfb phases of each request.
+        """
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=True)
+        if timings.enabled:
+            adapter.poolmanager.pool_classes_by_scheme = {
+                scheme: _timed_pool_class(pool_class, timings)
+                for scheme, pool_class in adapter.poolmanager.pool_classes_by_scheme.items()
+            }
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers['Connection'] = 'keep-alive' if keep_alive else 'close'
+        return session
+
+    def _get(self, url: str, **kwargs) -> requests.Response:
+        """
+        Send a GET request, retrying failed connections, timeouts and retryable statuses.
+
+        Each attempt is limited by the per-call timeout, which for requests
+        bounds connecting and every wait for data; the retries stop at the
+        operation deadline. A streamed body is not retried once returned.
+
+        :param url: URL of the request.
+        :param kwargs: Further arguments of Session.get.
+        """
+        return self.retry_policy.run(lambda timeout: self._get_once(url, timeout, **kwargs), self._is_retryable)
+
+    def _get_once(self, url: str, timeout: float | None, **kwargs) -> requests.Response:
+        """
+        Send a single GET request and raise HTTPError for a retryable status.
+
+        :param url: URL of the request.
+        :param timeout: Timeout of the attempt in seconds, or None.
+        :param kwargs: Further arguments of Session.get.
+        """
+        response = self.session.get(url, timeout=timeout, **kwargs)
+        if response.status_code in RETRY_STATUSES:
+            response.close()
+            response.raise_for_status()
+        return response
+
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        """
+        Check whether a failed request may be sent again.
+
+        :param error: Exception raised by the attempt.
+        """
+        if isinstance(error, requests.HTTPError):
+            return error.response is not None and error.response.status_code in RETRY_STATUSES
+        return isinstance(error, (requests.ConnectionError, requests.Timeout))
 
     def get_file_stat(self, uuid):
         """
@@ -19,7 +180,7 @@ class RestClient:
         :param uuid: UUID of the file.
         """
         url = f"{self.base_url}/file/{uuid}/stat/"
-        response = requests.get(url)
+        response = self._get(url)
         match response.status_code:
             case 200:
                 return response.json()
@@ -35,19 +196,200 @@ class RestClient:
         
         :param uuid: UUID of the file.
         """
+        file_name, chunks = self.read_file_stream(uuid)
+        return file_name, b''.join(chunks)
+
+    def read_file_stream(self, uuid, offset: int = 0, if_range: str | None = None) -> tuple[str, Iterator[bytes]]:
+        """
+        Read file content by UUID without loading the whole body into memory.
+
+        The file name is parsed from the response headers before any of the
+        body is read; the body is then yielded in chunks as it arrives.
+        With a content cache, a cached copy is revalidated with a conditional
+        request and served locally when the server answers 304 Not Modified.
+
+        :param uuid: UUID of the file.
+        :param offset: Offset of the first byte to read, used to resume an interrupted read.
+        :param if_range: Validator of the version of the file read before the offset. If the file
+                         changed since, the whole file is read; the offset attribute of the chunks tells.
+        :return: File name and an iterator over the file content chunks.
+        """
+        if offset:
+            return self._read_file_tail(uuid, offset, if_range)
+        headers, file_name, chunks = self._read_whole_file(uuid)
+        return file_name, chunks
+
+    def stat_read_file(self, uuid) -> tuple[dict, Iterator[bytes]]:
+        """
+        Get file metadata and read file content by UUID with a single request.
+
+        The server sends the metadata as headers of the read response, which
+        saves the round trip of a separate stat request.
+
+        :param uuid: UUID of the file.
+        :return: Metadata dictionary and an iterator over the file content chunks.
+        :raises ValueError: If the server does not send the metadata headers.
+        """
+        headers, file_name, chunks = self._read_whole_file(uuid, params={'stat': 1})
+        try:
+            stat_data = {
+                'name': unquote(headers[STAT_HEADERS['name']]),
+                'size': int(headers[STAT_HEADERS['size']]),
+                'create_datetime': headers[STAT_HEADERS['create_datetime']],
+                'mimetype': headers[STAT_HEADERS['mimetype']],
+            }
+        except (KeyError, ValueError):
+            if hasattr(chunks, 'close'):
+                chunks.close()
+            raise ValueError(f"Server does not send metadata with the content of UUID {uuid}.")
+        return stat_data, chunks
+
+    def _read_whole_file(self, uuid, params: dict = None) -> tuple[Mapping[str, str], str, Iterator[bytes]]:
+        """
+        Send a read request for the whole file, revalidating a cached copy if there is one.
+
+        :param uuid: UUID of the file.
+        :param params: Query parameters of the request.
+        :return: Response headers, file name and an iterator over the file content chunks.
+        """
         url = f"{self.base_url}/file/{uuid}/read/"
-        response = requests.get(url)
+        cached = self.content_cache.lookup(url) if self.content_cache is not None else None
+        headers = cached.validators() if cached is not None else {}
+        response = self._get(url, params=params, stream=True, headers=headers)
+        if response.status_code == 304 and cached is not None:
+            response.close()
+            return response.headers, cached.file_name, cached.iter_chunks(self.chunk_size)
+        if cached is not None:
+            cached.close()
+
         match response.status_code:
             case 200:
-                disposition = response.headers.get('Content-Disposition', '')
-                if 'filename=' in disposition:
-                    file_name = disposition.split('filename=')[-1].strip('"')
-                else:
-                    file_name = 'unknown_filename'
-                file_content = response.content
-                return file_name, file_content
+                file_name = self._parse_file_name(response)
+                chunks = self._iter_body(response)
+                etag = response.headers.get('ETag')
+                last_modified = response.headers.get('Last-Modified')
+                if self.content_cache is not None and (etag or last_modified):
+                    chunks = self.content_cache.store(url, etag, last_modified, file_name, chunks)
+                return response.headers, file_name, chunks
+            case 404:
+                response.close()
+                raise FileNotFoundError(f"File with UUID {uuid} not found.")
+            case _:
+                response.close()
+                response.raise_for_status()
+
+    def _read_file_tail(self, uuid, offset: int, if_range: str | None = None) -> tuple[str, ResponseChunks]:
+        """
+        Read file content from the given offset to the end with a Range request.
 
+        :param uuid: UUID of the file.
+        :param offset: Offset of the first byte to read.
+        :param if_range: Validator of the version of the file read before the offset, or None.
+        :return: File name and the remaining content chunks.
+        :raises ValueError: If the server answers with another range.
+        """
+        url = f"{self.base_url}/file/{uuid}/read/"
+        headers = {'Range': f"bytes={offset}-"}
+        if if_range is not None:
+            headers['If-Range'] = if_range
+        response = self._get(url, stream=True, headers=headers)
+        match response.status_code:
+            case 206:
+                content_range = response.headers.get('Content-Range', '')
+                if not content_range.startswith(f"bytes {offset}-"):
+                    response.close()
+                    raise ValueError(f"Unexpected Content-Range {content_range!r} for bytes {offset}-.")
+                return self._parse_file_name(response), ResponseChunks(response, self.chunk_size, offset=offset)
+            case 416:
+                # Nothing left to read, the file is already complete
+                response.close()
+                return self._parse_file_name(response), iter(())
+            case 200 if if_range is not None:
+                # The file changed since the first part was read, read it again from the start
+                return self._parse_file_name(response), ResponseChunks(response, self.chunk_size)
+            case 200:
+                # The server ignored the range, drop the bytes which are already read
+                return self._parse_file_name(response), ResponseChunks(response, self.chunk_size, offset=offset,
+                                                                       skip=offset)
             case 404:
+                response.close()
                 raise FileNotFoundError(f"File with UUID {uuid} not found.")
             case _:
+                response.close()
                 response.raise_for_status()
+
+    def read_file_range(self, uuid, start: int, stop: int) -> Iterator[bytes]:
+        """
+        Read a byte range of the file content by UUID.
+
+        :param uuid: UUID of the file.
+        :param start: Offset of the first byte.
+        :param stop: Offset after the last byte.
+        :return: Iterator over the chunks of the range.
+        :raises ValueError: If the server does not answer with the requested range.
+        """
+        url = f"{self.base_url}/file/{uuid}/read/"
+        response = self._get(url, stream=True, headers={'Range': f"bytes={start}-{stop - 1}"})
+        match response.status_code:
+            case 206:
+                content_range = response.headers.get('Content-Range', '')
+                if not content_range.startswith(f"bytes {start}-"):
+                    response.close()
+                    raise ValueError(f"Unexpected Content-Range {content_range!r} for bytes {start}-{stop - 1}.")
+                return self._iter_body(response)
+            case 404:
+                response.close()
+                raise FileNotFoundError(f"File with UUID {uuid} not found.")
+            case 200:
+                response.close()
+                raise ValueError(f"Server does not support range requests for UUID {uuid}.")
+            case _:
+                response.close()
+                response.raise_for_status()
+
+    def _iter_body(self, response: requests.Response) -> ResponseChunks:
+        """
+        Return the response body in chunks, releasing the connection afterwards.
+
+        :param response: Streamed response.
+        """
+        return ResponseChunks(response, self.chunk_size)
+
+    @staticmethod
+    def _parse_file_name(response: requests.Response) -> str:
+        """
+        Return the file name from the Content-Disposition header.
+
+        :param response: Response of the read endpoint.
+        """
+        disposition = response.headers.get('Content-Disposition', '')
+        if 'filename=' in disposition:
+            return disposition.split('filename=')[-1].strip('"')
+        return 'unknown_filename'
+
+def _timed_pool_class(pool_class: type, timings: Timings) -> type:
+    """
+    Return a connection pool class whose connections record their phases.
+
+    Opening the connection is recorded as connect, writing the request as
+    send and waiting for the response headers as ttfb.
+
+    :param pool_class: urllib3 connection pool class to extend.
+    :param timings: Recorder of the phases.
+    """
+    class TimedConnection(pool_class.ConnectionCls):
+        def connect(self):
+            with timings.span('connect', host=self.host, port=self.port):
+                super().connect()
+
+        def request(self, *args, **kwargs):
+            if self.sock is None:
+                self.connect()
+            with timings.span('send'):
+                super().request(*args, **kwargs)
+
+        def getresponse(self):
+            with timings.span('ttfb'):
+                return super().getresponse()
+
+    return type(pool_class.__name__, (pool_class,), {'ConnectionCls': TimedConnection})
@@ -0,0 +1,156 @@
+"""
+Retries with jittered exponential backoff, per-call timeouts and an overall deadline.
+
+A RetryPolicy bounds every backend operation: each attempt gets at most the
+per-call timeout and all attempts together at most the operation deadline.
+The REST clients retry through RetryPolicy.run; the gRPC clients hand the
+policy to the channel as a native retry service config.
+"""
+import json
+import time
+import random
+from typing import Awaitable, Callable, TypeVar
+from config import DEFAULT_RETRIES, DEFAULT_TIMEOUT, DEFAULT_DEADLINE
+
+T = TypeVar('T')
+
+# HTTP statuses worth retrying: rate limiting and unavailable or overloaded upstreams
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+
+# gRPC status codes retried by the channel
+GRPC_RETRY_CODES = ('UNAVAILABLE',)
+
+# gRPC refuses retry policies with more attempts than this
+GRPC_MAX_ATTEMPTS = 5
+
+class RetryPolicy:
+    """
+    Limits and backoff of retried backend calls.
+    """
+    def __init__(self, retries: int = DEFAULT_RETRIES, timeout: float | None = DEFAULT_TIMEOUT,
+                 deadline: float | None = DEFAULT_DEADLINE, backoff: float = 0.1, max_backoff: float = 2.0) -> None:
+        """
+        Initialize the policy.
+
+        :param retries: Number of retries after the first attempt.
+        :param timeout: Seconds allowed for a single attempt, or None for no limit.
+        :param deadline: Seconds allowed for an operation including all retries, or None for no limit.
+        :param backoff: Upper bound of the first backoff delay in seconds.
+        :param max_backoff: Upper bound of any backoff delay in seconds.
+        """
+        self.retries = retries
+        self.timeout = timeout
+        self.deadline = deadline
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def start(self) -> float | None:
+        """
+        Return the monotonic time at which an operation starting now must end.
+
+        :return: Absolute deadline, or None without an operation deadline.
+        """
+        return None if self.deadline is None else time.monotonic() + self.deadline
+
+    def call_timeout(self, deadline: float | None) -> float | None:
+        """
+        Return the timeout of the next attempt, shortened to the time left.
+
+        :param deadline: Absolute deadline of the operation, or None.
+        :raises TimeoutError: If the operation deadline has passed.
+        """
+        if deadline is None:
+            return self.timeout
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError(f"Operation deadline of {self.deadline} seconds exceeded.")
+        return remaining if self.timeout is None else min(self.timeout, remaining)
+
+    def backoff_delay(self, attempt: int) -> float:
+        """
+        Return a random delay before the next attempt (full jitter).
+
+        :param attempt: Number of the failed attempt, starting at 0.
+        """
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def _retry_delay(self, attempt: int, deadline: float | None) -> float | None:
+        """
+        Return the delay before retrying, or None if no retry is left.
+
+        :param attempt: Number of the failed attempt, starting at 0.
+        :param deadline: Absolute deadline of the operation, or None.
+        """
+        if attempt >= self.retries:
+            return None
+        delay = self.backoff_delay(attempt)
+        if deadline is not None and time.monotonic() + delay >= deadline:
+            return None
+        return delay
+
+    def run(self, call: Callable[[float | None], T], is_retryable: Callable[[Exception], bool]) -> T:
+        """
+        Run a call, retrying retryable failures until retries or the deadline run out.
+
+        :param call: Function making one attempt with the given timeout in seconds.
+        :param is_retryable: Function telling whether a failure may be retried.
+        :return: Result of the first successful attempt.
+        """
+        deadline = self.start()
+        attempt = 0
+        while True:
+            timeout = self.call_timeout(deadline)
+            try:
+                return call(timeout)
+            except Exception as e:
+                delay = self._retry_delay(attempt, deadline) if is_retryable(e) else None
+                if delay is None:
+                    raise
+            time.sleep(delay)
+            attempt += 1
+
+    async def run_async(self, call: Callable[[float | None], Awaitable[T]],
+                        is_retryable: Callable[[Exception], bool]) -> T:
+        """
+        Run a coroutine call, retrying retryable failures until retries or the deadline run out.
+
+        :param call: Function returning an awaitable attempt with the given timeout in seconds.
+        :param is_retryable: Function telling whether a failure may be retried.
+        :return: Result of the first successful attempt.
+        """
+        import asyncio
+        deadline = self.start()
+        attempt = 0
+        while True:
+            timeout = self.call_timeout(deadline)
+            try:
+                return await call(timeout)
+            except Exception as e:
+                delay = self._retry_delay(attempt, deadline) if is_retryable(e) else None
+                if delay is None:
+                    raise
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def grpc_options(self, service: str) -> list[tuple[str, object]]:
+        """
+        Return channel options enabling native gRPC retries for all methods of a service.
+
+        gRPC randomizes the backoff itself and allows at most five attempts.
+
+        :param service: Fully qualified name of the service.
+        """
+        method_config: dict = {'name': [{'service': service}]}
+        if self.retries > 0:
+            method_config['retryPolicy'] = {
+                'maxAttempts': min(self.retries + 1, GRPC_MAX_ATTEMPTS),
+                'initialBackoff': f'{self.backoff}s',
+                'maxBackoff': f'{self.max_backoff}s',
+                'backoffMultiplier': 2,
+                'retryableStatusCodes': list(GRPC_RETRY_CODES),
+            }
+        service_config = json.dumps({'methodConfig': [method_config]})
+        return [('grpc.enable_retries', 1 if self.retries > 0 else 0), ('grpc.service_config', service_config)]
+
+# Policy of clients created without one
+DEFAULT_RETRY_POLICY = RetryPolicy()
@@ -1,6 +1,7 @@
 import os
 import sys
 from concurrent import futures
+from typing import Iterator
 import grpc
 from google.protobuf.timestamp_pb2 import Timestamp
 
@@ -8,8 +9,18 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from service_file_pb2 import *
 from service_file_pb2_grpc import *
 from server_grpc.file_data import FILES
+from config import GRPC_COMPRESSION_METADATA, COMPRESSION_MIN_SIZE, COMPRESSIBLE_MIMETYPES
 import datetime
 
+def is_compressible(mimetype: str, size: int) -> bool:
+    """
+    Check whether content of the given type and size should be compressed.
+
+    :param mimetype: MIME type of the content.
+    :param size: Size of the content in bytes.
+    """
+    return size >= COMPRESSION_MIN_SIZE and mimetype.startswith(COMPRESSIBLE_MIMETYPES)
+
 class FileServicer(FileServicer):
     """
     gRPC server for serving file metadata and content.
@@ -19,12 +30,50 @@ class FileServicer(FileServicer):
         """
         Handle gRPC request for getting file metadata.
         """
+        file_data = self._get_file(request, context)
+        return StatReply(data=self._stat_data(file_data, context))
+
+    def read(self, request, context):
+        """
+        Handle gRPC request for reading file content.
+        """
+        file_data = self._get_file(request, context)
+        for chunk in self._iter_content(request, context, file_data):
+            yield ReadReply(data=ReadReply.Data(data=chunk))
+
+    def stat_read(self, request, context):
+        """
+        Handle gRPC request for getting file metadata and content in a single call.
+
+        The metadata goes in the first reply, the content in the following ones.
+        """
+        file_data = self._get_file(request, context)
+        stat_data = self._stat_data(file_data, context)
+        chunks = self._iter_content(request, context, file_data)
+        yield StatReadReply(stat=stat_data)
+        for chunk in chunks:
+            yield StatReadReply(data=ReadReply.Data(data=chunk))
+
+    @staticmethod
+    def _get_file(request, context) -> dict:
+        """
+        Return the file requested by a call, aborting it with NOT_FOUND if there is none.
+        """
         file_data = FILES.get(request.uuid.value)
 
         if file_data is None:
             # Pokud soubor neexistuje, vrátíme NOT_FOUND chybu
             context.abort(grpc.StatusCode.NOT_FOUND, "File not found")
+        return file_data
+
+    @staticmethod
+    def _stat_data(file_data: dict, context) -> StatReply.Data:
+        """
+        Return the metadata of a file as sent in replies.
 
+        :param file_data: The file.
+        :param context: Context of the call, aborted if the creation time is invalid.
+        """
         # Create a Timestamp object from the file's create_datetime
         timestamp = Timestamp()
         try:
@@ -33,39 +82,66 @@ class FileServicer(FileServicer):
         except ValueError:
             context.abort(grpc.StatusCode.INVALID_ARGUMENT, "Invalid datetime format")
 
-        return StatReply(
-            data=StatReply.Data(
-                name=file_data["name"],
-                size=file_data["size"],
-                create_datetime=timestamp,
-                mimetype=file_data["mimetype"]
-            )
+        return StatReply.Data(
+            name=file_data["name"],
+            size=file_data["size"],
+            create_datetime=timestamp,
+            mimetype=file_data["mimetype"]
         )
 
-    def read(self, request, context):
+    def _iter_content(self, request, context, file_data: dict) -> Iterator[bytes]:
         """
-        Handle gRPC request for reading file content.
+        Return the requested part of the file content in chunks of the requested size.
+
+        The offset is checked and the compression chosen before the first
+        chunk is taken, so errors are raised by this call.
+
+        :param file_data: The file.
         """
-        file_data = FILES.get(request.uuid.value)
+        content = file_data["content"]
+        if request.offset > len(content):
+            context.abort(grpc.StatusCode.OUT_OF_RANGE, "Offset is beyond the end of the file")
+        content = content[request.offset:]
+        self._set_compression(context, file_data["mimetype"], len(content))
+        # Size 0 means the whole file is sent in a single reply
+        chunk_size = request.size or len(content) or 1
+        return (content[offset:offset + chunk_size] for offset in range(0, len(content), chunk_size))
 
-        if file_data is None:
-            # Pokud soubor neexistuje, vrátíme NOT_FOUND chybu
-            context.abort(grpc.StatusCode.NOT_FOUND, "File not found")
+    @staticmethod
+    def _set_compression(context, mimetype: str, size: int) -> None:
+        """
+        Compress the replies of the call if the client opted in and the content compresses well.
 
-        yield ReadReply(
-            data=ReadReply.Data(
-                data=file_data["content"]
-            )
-        )
+        :param context: Context of the call.
+        :param mimetype: MIME type of the content.
+        :param size: Size of the content in bytes.
+        """
+        metadata = dict(context.invocation_metadata())
+        if metadata.get(GRPC_COMPRESSION_METADATA) == 'gzip' and is_compressible(mimetype, size):
+            context.set_compression(grpc.Compression.Gzip)
 
-def serve():
+def create_server(port: int = 50051, max_workers: int = 10, reuse_port: bool = False) -> grpc.Server:
     """
-    Start the gRPC server and listen for incoming connections.
+    Create the gRPC server, not started yet.
+
+    :param port: Port to listen on.
+    :param max_workers: Number of threads handling calls.
+    :param reuse_port: Allow other processes to listen on the same port, the kernel spreads connections among them.
     """
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=max_workers),
+                         options=[('grpc.so_reuseport', int(reuse_port))])
     add_FileServicer_to_server(FileServicer(), server)
-    server.add_insecure_port('[::]:50051')
-    print("gRPC server is running on port 50051...")
+    server.add_insecure_port(f'[::]:{port}')
+    return server
+
+def serve(port: int = 50051):
+    """
+    Start the gRPC server and listen for incoming connections.
+
+    :param port: Port to listen on.
+    """
+    server = create_server(port)
+    print(f"gRPC server is running on port {port}...")
     server.start()
     server.wait_for_termination()
 
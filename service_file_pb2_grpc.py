@@ -18,14 +18,14 @@ except ImportError:
 if _version_not_supported:
     raise RuntimeError(
         f'The grpc package installed is at version {GRPC_VERSION},'
-        + f' but the generated code in service_file_pb2_grpc.py depends on'
+        + ' but the generated code in service_file_pb2_grpc.py depends on'
         + f' grpcio>={GRPC_GENERATED_VERSION}.'
         + f' Please upgrade your grpc module to grpcio>={GRPC_GENERATED_VERSION}'
         + f' or downgrade your generated code using grpcio-tools<={GRPC_VERSION}.'
     )
 
 
-class FileStub(object):
+class FileStub:
     """Missing associated documentation comment in .proto file."""
 
     def __init__(self, channel):
@@ -44,9 +44,14 @@ class FileStub(object):
                 request_serializer=service__file__pb2.ReadRequest.SerializeToString,
                 response_deserializer=service__file__pb2.ReadReply.FromString,
                 _registered_method=True)
+        self.stat_read = channel.unary_stream(
+                '/File/stat_read',
+                request_serializer=service__file__pb2.ReadRequest.SerializeToString,
+                response_deserializer=service__file__pb2.StatReadReply.FromString,
+                _registered_method=True)
 
 
-class FileServicer(object):
+class FileServicer:
     """Missing associated documentation comment in .proto file."""
 
     def stat(self, request, context):
@@ -71,6 +76,16 @@ class FileServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def stat_read(self, request, context):
+        """Get file metadata and read file content in a single call
+
+        * The first reply carries the metadata, the following ones the content.
+        * Return the same errors as stat and read.
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_FileServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -84,6 +99,11 @@ def add_FileServicer_to_server(servicer, server):
                     request_deserializer=service__file__pb2.ReadRequest.FromString,
                     response_serializer=service__file__pb2.ReadReply.SerializeToString,
             ),
+            'stat_read': grpc.unary_stream_rpc_method_handler(
+                    servicer.stat_read,
+                    request_deserializer=service__file__pb2.ReadRequest.FromString,
+                    response_serializer=service__file__pb2.StatReadReply.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'File', rpc_method_handlers)
@@ -92,7 +112,7 @@ def add_FileServicer_to_server(servicer, server):
 
 
  # This class is part of an EXPERIMENTAL API.
-class File(object):
+class File:
     """Missing associated documentation comment in .proto file."""
 
     @staticmethod
@@ -148,3 +168,30 @@ class File(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def stat_read(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/File/stat_read',
+            service__file__pb2.ReadRequest.SerializeToString,
+            service__file__pb2.StatReadReply.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
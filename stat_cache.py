@@ -0,0 +1,135 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from config import DEFAULT_CACHE_PATH, DEFAULT_CACHE_TTL, DEFAULT_CACHE_MAX_ENTRIES
+
+class StatCache:
+    """
+    Persistent cache of file metadata backed by SQLite.
+
+    Entries are keyed by backend and UUID, expire after a TTL and the least
+    recently used entries are evicted once the cache grows over its maximum
+    size. SQLite locking in WAL mode makes the cache safe to share between
+    several processes.
+    """
+    # Number of stores between two eviction passes
+    EVICTION_INTERVAL = 100
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl: float = DEFAULT_CACHE_TTL,
+                 max_entries: int = DEFAULT_CACHE_MAX_ENTRIES) -> None:
+        """
+        Open (and create if needed) the cache database.
+
+        :param path: Path to the SQLite database file.
+        :param ttl: Time to live of an entry in seconds.
+        :param max_entries: Maximum number of cached entries.
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._stores_since_eviction = 0
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._connection = sqlite3.connect(path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS stat_cache ("
+            " backend TEXT NOT NULL,"
+            " uuid TEXT NOT NULL,"
+            " data TEXT NOT NULL,"
+            " stored_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL,"
+            " PRIMARY KEY (backend, uuid))"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS stat_cache_accessed_at ON stat_cache (accessed_at)")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self) -> None:
+        """
+        Evict entries over the size limit and close the database.
+        """
+        with self._lock:
+            try:
+                self._evict()
+            except sqlite3.OperationalError:
+                # Database locked by another process for too long, evict next time
+                pass
+            finally:
+                self._connection.close()
+
+    def get(self, backend: str, uuid: str) -> dict | None:
+        """
+        Return cached metadata of a file and mark it as recently used.
+
+        :param backend: Identifier of the backend (type and address).
+        :param uuid: UUID of the file.
+        :return: Metadata dictionary or None if not cached or expired.
+        """
+        now = time.time()
+        with self._lock:
+            try:
+                row = self._connection.execute(
+                    "SELECT data FROM stat_cache WHERE backend = ? AND uuid = ? AND stored_at > ?",
+                    (backend, uuid, now - self.ttl)
+                ).fetchone()
+                if row is None:
+                    return None
+                self._connection.execute(
+                    "UPDATE stat_cache SET accessed_at = ? WHERE backend = ? AND uuid = ?",
+                    (now, backend, uuid)
+                )
+            except sqlite3.OperationalError:
+                # Database locked by another process for too long, treat as a miss
+                return None
+        return json.loads(row[0])
+
+    def put(self, backend: str, uuid: str, stat_data: dict) -> None:
+        """
+        Store metadata of a file.
+
+        :param backend: Identifier of the backend (type and address).
+        :param uuid: UUID of the file.
+        :param stat_data: Metadata dictionary of the file.
+        """
+        now = time.time()
+        with self._lock:
+            try:
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO stat_cache (backend, uuid, data, stored_at, accessed_at)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (backend, uuid, json.dumps(stat_data), now, now)
+                )
+                self._stores_since_eviction += 1
+                if self._stores_since_eviction >= self.EVICTION_INTERVAL:
+                    self._evict()
+            except sqlite3.OperationalError:
+                # Database locked by another process for too long, skip caching
+                pass
+
+    def _evict(self) -> None:
+        """
+        Remove expired entries and the least recently used entries over the limit.
+        """
+        self._stores_since_eviction = 0
+        self._connection.execute("BEGIN IMMEDIATE")
+        try:
+            self._connection.execute("DELETE FROM stat_cache WHERE stored_at <= ?", (time.time() - self.ttl,))
+            self._connection.execute(
+                "DELETE FROM stat_cache WHERE rowid IN"
+                " (SELECT rowid FROM stat_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            self._connection.execute("COMMIT")
+        except sqlite3.Error:
+            self._connection.execute("ROLLBACK")
+            raise
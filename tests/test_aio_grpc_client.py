@@ -0,0 +1,75 @@
+import asyncio
+import unittest
+from unittest.mock import MagicMock, AsyncMock
+import grpc
+from aio_grpc_client import AsyncGrpcClient
+from retry import RetryPolicy
+from service_file_pb2 import ReadReply, StatReply
+
+
+class TestAsyncGrpcClient(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        """Set up the AsyncGrpcClient with a mocked stub for each test."""
+        self.client = AsyncGrpcClient(server_address="localhost:50051", chunk_size=4)
+        self.client.stub = MagicMock()
+
+    async def test_get_file_stat_success(self) -> None:
+        """Positive test: Should return file metadata for a valid UUID."""
+        self.client.stub.stat = AsyncMock(return_value=StatReply(
+            data=StatReply.Data(name="example.txt", size=1024, mimetype="text/plain")
+        ))
+
+        result = await self.client.get_file_stat("1234")
+
+        self.assertEqual(result['name'], "example.txt")
+        self.assertEqual(result['size'], 1024)
+
+    async def test_read_file_stream_yields_all_chunks(self) -> None:
+        """Positive test: Should yield every chunk and pass the chunk size."""
+        call = MagicMock()
+        call.read = AsyncMock(side_effect=[
+            ReadReply(data=ReadReply.Data(data=b"File")),
+            ReadReply(data=ReadReply.Data(data=b" content")),
+            grpc.aio.EOF,
+        ])
+        self.client.stub.read.return_value = call
+
+        file_name, chunks = await self.client.read_file_stream("1234")
+
+        self.assertEqual(file_name, "1234")
+        self.assertEqual([chunk async for chunk in chunks], [b"File", b" content"])
+        self.assertEqual(self.client.stub.read.call_args.args[0].size, 4)
+
+    async def test_read_file_empty(self) -> None:
+        """Positive test: Should return empty content for an empty reply stream."""
+        call = MagicMock()
+        call.read = AsyncMock(return_value=grpc.aio.EOF)
+        self.client.stub.read.return_value = call
+
+        file_name, file_content = await self.client.read_file("1234")
+
+        self.assertEqual(file_content, b"")
+
+    async def test_stalled_stream_times_out(self) -> None:
+        """Should cancel the call when the server sends no reply within the per-call timeout."""
+        self.client.retry_policy = RetryPolicy(timeout=0.05)
+        replies = iter([ReadReply(data=ReadReply.Data(data=b"File"))])
+
+        async def read():
+            for reply in replies:
+                return reply
+            await asyncio.sleep(10)
+        call = MagicMock()
+        call.read = read
+        self.client.stub.read.return_value = call
+
+        file_name, chunks = await self.client.read_file_stream("1234")
+        self.assertEqual(await anext(chunks), b"File")
+        with self.assertRaises(TimeoutError):
+            await anext(chunks)
+        call.cancel.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
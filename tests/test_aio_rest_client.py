@@ -0,0 +1,71 @@
+import unittest
+from aiohttp import web, ClientResponseError
+from aiohttp.test_utils import TestServer
+from aio_rest_client import AsyncRestClient
+
+
+class TestAsyncRestClient(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self) -> None:
+        """Start a local REST stand-in server and create the client for each test."""
+        app = web.Application()
+        app.router.add_get('/file/{uuid}/stat/', self._stat)
+        app.router.add_get('/file/{uuid}/read/', self._read)
+        self.server = TestServer(app)
+        await self.server.start_server()
+        self.client = AsyncRestClient(str(self.server.make_url('')).rstrip('/'), chunk_size=5)
+
+    async def asyncTearDown(self) -> None:
+        """Close the client and stop the server after each test."""
+        await self.client.close()
+        await self.server.close()
+
+    @staticmethod
+    async def _stat(request: web.Request) -> web.Response:
+        match request.match_info['uuid']:
+            case '1234':
+                return web.json_response({'name': 'example.txt', 'size': 18,
+                                          'create_datetime': '2023-09-20T12:34:56Z', 'mimetype': 'text/plain'})
+            case 'broken':
+                raise web.HTTPInternalServerError()
+        raise web.HTTPNotFound()
+
+    @staticmethod
+    async def _read(request: web.Request) -> web.Response:
+        if request.match_info['uuid'] != '1234':
+            raise web.HTTPNotFound()
+        return web.Response(body=b'File content here.',
+                            headers={'Content-Disposition': 'attachment; filename=example.txt'})
+
+    async def test_get_file_stat_valid_uuid(self) -> None:
+        """Positive test: Should return file metadata for a valid UUID."""
+        result = await self.client.get_file_stat('1234')
+
+        self.assertEqual(result['name'], 'example.txt')
+        self.assertEqual(result['size'], 18)
+
+    async def test_get_file_stat_file_not_found(self) -> None:
+        """Negative test: Should raise FileNotFoundError for an invalid UUID."""
+        with self.assertRaises(FileNotFoundError):
+            await self.client.get_file_stat('invalid-uuid')
+
+    async def test_get_file_stat_server_error(self) -> None:
+        """Negative test: Should raise ClientResponseError for a 500 server error."""
+        with self.assertRaises(ClientResponseError):
+            await self.client.get_file_stat('broken')
+
+    async def test_read_file_stream_yields_chunks(self) -> None:
+        """Positive test: Should stream the body in chunks of the configured size."""
+        file_name, chunks = await self.client.read_file_stream('1234')
+
+        self.assertEqual(file_name, 'example.txt')
+        self.assertEqual(b''.join([chunk async for chunk in chunks]), b'File content here.')
+
+    async def test_read_file_file_not_found(self) -> None:
+        """Negative test: Should raise FileNotFoundError for an invalid UUID."""
+        with self.assertRaises(FileNotFoundError):
+            await self.client.read_file('invalid-uuid')
+
+
+if __name__ == '__main__':
+    unittest.main()
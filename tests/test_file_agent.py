@@ -0,0 +1,84 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import Mock
+from file_agent import FileAgent, AgentClient, AgentError, agent_is_running
+
+STAT_DATA: dict = {
+    'name': 'example.txt',
+    'size': 12,
+    'create_datetime': '2023-09-20T12:34:56Z',
+    'mimetype': 'text/plain'
+}
+
+
+class TestFileAgent(unittest.TestCase):
+
+    def setUp(self) -> None:
+        """Run an agent with a mocked backend on a temporary socket."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.socket_path: str = os.path.join(self.tmp_dir.name, 'agent.sock')
+        self.file_client = Mock()
+        self.file_client.get_stat.return_value = STAT_DATA
+        self.client_factory = Mock(return_value=self.file_client)
+        self.agent = FileAgent(self.socket_path, self.client_factory)
+        self.thread = threading.Thread(target=self.agent.serve_forever, daemon=True)
+        self.thread.start()
+        self.client = AgentClient(self.socket_path, 'rest', 'http://localhost:5000')
+
+    def tearDown(self) -> None:
+        """Stop the agent and remove the temporary directory."""
+        self.agent.shutdown()
+        self.agent.server_close()
+        self.thread.join()
+        self.tmp_dir.cleanup()
+
+    def test_stat_uses_one_warm_client_per_backend(self) -> None:
+        """Should create the backend client once and reuse it for later requests."""
+        self.assertEqual(self.client.get_file_stat('1234'), STAT_DATA)
+        self.assertEqual(self.client.get_file_stat('5678'), STAT_DATA)
+
+        self.client_factory.assert_called_once_with('rest', 'http://localhost:5000')
+        self.assertEqual(self.file_client.get_stat.call_count, 2)
+
+    def test_read_stream_forwards_offset(self) -> None:
+        """Should stream the content chunks read by the agent from the offset."""
+        self.file_client.client.read_file_stream.return_value = ('example.txt', iter([b'lo, ', b'', b'world']))
+
+        file_name, chunks = self.client.read_file_stream('1234', offset=3)
+
+        self.assertEqual(file_name, 'example.txt')
+        self.assertEqual(list(chunks), [b'lo, ', b'world'])
+        self.file_client.client.read_file_stream.assert_called_once_with('1234', offset=3)
+
+    def test_missing_file_raises_file_not_found(self) -> None:
+        """Should raise FileNotFoundError when the backend does not know the UUID."""
+        self.file_client.get_stat.side_effect = FileNotFoundError("File with UUID 1234 not found.")
+
+        with self.assertRaisesRegex(FileNotFoundError, '1234'):
+            self.client.get_file_stat('1234')
+
+    def test_failure_during_transfer_is_reported(self) -> None:
+        """Should raise AgentError when the backend fails after the transfer started."""
+        def chunks():
+            yield b'Hello'
+            raise ConnectionError('connection reset')
+        self.file_client.client.read_file_stream.return_value = ('example.txt', chunks())
+
+        with self.assertRaisesRegex(AgentError, 'connection reset'):
+            self.client.read_file('1234')
+
+    def test_second_agent_on_the_same_socket_is_refused(self) -> None:
+        """Should not replace the socket of a running agent."""
+        self.assertTrue(agent_is_running(self.socket_path))
+        with self.assertRaises(OSError):
+            FileAgent(self.socket_path, self.client_factory)
+
+    def test_missing_socket_is_not_running(self) -> None:
+        """Should report no agent when nothing listens on the socket."""
+        self.assertFalse(agent_is_running(os.path.join(self.tmp_dir.name, 'missing.sock')))
+
+
+if __name__ == '__main__':
+    unittest.main()
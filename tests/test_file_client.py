@@ -1,7 +1,28 @@
-from io import StringIO
+import os
+import sys
+import tempfile
+import subprocess
+from io import StringIO, TextIOWrapper
 import unittest
-from unittest.mock import patch, mock_open, Mock
-from file_client import FileClient
+from unittest.mock import patch, mock_open, Mock, AsyncMock
+import file_client
+from file_client import FileClient, _read_uuids, _get_validator, _set_validator
+from output_sink import FileChunks
+from timings import Timings
+
+class FileStdout(TextIOWrapper):
+    """Stand-in for stdout backed by a temporary file, so it has a real file descriptor."""
+
+    def __init__(self) -> None:
+        super().__init__(tempfile.TemporaryFile(), encoding='utf-8')
+
+    def getbytes(self) -> bytes:
+        self.flush()
+        self.buffer.seek(0)
+        return self.buffer.read()
+
+    def getvalue(self) -> str:
+        return self.getbytes().decode('utf-8')
 
 class TestFileClient(unittest.TestCase):
     
@@ -47,7 +68,7 @@ class TestFileClient(unittest.TestCase):
         with patch.object(self.client, 'client') as mock_client:
             mock_client.get_file_stat.return_value = stat_data
 
-            with patch('sys.stdout', new_callable=StringIO) as mock_stdout:
+            with patch('sys.stdout', new_callable=FileStdout) as mock_stdout:
                 self.client.stat('some-uuid')
                 
                 expected_output = (
@@ -76,13 +97,367 @@ class TestFileClient(unittest.TestCase):
         file_name: str = 'example.txt'
         file_content: bytes = b'File content here.'
 
-        self.client._write_output(file_content, file_name)
-        mock_file.assert_not_called()
-
-        with patch('sys.stdout', new_callable=StringIO) as mock_stdout:
+        with patch('sys.stdout', new_callable=FileStdout) as mock_stdout:
             self.client._write_output(file_content, file_name)
-            expected_output: str = file_content.decode('utf-8', errors='replace')
-            self.assertEqual(mock_stdout.getvalue(), expected_output)
+            mock_file.assert_not_called()
+            self.assertEqual(mock_stdout.getbytes(), file_content)
+
+    @patch('builtins.open', new_callable=mock_open)
+    def test_write_output_chunks_to_file(self, mock_file: Mock) -> None:
+        """Test if write_output writes streamed chunks to a file one by one."""
+        self.client._write_output(iter([b'File ', b'content']), 'output.txt')
+
+        mock_file.assert_called_once_with('output.txt', 'wb')
+        self.assertEqual(mock_file().write.call_count, 2)
+        mock_file().write.assert_called_with(b'content')
+
+    def test_write_output_binary_to_stdout(self) -> None:
+        """Test if write_output writes binary chunks to stdout unchanged, without decoding."""
+        self.client.output = '-'
+        chunks = [b'\x89PNG\r\n\x1a\n\xc3', b'\xff\x00']
+
+        with patch('sys.stdout', new_callable=FileStdout) as mock_stdout:
+            mock_stdout.write('text before ')
+            self.client._write_output(iter(chunks), 'example.png')
+            self.assertEqual(mock_stdout.getbytes(), b'text before ' + b''.join(chunks))
+
+    def test_write_output_copies_local_file_with_sendfile(self) -> None:
+        """Test if write_output copies a local file region to the output with sendfile."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            source_path: str = os.path.join(tmp_dir, 'source.bin')
+            with open(source_path, 'wb') as f:
+                f.write(b'header\nbody bytes')
+            source = open(source_path, 'rb')
+            source.readline()
+            self.client.output = os.path.join(tmp_dir, 'out.bin')
+
+            with patch('os.sendfile', wraps=os.sendfile) as mock_sendfile:
+                self.client._write_output(FileChunks(source), 'out.bin')
+                mock_sendfile.assert_called()
+
+            self.assertTrue(source.closed)
+            with open(self.client.output, 'rb') as f:
+                self.assertEqual(f.read(), b'body bytes')
+
+    def test_read_streams_from_backend(self) -> None:
+        """Test if read passes the backend stream through to the output."""
+        with patch.object(self.client, 'client') as mock_client, \
+                patch.object(self.client, '_write_output') as mock_write:
+            chunks = iter([b'a', b'b'])
+            mock_client.read_file_stream.return_value = ('example.txt', chunks)
+
+            self.client.read('some-uuid')
+
+            mock_write.assert_called_once_with(chunks, 'example.txt')
+
+    def test_read_with_stat_output_uses_single_call(self) -> None:
+        """Test if read with a stat output gets metadata and content with one backend call."""
+        stat_data: dict = {
+            'name': 'example.txt',
+            'size': 7,
+            'create_datetime': '2023-09-20T12:34:56Z',
+            'mimetype': 'text/plain'
+        }
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            stat_output: str = os.path.join(tmp_dir, 'stat.txt')
+            client = FileClient(backend='rest', output=os.path.join(tmp_dir, 'out.txt'), stat_output=stat_output)
+            with patch.object(client, 'client') as mock_client:
+                mock_client.stat_read_file.return_value = (stat_data, iter([b'content']))
+
+                client.read('some-uuid')
+
+                mock_client.get_file_stat.assert_not_called()
+                mock_client.read_file_stream.assert_not_called()
+            with open(stat_output) as f:
+                self.assertEqual(f.read(), "Name: example.txt\nSize: 7 bytes\nCreated: 2023-09-20T12:34:56Z\n"
+                                           "MIME Type: text/plain\n")
+            with open(os.path.join(tmp_dir, 'out.txt'), 'rb') as f:
+                self.assertEqual(f.read(), b'content')
+
+    def test_read_many_with_stat_output(self) -> None:
+        """Test if read_many writes the metadata of each read file to the stat output."""
+        self.client.output = '-'
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            self.client.stat_output = os.path.join(tmp_dir, 'stat.txt')
+            with patch.object(self.client, 'client') as mock_client, \
+                    patch('sys.stdout', new_callable=FileStdout) as mock_stdout:
+                mock_client.stat_read_file.side_effect = lambda uuid: (
+                    {'name': uuid, 'size': 1, 'create_datetime': '2023-09-20T12:34:56Z', 'mimetype': 'text/plain'},
+                    iter([uuid.encode('utf-8')]))
+
+                failed = self.client.read_many(['a', 'b'], jobs=2)
+
+                self.assertEqual(mock_stdout.getvalue(), 'ab')
+            with open(self.client.stat_output) as f:
+                uuids = sorted(line for line in f.read().splitlines() if line.startswith('UUID: '))
+            self.assertEqual(uuids, ['UUID: a', 'UUID: b'])
+            self.assertEqual(failed, [])
+
+    def test_read_records_phases_with_timings(self) -> None:
+        """Test if read records the transfer and write phases inside the read span."""
+        timings = Timings()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            client = FileClient(backend='rest', output=os.path.join(tmp_dir, 'out.bin'), timings=timings)
+            with patch.object(client, 'client') as mock_client:
+                mock_client.read_file_stream.return_value = ('example.txt', iter([b'a', b'b']))
+                client.read('some-uuid')
+
+        self.assertEqual([span.name for span in timings.spans], ['import', 'transfer', 'write', 'read'])
+        self.assertEqual(timings.spans[1].args, {'chunks': 2, 'bytes': 2})
+
+    def test_stat_many_writes_results_in_input_order(self) -> None:
+        """Test if stat_many writes the metadata of all UUIDs in input order."""
+        self.client.output = '-'
+        stat_data: dict = {
+            'name': 'example.txt',
+            'size': 1,
+            'create_datetime': '2023-09-20T12:34:56Z',
+            'mimetype': 'text/plain'
+        }
+
+        with patch.object(self.client, 'client') as mock_client, \
+                patch('sys.stdout', new_callable=FileStdout) as mock_stdout:
+            mock_client.get_file_stat.return_value = stat_data
+
+            failed = self.client.stat_many(['a', 'b', 'c'], jobs=2)
+
+            uuids = [line for line in mock_stdout.getvalue().splitlines() if line.startswith('UUID: ')]
+            self.assertEqual(uuids, ['UUID: a', 'UUID: b', 'UUID: c'])
+            self.assertEqual(failed, [])
+
+    def test_read_many_reports_failures(self) -> None:
+        """Test if read_many continues after a failed UUID and reports it."""
+        self.client.output = '-'
+
+        def read_file_stream(uuid: str):
+            if uuid == 'missing':
+                raise FileNotFoundError(f"File with UUID {uuid} not found.")
+            return uuid, iter([uuid.encode('utf-8')])
+
+        with patch.object(self.client, 'client') as mock_client, \
+                patch('sys.stdout', new_callable=FileStdout) as mock_stdout, \
+                patch('sys.stderr', new_callable=StringIO) as mock_stderr:
+            mock_client.read_file_stream.side_effect = read_file_stream
+
+            failed = self.client.read_many(iter(['a', 'missing', 'b']), jobs=1, ordered=False)
+
+            self.assertEqual(mock_stdout.getvalue(), 'ab')
+            self.assertIn('missing', mock_stderr.getvalue())
+            self.assertEqual(failed, ['missing'])
+
+    def test_read_many_async(self) -> None:
+        """Test if read_many drives an asyncio backend and writes results in input order."""
+        client: FileClient = FileClient(backend='rest', output='-', asynchronous=True)
+
+        async def read_file(uuid: str):
+            return uuid, uuid.encode('utf-8')
+
+        with patch.object(client, 'client') as mock_client, \
+                patch('sys.stdout', new_callable=FileStdout) as mock_stdout:
+            mock_client.read_file.side_effect = read_file
+            mock_client.close = AsyncMock()
+
+            failed = client.read_many(['a', 'b', 'c'], jobs=2)
+
+            self.assertEqual(mock_stdout.getvalue(), 'abc')
+            self.assertEqual(failed, [])
+            mock_client.close.assert_awaited_once()
+
+    def test_stat_uses_cache(self) -> None:
+        """Test if stat answers from the metadata cache and refresh bypasses it."""
+        self.client.output = '-'
+        self.client.stat_cache = Mock()
+        self.client.stat_cache.get.return_value = {
+            'name': 'cached.txt',
+            'size': 1,
+            'create_datetime': '2023-09-20T12:34:56Z',
+            'mimetype': 'text/plain'
+        }
+
+        with patch.object(self.client, 'client') as mock_client, \
+                patch('sys.stdout', new_callable=FileStdout) as mock_stdout:
+            self.client.stat('some-uuid')
+
+            mock_client.get_file_stat.assert_not_called()
+            self.client.stat_cache.get.assert_called_once_with('rest:http://localhost:5000', 'some-uuid')
+            self.assertIn('Name: cached.txt', mock_stdout.getvalue())
+
+            self.client.refresh = True
+            mock_client.get_file_stat.return_value = {**self.client.stat_cache.get.return_value, 'name': 'new.txt'}
+            self.client.stat('some-uuid')
+
+            mock_client.get_file_stat.assert_called_once_with('some-uuid')
+            self.client.stat_cache.put.assert_called_once()
+
+    def test_read_segmented_writes_segments_in_place(self) -> None:
+        """Test if read fetches a large file as concurrent ranges written at their offsets."""
+        content: bytes = b'0123456789abcdefghij'
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            client: FileClient = FileClient(backend='rest', output=os.path.join(tmp_dir, 'out.bin'),
+                                            segments=3, segment_min_size=10)
+            with patch.object(client, 'client') as mock_client:
+                mock_client.get_file_stat.return_value = {'size': len(content)}
+                mock_client.read_file_range.side_effect = \
+                    lambda uuid, start, stop: iter([content[start:start + 2], content[start + 2:stop]])
+
+                client.read('some-uuid')
+
+                mock_client.read_file_stream.assert_not_called()
+                self.assertEqual(sorted(call.args[1:] for call in mock_client.read_file_range.call_args_list),
+                                 [(0, 7), (7, 14), (14, 20)])
+
+            with open(client.output, 'rb') as f:
+                self.assertEqual(f.read(), content)
+
+    def test_read_segmented_failure_leaves_nothing_to_resume(self) -> None:
+        """Test if a failed segmented read keeps no output a resumed read would take for complete."""
+        content: bytes = b'0123456789abcdefghij'
+
+        class Chunks(list):
+            validator = '"v2"'
+
+        def read_file_range(uuid, start, stop):
+            if start == 7 and not succeed:
+                raise ConnectionError('reset')
+            return Chunks([content[start:stop]])
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output = os.path.join(tmp_dir, 'out.bin')
+            client: FileClient = FileClient(backend='rest', output=output, segments=3, segment_min_size=10,
+                                            resume=True)
+            with patch.object(client, 'client') as mock_client:
+                mock_client.get_file_stat.return_value = {'size': len(content)}
+                mock_client.read_file_range.side_effect = read_file_range
+
+                succeed = False
+                with self.assertRaises(ConnectionError):
+                    client.read('some-uuid')
+                self.assertEqual(os.listdir(tmp_dir), [])
+
+                succeed = True
+                client.read('some-uuid')
+
+                mock_client.read_file_stream.assert_not_called()
+            with open(output, 'rb') as f:
+                self.assertEqual(f.read(), content)
+            self.assertEqual(os.listdir(tmp_dir), ['out.bin'])
+
+            # A validator of an earlier download is replaced by the one of the segments
+            _set_validator(output, '"v1"')
+            if _get_validator(output) is not None:
+                client.resume = False
+                with patch.object(client, 'client') as mock_client:
+                    mock_client.get_file_stat.return_value = {'size': len(content)}
+                    mock_client.read_file_range.side_effect = read_file_range
+                    client.read('some-uuid')
+                self.assertEqual(_get_validator(output), '"v2"')
+
+    def test_read_small_file_is_not_segmented(self) -> None:
+        """Test if read streams files below the segmentation threshold with one request."""
+        self.client.segments = 4
+        self.client.segment_min_size = 100
+
+        with patch.object(self.client, 'client') as mock_client, \
+                patch.object(self.client, '_write_output') as mock_write:
+            mock_client.get_file_stat.return_value = {'size': 10}
+            mock_client.read_file_stream.return_value = ('example.txt', iter([b'a']))
+
+            self.client.read('some-uuid')
+
+            mock_client.read_file_range.assert_not_called()
+            mock_write.assert_called_once()
+
+    def test_read_resume_appends_remaining_bytes(self) -> None:
+        """Test if a resumed read fetches from the size of the existing output and appends."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output: str = os.path.join(tmp_dir, 'out.txt')
+            with open(output, 'wb') as f:
+                f.write(b'File ')
+            client: FileClient = FileClient(backend='rest', output=output, resume=True)
+
+            with patch.object(client, 'client') as mock_client:
+                mock_client.read_file_stream.return_value = ('example.txt', iter([b'content']))
+
+                client.read('some-uuid')
+
+                mock_client.read_file_stream.assert_called_once_with('some-uuid', offset=5)
+
+            with open(output, 'rb') as f:
+                self.assertEqual(f.read(), b'File content')
+
+    def test_read_resume_rewrites_changed_file(self) -> None:
+        """Test if a resumed read sends the recorded validator and rewrites the output when the file changed."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output: str = os.path.join(tmp_dir, 'out.txt')
+            client: FileClient = FileClient(backend='rest', output=output, resume=True)
+            first = Mock(validator='"v1"', __iter__=lambda self: iter([b'File ']))
+            changed = Mock(validator='"v2"', offset=0, __iter__=lambda self: iter([b'New content']))
+
+            with patch.object(client, 'client') as mock_client:
+                mock_client.read_file_stream.return_value = ('example.txt', first)
+                client._write_output(first, 'example.txt')
+                mock_client.read_file_stream.return_value = ('example.txt', changed)
+
+                client.read('some-uuid')
+
+                mock_client.read_file_stream.assert_called_once_with('some-uuid', offset=5, if_range='"v1"')
+
+            with open(output, 'rb') as f:
+                self.assertEqual(f.read(), b'New content')
+            self.assertEqual(os.getxattr(output, 'user.file_client.validator'), b'"v2"')
+
+    def test_read_resume_without_output_file_starts_over(self) -> None:
+        """Test if a resumed read without a partial output reads the whole file."""
+        self.client.resume = True
+
+        with patch.object(self.client, 'client') as mock_client, \
+                patch.object(self.client, '_write_output') as mock_write, \
+                patch('os.path.getsize', side_effect=FileNotFoundError):
+            mock_client.read_file_stream.return_value = ('example.txt', iter([b'a']))
+
+            self.client.read('some-uuid')
+
+            mock_client.read_file_stream.assert_called_once_with('some-uuid')
+
+    def test_options_the_agent_ignores_bypass_it(self) -> None:
+        """Test if the running agent is used only when no option it would ignore is set."""
+        for argv, uses_agent in ((['stat', '1234'], True),
+                                 (['stat', '1234', '--chunk-size', '1024'], False),
+                                 (['read', '1234', '--timeout', '1'], False),
+                                 (['read', '1234', '--segments', '4', '--output', 'out'], False)):
+            with self.subTest(argv=argv), \
+                    patch('sys.argv', ['file-client', *argv]), \
+                    patch('file_agent.agent_is_running', return_value=True), \
+                    patch('file_client.FileClient') as mock_client_class, \
+                    patch('file_client._run_command', return_value=[]), \
+                    patch('stat_cache.StatCache'):
+                file_client.main()
+                agent_socket = mock_client_class.call_args.kwargs['agent_socket']
+                self.assertEqual(agent_socket is not None, uses_agent)
+
+    def test_help_does_not_import_backends(self) -> None:
+        """Test if --help runs without importing any backend dependency."""
+        code: str = (
+            "import sys, file_client\n"
+            "sys.argv = ['file-client', '--help']\n"
+            "try:\n"
+            "    file_client.main()\n"
+            "except SystemExit:\n"
+            "    pass\n"
+            "print(','.join(m for m in ('requests', 'grpc', 'aiohttp', 'sqlite3') if m in sys.modules))\n"
+        )
+        root_dir: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        result = subprocess.run([sys.executable, '-c', code], cwd=root_dir, capture_output=True, text=True, check=True)
+
+        self.assertEqual(result.stdout.splitlines()[-1], '')
+
+    def test_read_uuids_leaves_stdin_open(self) -> None:
+        """Test if UUIDs read from stdin skip blank lines and do not close stdin."""
+        stdin = StringIO("a\n\n b \n")
+        with patch('sys.stdin', stdin):
+            self.assertEqual(list(_read_uuids('-')), ['a', 'b'])
+        self.assertFalse(stdin.closed)
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,206 @@
+import threading
+import unittest
+from unittest.mock import patch, MagicMock
+import grpc
+from grpc_client import GrpcClient
+from retry import RetryPolicy
+from service_file_pb2 import ReadReply, StatReadReply, StatReply
+
+
+class ReplyStream:
+    """Stand-in for a streaming call, iterating the replies and recording cancellation."""
+
+    def __init__(self, replies: list) -> None:
+        self.replies = iter(replies)
+        self.cancelled = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self.replies)
+
+    def cancel(self) -> bool:
+        self.cancelled = True
+        return True
+
+
+class NotFoundError(grpc.RpcError):
+    """Error of a call which the server aborted with NOT_FOUND."""
+
+    def code(self) -> grpc.StatusCode:
+        return grpc.StatusCode.NOT_FOUND
+
+
+class StalledStream(ReplyStream):
+    """Stand-in for a streaming call which sends its replies and then nothing until it is cancelled."""
+
+    def __init__(self, replies: list) -> None:
+        super().__init__(replies)
+        self._cancelled = threading.Event()
+
+    def __next__(self):
+        try:
+            return next(self.replies)
+        except StopIteration:
+            self._cancelled.wait(10)
+            raise grpc.RpcError()
+
+    def cancel(self) -> bool:
+        self._cancelled.set()
+        return super().cancel()
+
+
+class TestGrpcClientStreaming(unittest.TestCase):
+
+    def setUp(self) -> None:
+        """Set up the GrpcClient with a mocked stub for each test."""
+        self.client = GrpcClient(server_address="localhost:50051", chunk_size=4)
+        self.client.stub = MagicMock()
+
+    def test_read_file_stream_passes_chunk_size(self) -> None:
+        """Should request chunks of the configured size from the server."""
+        self.client.stub.read.return_value = ReplyStream([])
+
+        self.client.read_file_stream("1234")
+
+        request = self.client.stub.read.call_args.args[0]
+        self.assertEqual(request.uuid.value, "1234")
+        self.assertEqual(request.size, 4)
+
+    def test_read_file_stream_yields_all_chunks(self) -> None:
+        """Should yield every chunk of the reply stream, not only the first one."""
+        self.client.stub.read.return_value = ReplyStream([
+            ReadReply(data=ReadReply.Data(data=b"File")),
+            ReadReply(data=ReadReply.Data(data=b" con")),
+            ReadReply(data=ReadReply.Data(data=b"tent")),
+        ])
+
+        file_name, chunks = self.client.read_file_stream("1234")
+
+        self.assertEqual(file_name, "1234")
+        self.assertEqual(list(chunks), [b"File", b" con", b"tent"])
+
+    def test_read_file_joins_chunks(self) -> None:
+        """Should return the whole content assembled from all chunks."""
+        self.client.stub.read.return_value = ReplyStream([
+            ReadReply(data=ReadReply.Data(data=b"File")),
+            ReadReply(data=ReadReply.Data(data=b" content")),
+        ])
+
+        file_name, file_content = self.client.read_file("1234")
+
+        self.assertEqual(file_content, b"File content")
+
+    def test_read_file_stream_empty_file(self) -> None:
+        """Should return no chunks for an empty reply stream."""
+        self.client.stub.read.return_value = ReplyStream([])
+
+        file_name, chunks = self.client.read_file_stream("1234")
+
+        self.assertEqual(list(chunks), [])
+
+    def test_read_file_stream_passes_offset(self) -> None:
+        """Should request the content from the given offset when resuming."""
+        self.client.stub.read.return_value = ReplyStream([])
+
+        self.client.read_file_stream("1234", offset=10)
+
+        self.assertEqual(self.client.stub.read.call_args.args[0].offset, 10)
+
+    def test_closing_stream_cancels_call(self) -> None:
+        """Should cancel the call when the caller stops reading early."""
+        stream = ReplyStream([ReadReply(data=ReadReply.Data(data=b"File")), ReadReply(data=ReadReply.Data(data=b" con"))])
+        self.client.stub.read.return_value = stream
+
+        file_name, chunks = self.client.read_file_stream("1234")
+        self.assertEqual(next(chunks), b"File")
+        chunks.close()
+
+        self.assertTrue(stream.cancelled)
+
+    def test_closing_unread_stream_cancels_call(self) -> None:
+        """Should cancel the call when the stream is closed before it was iterated."""
+        stream = ReplyStream([ReadReply(data=ReadReply.Data(data=b"File"))])
+        self.client.stub.read.return_value = stream
+
+        file_name, chunks = self.client.read_file_stream("1234")
+        chunks.close()
+
+        self.assertTrue(stream.cancelled)
+
+    def test_stalled_stream_times_out(self) -> None:
+        """Should cancel the call when the server sends no reply within the per-call timeout."""
+        self.client.retry_policy = RetryPolicy(timeout=0.05)
+        stream = StalledStream([ReadReply(data=ReadReply.Data(data=b"File"))])
+        self.client.stub.read.return_value = stream
+
+        file_name, chunks = self.client.read_file_stream("1234")
+        self.assertEqual(next(chunks), b"File")
+        with self.assertRaises(TimeoutError):
+            next(chunks)
+        self.assertTrue(stream.cancelled)
+
+    def test_not_found_raises_file_not_found(self) -> None:
+        """Should report NOT_FOUND of every call as FileNotFoundError, like the REST client."""
+        self.client.stub.stat.side_effect = NotFoundError()
+        with self.assertRaises(FileNotFoundError):
+            self.client.get_file_stat("1234")
+
+        stream = MagicMock()
+        stream.__next__.side_effect = NotFoundError()
+        self.client.stub.read.return_value = stream
+        self.client.stub.stat_read.return_value = stream
+        with self.assertRaises(FileNotFoundError):
+            self.client.read_file_stream("1234")
+        with self.assertRaises(FileNotFoundError):
+            self.client.stat_read_file("1234")
+        stream.cancel.assert_called()
+
+    def test_stat_read_file_returns_metadata_and_content(self) -> None:
+        """Should take the metadata from the first reply and the content from the following ones."""
+        self.client.stub.stat_read.return_value = ReplyStream([
+            StatReadReply(stat=StatReply.Data(name="example.txt", size=12, mimetype="text/plain")),
+            StatReadReply(data=ReadReply.Data(data=b"File")),
+            StatReadReply(data=ReadReply.Data(data=b" content")),
+        ])
+
+        stat_data, chunks = self.client.stat_read_file("1234")
+
+        self.assertEqual(stat_data['name'], "example.txt")
+        self.assertEqual(stat_data['size'], 12)
+        self.assertEqual(stat_data['mimetype'], "text/plain")
+        self.assertEqual(list(chunks), [b"File", b" content"])
+        self.assertEqual(self.client.stub.stat_read.call_args.args[0].size, 4)
+
+    def test_stat_read_file_without_metadata(self) -> None:
+        """Should cancel the call and raise ValueError when the first reply is content."""
+        stream = ReplyStream([StatReadReply(data=ReadReply.Data(data=b"File"))])
+        self.client.stub.stat_read.return_value = stream
+
+        with self.assertRaises(ValueError):
+            self.client.stat_read_file("1234")
+        self.assertTrue(stream.cancelled)
+
+    def test_compression_sends_opt_in_metadata(self) -> None:
+        """Should ask the server for compressed replies only when compression is enabled."""
+        client = GrpcClient(server_address="localhost:50051", compression="gzip")
+        client.stub = MagicMock()
+        client.stub.read.return_value = ReplyStream([])
+
+        client.read_file_stream("1234")
+        self.client.stub.read.return_value = ReplyStream([])
+        self.client.read_file_stream("1234")
+
+        self.assertEqual(client.stub.read.call_args.kwargs['metadata'], (('file-accept-compression', 'gzip'),))
+        self.assertEqual(self.client.stub.read.call_args.kwargs['metadata'], ())
+        client.close()
+
+    def test_zstd_compression_is_not_supported(self) -> None:
+        """Should reject compressions which gRPC has no codec for."""
+        with self.assertRaises(ValueError):
+            GrpcClient(server_address="localhost:50051", compression="zstd")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import unittest
+from unittest.mock import patch, Mock
+import grpc
+from service_file_pb2 import ReadRequest, Uuid
+from server_grpc.grpc_server import FileServicer
+
+TEST_FILES = {
+    "1234": {
+        "name": "example.txt",
+        "size": 18,
+        "create_datetime": "2023-09-20T12:34:56",
+        "mimetype": "text/plain",
+        "content": b"File content here."
+    },
+    "5678": {
+        "name": "example.bin",
+        "size": 4096,
+        "create_datetime": "2023-09-20T12:34:56",
+        "mimetype": "application/octet-stream",
+        "content": b"\0" * 4096
+    },
+    "9012": {
+        "name": "example.json",
+        "size": 4096,
+        "create_datetime": "2023-09-20T12:34:56",
+        "mimetype": "application/json",
+        "content": b" " * 4096
+    }
+}
+
+
+@patch('server_grpc.grpc_server.FILES', TEST_FILES)
+class TestGrpcServerRead(unittest.TestCase):
+
+    def setUp(self) -> None:
+        """Set up the gRPC servicer instance for each test."""
+        self.servicer = FileServicer()
+        self.context = Mock()
+        self.context.invocation_metadata.return_value = ()
+
+    def test_read_honors_chunk_size(self) -> None:
+        """Should split the content into chunks of at most the requested size."""
+        request = ReadRequest(uuid=Uuid(value="1234"), size=5)
+
+        replies = list(self.servicer.read(request, self.context))
+
+        self.assertEqual([reply.data.data for reply in replies],
+                         [b"File ", b"conte", b"nt he", b"re."])
+
+    def test_read_zero_size_sends_whole_file(self) -> None:
+        """Should send the whole file in one reply when size is 0."""
+        request = ReadRequest(uuid=Uuid(value="1234"))
+
+        replies = list(self.servicer.read(request, self.context))
+
+        self.assertEqual(len(replies), 1)
+        self.assertEqual(replies[0].data.data, b"File content here.")
+
+    def test_read_honors_offset(self) -> None:
+        """Should send only the content after the requested offset."""
+        request = ReadRequest(uuid=Uuid(value="1234"), offset=5)
+
+        replies = list(self.servicer.read(request, self.context))
+
+        self.assertEqual(b"".join(reply.data.data for reply in replies), b"content here.")
+
+    def test_read_compresses_text_when_client_opts_in(self) -> None:
+        """Should compress replies of compressible content for clients asking for gzip."""
+        self.context.invocation_metadata.return_value = (('file-accept-compression', 'gzip'),)
+
+        list(self.servicer.read(ReadRequest(uuid=Uuid(value="9012")), self.context))
+
+        self.context.set_compression.assert_called_once_with(grpc.Compression.Gzip)
+
+    def test_read_does_not_compress_binary_or_small_content(self) -> None:
+        """Should send binaries and content under the threshold uncompressed."""
+        self.context.invocation_metadata.return_value = (('file-accept-compression', 'gzip'),)
+
+        list(self.servicer.read(ReadRequest(uuid=Uuid(value="5678")), self.context))
+        list(self.servicer.read(ReadRequest(uuid=Uuid(value="1234")), self.context))
+
+        self.context.set_compression.assert_not_called()
+
+    def test_read_does_not_compress_without_opt_in(self) -> None:
+        """Should not compress replies for clients which did not ask for it."""
+        list(self.servicer.read(ReadRequest(uuid=Uuid(value="9012")), self.context))
+
+        self.context.set_compression.assert_not_called()
+
+
+@patch('server_grpc.grpc_server.FILES', TEST_FILES)
+class TestGrpcServerStatRead(unittest.TestCase):
+
+    def setUp(self) -> None:
+        """Set up the gRPC servicer instance for each test."""
+        self.servicer = FileServicer()
+        self.context = Mock()
+        self.context.invocation_metadata.return_value = ()
+        self.context.abort.side_effect = grpc.RpcError
+
+    def test_stat_read_sends_metadata_before_content(self) -> None:
+        """Should send the metadata in the first reply and the content in the following ones."""
+        request = ReadRequest(uuid=Uuid(value="1234"), size=10)
+
+        replies = list(self.servicer.stat_read(request, self.context))
+
+        self.assertEqual(replies[0].WhichOneof('reply'), 'stat')
+        self.assertEqual(replies[0].stat.name, "example.txt")
+        self.assertEqual(replies[0].stat.size, 18)
+        self.assertEqual(replies[0].stat.mimetype, "text/plain")
+        self.assertEqual([reply.data.data for reply in replies[1:]], [b"File conte", b"nt here."])
+
+    def test_stat_read_not_found(self) -> None:
+        """Should abort with NOT_FOUND before sending any reply."""
+        with self.assertRaises(grpc.RpcError):
+            next(self.servicer.stat_read(ReadRequest(uuid=Uuid(value="0000")), self.context))
+
+        self.context.abort.assert_called_once_with(grpc.StatusCode.NOT_FOUND, "File not found")
+
+
+if __name__ == '__main__':
+    unittest.main()
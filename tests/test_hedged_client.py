@@ -0,0 +1,146 @@
+import time
+import threading
+import unittest
+from unittest.mock import Mock, MagicMock
+import grpc
+from grpc_client import GrpcClient
+from hedged_client import HedgedClient, LatencyTracker, FAILURE_PENALTY
+
+STAT_DATA: dict = {
+    'name': 'example.txt',
+    'size': 12345,
+    'create_datetime': '2023-09-20T12:34:56Z',
+    'mimetype': 'text/plain'
+}
+
+
+class NotFoundError(grpc.RpcError):
+    """Error of a gRPC call which the server aborted with NOT_FOUND."""
+
+    def code(self) -> grpc.StatusCode:
+        return grpc.StatusCode.NOT_FOUND
+
+
+def backend(delay: float = 0.0, result=STAT_DATA, error: Exception = None) -> Mock:
+    """Return a mocked backend client answering stat after the delay."""
+    def get_file_stat(uuid):
+        time.sleep(delay)
+        if error is not None:
+            raise error
+        return result
+    client = Mock()
+    client.get_file_stat.side_effect = get_file_stat
+    return client
+
+
+class TestLatencyTracker(unittest.TestCase):
+
+    def test_percentile_needs_enough_samples(self) -> None:
+        """Should report no percentile until enough latencies are recorded."""
+        tracker = LatencyTracker(window=10)
+        for latency in (0.1, 0.2, 0.3, 0.4):
+            tracker.add(latency)
+        self.assertIsNone(tracker.percentile(50))
+
+        tracker.add(0.5)
+        self.assertEqual(tracker.percentile(50), 0.3)
+        self.assertEqual(tracker.percentile(95), 0.5)
+
+    def test_window_keeps_recent_samples(self) -> None:
+        """Should forget latencies older than the window."""
+        tracker = LatencyTracker(window=5)
+        for latency in (9.0,) * 5 + (0.1,) * 5:
+            tracker.add(latency)
+        self.assertEqual(tracker.percentile(100), 0.1)
+
+
+class TestHedgedClient(unittest.TestCase):
+
+    def test_calls_fastest_backend(self) -> None:
+        """Should send calls to the backend with the lowest median latency."""
+        client = HedgedClient({'rest': backend(), 'grpc': backend()}, hedge_delay=1.0)
+        for latency in (0.5, 0.5, 0.5, 0.5, 0.5):
+            client.latencies['rest'].add(latency)
+            client.latencies['grpc'].add(latency / 10)
+
+        self.assertEqual(client.get_file_stat('1234'), STAT_DATA)
+
+        client.clients['grpc'].get_file_stat.assert_called_once_with('1234')
+        client.clients['rest'].get_file_stat.assert_not_called()
+        client.close()
+
+    def test_slow_call_is_hedged(self) -> None:
+        """Should take the answer of the other backend when the primary is slower than the hedge delay."""
+        fast_result = {**STAT_DATA, 'name': 'fast.txt'}
+        client = HedgedClient({'rest': backend(delay=0.5), 'grpc': backend(result=fast_result)}, hedge_delay=0.01)
+
+        start = time.perf_counter()
+        self.assertEqual(client.get_file_stat('1234'), fast_result)
+        self.assertLess(time.perf_counter() - start, 0.4)
+        client.close()
+
+    def test_failure_falls_back_to_other_backend(self) -> None:
+        """Should retry on the other backend when the primary fails."""
+        client = HedgedClient({'rest': backend(error=ConnectionError('refused')), 'grpc': backend()}, hedge_delay=10)
+
+        self.assertEqual(client.get_file_stat('1234'), STAT_DATA)
+        client.close()
+
+    def test_failures_rank_backend_last(self) -> None:
+        """Should record failed calls with a penalty so that a failing backend stops being tried first."""
+        client = HedgedClient({'rest': backend(error=ConnectionError('refused')), 'grpc': backend(delay=0.01)},
+                              hedge_delay=10)
+
+        for _ in range(5):
+            self.assertEqual(client.get_file_stat('1234'), STAT_DATA)
+
+        self.assertGreaterEqual(client.latencies['rest'].percentile(50), FAILURE_PENALTY)
+        self.assertEqual(client.ranked_backends(), ['grpc', 'rest'])
+        client.close()
+
+    def test_not_found_is_not_hedged(self) -> None:
+        """Should report a missing file without asking the other backend."""
+        client = HedgedClient({'rest': backend(error=FileNotFoundError('1234')), 'grpc': backend()}, hedge_delay=10)
+
+        with self.assertRaises(FileNotFoundError):
+            client.get_file_stat('1234')
+        client.clients['grpc'].get_file_stat.assert_not_called()
+        client.close()
+
+    def test_grpc_not_found_is_an_answer(self) -> None:
+        """Should neither hedge nor penalize a gRPC backend reporting a missing file."""
+        grpc_client = GrpcClient(server_address="localhost:50051")
+        grpc_client.stub = MagicMock()
+        grpc_client.stub.stat.side_effect = NotFoundError()
+        client = HedgedClient({'grpc': grpc_client, 'rest': backend()}, hedge_delay=10)
+
+        for _ in range(3):
+            with self.assertRaises(FileNotFoundError):
+                client.get_file_stat('1234')
+
+        client.clients['rest'].get_file_stat.assert_not_called()
+        self.assertEqual(len(client.latencies['grpc']), 3)
+        self.assertTrue(all(latency < FAILURE_PENALTY for latency in client.latencies['grpc'].samples))
+        client.close()
+
+    def test_losing_stream_is_closed(self) -> None:
+        """Should close the content stream of the backend which lost the race."""
+        slow_done = threading.Event()
+        slow_chunks, fast_chunks = Mock(), iter([b'content'])
+
+        def slow_read(uuid):
+            time.sleep(0.2)
+            return 'slow.txt', slow_chunks
+        slow, fast = Mock(), Mock()
+        slow.read_file_stream.side_effect = slow_read
+        fast.read_file_stream.return_value = ('fast.txt', fast_chunks)
+        slow_chunks.close.side_effect = lambda: slow_done.set()
+        client = HedgedClient({'rest': slow, 'grpc': fast}, hedge_delay=0.01)
+
+        self.assertEqual(client.read_file('1234'), ('fast.txt', b'content'))
+        self.assertTrue(slow_done.wait(1))
+        client.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
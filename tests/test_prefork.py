@@ -0,0 +1,146 @@
+import os
+import re
+import sys
+import time
+import signal
+import socket
+import tempfile
+import unittest
+import subprocess
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+import requests
+from flask import Flask
+from flask_server.server import FileMetadata, FileService, FileAPI
+from prefork import Prefork, WORKER_BOOT_ERROR, load_rest_app, rest_starter
+
+PREFORK: str = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'prefork.py')
+
+
+class TestPrefork(unittest.TestCase):
+
+    def setUp(self) -> None:
+        """Collect the log of the master in a temporary file."""
+        self.log = tempfile.TemporaryFile(mode='w+')
+        self.master: subprocess.Popen | None = None
+
+    def tearDown(self) -> None:
+        if self.master is not None and self.master.poll() is None:
+            self.master.kill()
+            self.master.wait()
+        self.log.close()
+
+    def start_master(self, *args: str) -> None:
+        self.master = subprocess.Popen([sys.executable, PREFORK, *args], stdout=self.log, stderr=self.log)
+
+    def wait_for_log(self, pattern: str, count: int = 1, timeout: float = 10.0) -> list[str]:
+        """Wait until the log of the master matches a pattern count times and return the matches."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            self.log.seek(0)
+            matches = re.findall(pattern, self.log.read())
+            if len(matches) >= count:
+                return matches
+            time.sleep(0.05)
+        self.log.seek(0)
+        self.fail(f"{pattern} not logged {count} times:\n{self.log.read()}")
+
+    @staticmethod
+    def is_running(pid: int) -> bool:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        return True
+
+    def test_rest_workers_reload_and_stop(self) -> None:
+        """Should serve from all workers, replace them on SIGHUP and stop on SIGTERM."""
+        self.start_master('rest', '--port', '0', '--workers', '2', '--graceful-timeout', '5')
+        address = self.wait_for_log(r'listening on (\S+)\.')[0]
+        old_workers = self.wait_for_log(r'Worker (\d+) started', count=2)
+
+        response = requests.get(f'http://{address}/file/1234/stat/', timeout=5)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['name'], 'example.txt')
+
+        self.master.send_signal(signal.SIGHUP)
+        new_workers = self.wait_for_log(r'Worker (\d+) started', count=4)[2:]
+        deadline = time.monotonic() + 5
+        while any(self.is_running(int(pid)) for pid in old_workers) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertFalse(any(self.is_running(int(pid)) for pid in old_workers))
+        self.assertTrue(all(self.is_running(int(pid)) for pid in new_workers))
+        self.assertEqual(requests.get(f'http://{address}/file/1234/stat/', timeout=5).status_code, 200)
+
+        self.master.send_signal(signal.SIGTERM)
+        self.assertEqual(self.master.wait(timeout=10), 0)
+        self.assertFalse(any(self.is_running(int(pid)) for pid in new_workers))
+
+    def test_stopped_worker_writes_request_log(self) -> None:
+        """Should write the last summary of the request log when a worker stops."""
+        self.start_master('rest', '--port', '0', '--workers', '1')
+        address = self.wait_for_log(r'listening on (\S+)\.')[0]
+        self.wait_for_log(r'Worker (\d+) started')
+
+        self.assertEqual(requests.get(f'http://{address}/file/unknown/stat/', timeout=5).status_code, 404)
+        self.master.send_signal(signal.SIGTERM)
+        self.assertEqual(self.master.wait(timeout=10), 0)
+
+        self.wait_for_log(r'"event":"summary","counts":\{"stat_miss":1\}')
+
+    def test_worker_boot_error_stops_master(self) -> None:
+        """Should give up when workers cannot listen on their port."""
+        with socket.create_server(('127.0.0.1', 0)) as taken:
+            port = taken.getsockname()[1]
+            self.start_master('rest', '--port', str(port), '--workers', '2', '--reuse-port')
+            self.assertEqual(self.master.wait(timeout=10), WORKER_BOOT_ERROR)
+
+    def test_reload_closes_previous_store(self) -> None:
+        """Should close the metadata store of the application replaced by a reload."""
+        module = SimpleNamespace(file_service=Mock(), app='old app')
+        with patch.dict(sys.modules, {'flask_server.server': module}), \
+                patch('importlib.reload', return_value=SimpleNamespace(app='new app')):
+            self.assertEqual(load_rest_app(), 'new app')
+        module.file_service.store.close.assert_called_once_with()
+
+    def test_rest_worker_sends_files_with_sendfile(self) -> None:
+        """Should send files and ranges with sendfile, and read them when the body is compressed."""
+        content = bytes(range(256)) * 40
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'data.txt')
+            with open(path, 'wb') as f:
+                f.write(content)
+            app = Flask(__name__)
+            FileAPI(app, FileService(files_metadata={
+                '1234': FileMetadata('1234', '2023-09-20T12:34:56Z', len(content), 'text/plain', 'data.txt', path)
+            }))
+            start, address = rest_starter('127.0.0.1', 0, False)
+            stop = start(app)
+            self.addCleanup(stop)
+            url = f'http://{address}/file/1234/read/'
+
+            with patch.object(socket.socket, 'sendfile', autospec=True, side_effect=socket.socket.sendfile) \
+                    as mock_sendfile:
+                response = requests.get(url, headers={'Accept-Encoding': 'identity'}, timeout=5)
+                self.assertEqual(response.content, content)
+                self.assertEqual(mock_sendfile.call_count, 1)
+
+                response = requests.get(url, headers={'Accept-Encoding': 'identity', 'Range': 'bytes=100-199'},
+                                        timeout=5)
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(response.content, content[100:200])
+                self.assertEqual(mock_sendfile.call_count, 2)
+
+                response = requests.get(url, headers={'Accept-Encoding': 'gzip'}, timeout=5)
+                self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+                self.assertEqual(response.content, content)
+                self.assertEqual(mock_sendfile.call_count, 2)
+
+    def test_at_least_one_worker(self) -> None:
+        """Should refuse to run without workers."""
+        with self.assertRaises(ValueError):
+            Prefork(lambda: None, lambda app: lambda: None, workers=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import json
+import logging
+import unittest
+from flask import Flask
+from flask_server.request_log import RequestLog, JsonFormatter, EVENT_STAT_MISS, EVENT_READ_MISS, SUMMARY_EVENT, \
+    MAX_FIELD_LENGTH
+from flask_server.server import FileService, FileAPI
+
+
+class ListHandler(logging.Handler):
+    """Handler keeping the records written by the request log as parsed JSON."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.setFormatter(JsonFormatter())
+        self.records: list[dict] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.records.append(json.loads(self.format(record)))
+
+
+class TestRequestLog(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.handler = ListHandler()
+
+    def make_log(self, **kwargs) -> RequestLog:
+        request_log = RequestLog(f'test.{self.id()}', handlers=[self.handler], **kwargs)
+        self.addCleanup(request_log.stop)
+        return request_log
+
+    def test_records_are_structured(self) -> None:
+        """Should write each record as a JSON object with its fields, long values cut short."""
+        request_log = self.make_log(sample_rates={})
+
+        request_log.event(EVENT_STAT_MISS, logging.WARNING, uuid='x' * 1000)
+        request_log.stop()
+
+        record = self.handler.records[0]
+        self.assertEqual(record['event'], EVENT_STAT_MISS)
+        self.assertEqual(record['level'], 'WARNING')
+        self.assertEqual(record['uuid'], 'x' * MAX_FIELD_LENGTH)
+
+    def test_sampled_out_events_are_only_counted(self) -> None:
+        """Should count every event and summarize the counts instead of writing a line per event."""
+        request_log = self.make_log(sample_rates={EVENT_STAT_MISS: 0.0})
+
+        for i in range(1000):
+            request_log.event(EVENT_STAT_MISS, uuid=str(i))
+        request_log.event(EVENT_READ_MISS, uuid='1')
+        request_log.stop()
+
+        events = [record['event'] for record in self.handler.records]
+        self.assertEqual(events, [EVENT_READ_MISS, SUMMARY_EVENT])
+        self.assertEqual(self.handler.records[-1]['counts'], {EVENT_STAT_MISS: 1000, EVENT_READ_MISS: 1})
+
+    def test_rate_limit_per_event_type(self) -> None:
+        """Should write at most the rate limit of records of each type and count the rest."""
+        request_log = self.make_log(sample_rates={}, rate_limit=2)
+
+        for i in range(10):
+            request_log.event(EVENT_STAT_MISS, uuid=str(i))
+            request_log.event(EVENT_READ_MISS, uuid=str(i))
+        request_log.stop()
+
+        events = [record['event'] for record in self.handler.records]
+        self.assertEqual(events.count(EVENT_STAT_MISS), 2)
+        self.assertEqual(events.count(EVENT_READ_MISS), 2)
+        self.assertEqual(self.handler.records[-1]['rate_limited'], {EVENT_STAT_MISS: 8, EVENT_READ_MISS: 8})
+
+    def test_no_summary_without_events(self) -> None:
+        """Should not write empty summaries."""
+        request_log = self.make_log()
+
+        request_log.flush()
+        request_log.stop()
+
+        self.assertEqual(self.handler.records, [])
+
+    def test_file_api_logs_misses(self) -> None:
+        """Should report misses of the REST endpoints to the request log."""
+        request_log = self.make_log(sample_rates={})
+        app = Flask(__name__)
+        FileAPI(app, FileService(files_metadata={}), request_log=request_log)
+        client = app.test_client()
+
+        self.assertEqual(client.get('/file/unknown/stat/').status_code, 404)
+        self.assertEqual(client.get('/file/unknown/read/').status_code, 404)
+        request_log.stop()
+
+        self.assertEqual([(record['event'], record['uuid']) for record in self.handler.records[:2]],
+                         [(EVENT_STAT_MISS, 'unknown'), (EVENT_READ_MISS, 'unknown')])
+        self.assertEqual(self.handler.records[-1]['counts'], {EVENT_STAT_MISS: 1, EVENT_READ_MISS: 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,11 @@
+import gzip
+import tempfile
 import unittest
+import unittest.mock
 import responses
 from rest_client import RestClient
+from content_cache import ContentCache
+from retry import RetryPolicy
 import requests
 
 class TestRestClient(unittest.TestCase):
@@ -119,6 +124,324 @@ class TestRestClient(unittest.TestCase):
         with self.assertRaises(requests.exceptions.HTTPError):
             self.client.read_file(uuid)
 
+    @responses.activate
+    def test_read_file_stream_yields_chunks(self) -> None:
+        """
+        Positive test: Should stream the body in chunks of the configured size.
+        """
+        uuid = '1234-5678-9012-3456'
+        responses.add(
+            responses.GET,
+            f'http://localhost:5000/file/{uuid}/read/',
+            headers={'Content-Disposition': 'attachment; filename="example.txt"'},
+            body=b'File content here.',
+            status=200
+        )
+        self.client.chunk_size = 5
+
+        file_name, chunks = self.client.read_file_stream(uuid)
+
+        self.assertEqual(file_name, 'example.txt')
+        self.assertTrue(responses.calls[0].request.req_kwargs['stream'])
+        self.assertEqual(list(chunks), [b'File ', b'conte', b'nt he', b're.'])
+
+    @responses.activate
+    def test_closing_unread_stream_releases_response(self) -> None:
+        """
+        Should close the response when the stream is closed before it was iterated, also through the content cache.
+        """
+        uuid = '1234-5678-9012-3456'
+        responses.add(
+            responses.GET,
+            f'http://localhost:5000/file/{uuid}/read/',
+            headers={'Content-Disposition': 'attachment; filename="example.txt"', 'ETag': '"abc"'},
+            body=b'File content here.',
+            status=200
+        )
+        with tempfile.TemporaryDirectory() as cache_dir:
+            for content_cache in (None, ContentCache(cache_dir)):
+                self.client.content_cache = content_cache
+                with self.subTest(content_cache=content_cache), \
+                        unittest.mock.patch.object(requests.Response, 'close') as close:
+                    file_name, chunks = self.client.read_file_stream(uuid)
+                    chunks.close()
+
+                    close.assert_called()
+
+    @responses.activate
+    def test_read_file_stream_file_not_found(self) -> None:
+        """
+        Negative test: Should raise FileNotFoundError before any body is read.
+        """
+        uuid = 'invalid-uuid'
+        responses.add(
+            responses.GET,
+            f'http://localhost:5000/file/{uuid}/read/',
+            status=404
+        )
+
+        with self.assertRaises(FileNotFoundError):
+            self.client.read_file_stream(uuid)
+
+    @responses.activate
+    def test_stat_read_file(self) -> None:
+        """
+        Positive test: Should return the metadata headers and the content of a single request.
+        """
+        uuid = '1234-5678-9012-3456'
+        responses.add(
+            responses.GET,
+            f'http://localhost:5000/file/{uuid}/read/?stat=1',
+            headers={'X-File-Name': 'v%C3%BDkaz.txt', 'X-File-Size': '18',
+                     'X-File-Create-Datetime': '2023-09-20T12:34:56Z', 'X-File-Mimetype': 'text/plain'},
+            body=b'File content here.',
+            status=200
+        )
+
+        stat_data, chunks = self.client.stat_read_file(uuid)
+
+        self.assertEqual(stat_data, {'name': 'výkaz.txt', 'size': 18, 'create_datetime': '2023-09-20T12:34:56Z',
+                                     'mimetype': 'text/plain'})
+        self.assertEqual(b''.join(chunks), b'File content here.')
+        self.assertEqual(len(responses.calls), 1)
+
+    @responses.activate
+    def test_stat_read_file_without_metadata_headers(self) -> None:
+        """
+        Negative test: Should raise ValueError when the server does not send the metadata.
+        """
+        uuid = '1234-5678-9012-3456'
+        responses.add(responses.GET, f'http://localhost:5000/file/{uuid}/read/', body=b'content', status=200)
+
+        with self.assertRaises(ValueError):
+            self.client.stat_read_file(uuid)
+
+    @responses.activate
+    def test_requests_reuse_session(self) -> None:
+        """
+        Should send every request through the client's pooled session.
+        """
+        uuid = '1234-5678-9012-3456'
+        responses.add(responses.GET, f'http://localhost:5000/file/{uuid}/stat/', json={}, status=200)
+
+        with unittest.mock.patch.object(self.client.session, 'get', wraps=self.client.session.get) as mock_get:
+            self.client.get_file_stat(uuid)
+            self.client.get_file_stat(uuid)
+
+        self.assertEqual(mock_get.call_count, 2)
+
+    def test_session_pool_configuration(self) -> None:
+        """
+        Should mount a blocking pool limited to pool_maxsize connections per host.
+        """
+        client = RestClient('http://localhost:5000', pool_connections=2, pool_maxsize=3, keep_alive=False)
+        adapter = client.session.get_adapter('http://localhost:5000')
+
+        self.assertEqual(adapter._pool_connections, 2)
+        self.assertEqual(adapter._pool_maxsize, 3)
+        self.assertTrue(adapter._pool_block)
+        self.assertEqual(client.session.headers['Connection'], 'close')
+        client.close()
+
+    @responses.activate
+    def test_compression_is_opt_in(self) -> None:
+        """
+        Should ask for the identity encoding by default and decode gzip responses when compression is enabled.
+        """
+        uuid = '1234-5678-9012-3456'
+        content = b'File content here.' * 100
+        responses.add(responses.GET, f'http://localhost:5000/file/{uuid}/read/', body=gzip.compress(content),
+                      headers={'Content-Encoding': 'gzip', 'Content-Disposition': 'attachment; filename=example.txt'},
+                      status=200)
+        client = RestClient('http://localhost:5000', compression='gzip')
+
+        file_name, file_content = client.read_file(uuid)
+
+        self.assertEqual(self.client.session.headers['Accept-Encoding'], 'identity')
+        self.assertEqual(responses.calls[0].request.headers['Accept-Encoding'], 'gzip')
+        self.assertEqual(file_content, content)
+        client.close()
+
+    @responses.activate
+    def test_retryable_status_is_retried(self) -> None:
+        """
+        Should retry a 503 answer with the per-call timeout and return the later success.
+        """
+        uuid = '1234-5678-9012-3456'
+        url = f'http://localhost:5000/file/{uuid}/stat/'
+        responses.add(responses.GET, url, status=503)
+        responses.add(responses.GET, url, json={'name': 'example.txt'}, status=200)
+        client = RestClient('http://localhost:5000', retry_policy=RetryPolicy(retries=1, timeout=5.0, backoff=0))
+
+        self.assertEqual(client.get_file_stat(uuid), {'name': 'example.txt'})
+        self.assertEqual(len(responses.calls), 2)
+        self.assertEqual(responses.calls[1].request.req_kwargs['timeout'], 5.0)
+        client.close()
+
+    @responses.activate
+    def test_retries_exhausted_raise_http_error(self) -> None:
+        """
+        Should raise HTTPError once the retryable status persists through all retries.
+        """
+        uuid = '1234-5678-9012-3456'
+        responses.add(responses.GET, f'http://localhost:5000/file/{uuid}/read/', status=503)
+        client = RestClient('http://localhost:5000', retry_policy=RetryPolicy(retries=2, backoff=0))
+
+        with self.assertRaises(requests.HTTPError):
+            client.read_file(uuid)
+        self.assertEqual(len(responses.calls), 3)
+        client.close()
+
+    @responses.activate
+    def test_read_file_revalidates_cached_content(self) -> None:
+        """
+        Should store a downloaded body and serve it from the cache on 304.
+        """
+        uuid = '1234-5678-9012-3456'
+        url = f'http://localhost:5000/file/{uuid}/read/'
+        responses.add(
+            responses.GET, url,
+            headers={'Content-Disposition': 'attachment; filename=example.txt', 'ETag': '"abc"'},
+            body=b'File content here.',
+            status=200
+        )
+        responses.add(responses.GET, url, status=304)
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            self.client.content_cache = ContentCache(cache_dir)
+
+            self.assertEqual(self.client.read_file(uuid), ('example.txt', b'File content here.'))
+            self.assertEqual(self.client.read_file(uuid), ('example.txt', b'File content here.'))
+
+        self.assertNotIn('If-None-Match', responses.calls[0].request.headers)
+        self.assertEqual(responses.calls[1].request.headers['If-None-Match'], '"abc"')
+
+    @responses.activate
+    def test_read_file_replaces_stale_cached_content(self) -> None:
+        """
+        Should replace the cached body when the server sends a new version.
+        """
+        uuid = '1234-5678-9012-3456'
+        url = f'http://localhost:5000/file/{uuid}/read/'
+        for etag, body in (('"v1"', b'old'), ('"v2"', b'new')):
+            responses.add(
+                responses.GET, url,
+                headers={'Content-Disposition': 'attachment; filename=example.txt', 'ETag': etag},
+                body=body,
+                status=200
+            )
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            self.client.content_cache = ContentCache(cache_dir)
+            self.client.read_file(uuid)
+            self.client.read_file(uuid)
+            cached = self.client.content_cache.lookup(url)
+
+            self.assertEqual(cached.etag, '"v2"')
+            self.assertEqual(b''.join(cached.iter_chunks()), b'new')
+
+    @responses.activate
+    def test_read_file_range(self) -> None:
+        """
+        Should request the byte range and stream the partial content.
+        """
+        uuid = '1234-5678-9012-3456'
+        responses.add(
+            responses.GET,
+            f'http://localhost:5000/file/{uuid}/read/',
+            headers={'Content-Range': 'bytes 5-11/18'},
+            body=b'content',
+            status=206
+        )
+
+        chunks = self.client.read_file_range(uuid, 5, 12)
+
+        self.assertEqual(b''.join(chunks), b'content')
+        self.assertEqual(responses.calls[0].request.headers['Range'], 'bytes=5-11')
+
+    @responses.activate
+    def test_read_file_range_not_supported(self) -> None:
+        """
+        Negative test: Should raise ValueError when the server ignores the range.
+        """
+        uuid = '1234-5678-9012-3456'
+        responses.add(responses.GET, f'http://localhost:5000/file/{uuid}/read/', body=b'whole', status=200)
+
+        with self.assertRaises(ValueError):
+            self.client.read_file_range(uuid, 5, 12)
+
+    @responses.activate
+    def test_read_file_stream_resume(self) -> None:
+        """
+        Should request only the bytes after the offset when resuming.
+        """
+        uuid = '1234-5678-9012-3456'
+        responses.add(
+            responses.GET,
+            f'http://localhost:5000/file/{uuid}/read/',
+            headers={'Content-Disposition': 'attachment; filename=example.txt', 'Content-Range': 'bytes 5-17/18'},
+            body=b'content here.',
+            status=206
+        )
+
+        file_name, chunks = self.client.read_file_stream(uuid, offset=5)
+
+        self.assertEqual(b''.join(chunks), b'content here.')
+        self.assertEqual(responses.calls[0].request.headers['Range'], 'bytes=5-')
+
+    @responses.activate
+    def test_read_file_stream_resume_range_ignored(self) -> None:
+        """
+        Should drop already read bytes when the server answers with the whole file.
+        """
+        uuid = '1234-5678-9012-3456'
+        responses.add(responses.GET, f'http://localhost:5000/file/{uuid}/read/', body=b'File content here.', status=200)
+        self.client.chunk_size = 3
+
+        file_name, chunks = self.client.read_file_stream(uuid, offset=5)
+
+        self.assertEqual(b''.join(chunks), b'content here.')
+
+    @responses.activate
+    def test_read_file_stream_resume_complete(self) -> None:
+        """
+        Should return no content when the file was already read completely.
+        """
+        uuid = '1234-5678-9012-3456'
+        responses.add(responses.GET, f'http://localhost:5000/file/{uuid}/read/', status=416)
+
+        file_name, chunks = self.client.read_file_stream(uuid, offset=18)
+
+        self.assertEqual(list(chunks), [])
+
+    @responses.activate
+    def test_read_file_stream_resume_if_range(self) -> None:
+        """
+        Should send If-Range and read the whole file again when it changed.
+        """
+        uuid = '1234-5678-9012-3456'
+        responses.add(responses.GET, f'http://localhost:5000/file/{uuid}/read/', body=b'New content.', status=200,
+                      headers={'ETag': '"new"'})
+
+        file_name, chunks = self.client.read_file_stream(uuid, offset=5, if_range='"old"')
+
+        self.assertEqual(b''.join(chunks), b'New content.')
+        self.assertEqual(chunks.offset, 0)
+        self.assertEqual(chunks.validator, '"new"')
+        self.assertEqual(responses.calls[0].request.headers['If-Range'], '"old"')
+
+    @responses.activate
+    def test_read_file_stream_resume_wrong_range(self) -> None:
+        """
+        Negative test: Should raise ValueError when the server answers with another range.
+        """
+        uuid = '1234-5678-9012-3456'
+        responses.add(responses.GET, f'http://localhost:5000/file/{uuid}/read/', body=b'File content here.',
+                      headers={'Content-Range': 'bytes 0-17/18'}, status=206)
+
+        with self.assertRaises(ValueError):
+            self.client.read_file_stream(uuid, offset=5)
+
 
 if __name__ == '__main__':
     import unittest
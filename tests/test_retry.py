@@ -0,0 +1,81 @@
+import json
+import unittest
+from unittest.mock import Mock, patch
+from retry import RetryPolicy
+
+
+class TestRetryPolicy(unittest.TestCase):
+
+    def setUp(self) -> None:
+        """Patch sleeping out of the retry loop."""
+        patcher = patch('retry.time.sleep')
+        self.mock_sleep: Mock = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_retries_retryable_failures(self) -> None:
+        """Should repeat a failing call with backoff until it succeeds."""
+        call = Mock(side_effect=[ConnectionError(), ConnectionError(), 'result'])
+        policy = RetryPolicy(retries=3, timeout=5.0)
+
+        self.assertEqual(policy.run(call, lambda e: isinstance(e, ConnectionError)), 'result')
+        self.assertEqual(call.call_count, 3)
+        call.assert_called_with(5.0)
+        self.assertEqual(self.mock_sleep.call_count, 2)
+
+    def test_gives_up_after_retries(self) -> None:
+        """Should raise the last failure once all retries are used."""
+        call = Mock(side_effect=ConnectionError('refused'))
+
+        with self.assertRaisesRegex(ConnectionError, 'refused'):
+            RetryPolicy(retries=2).run(call, lambda e: True)
+        self.assertEqual(call.call_count, 3)
+
+    def test_does_not_retry_other_failures(self) -> None:
+        """Should raise failures which are not retryable immediately."""
+        call = Mock(side_effect=FileNotFoundError())
+
+        with self.assertRaises(FileNotFoundError):
+            RetryPolicy(retries=3).run(call, lambda e: isinstance(e, ConnectionError))
+        self.assertEqual(call.call_count, 1)
+
+    def test_deadline_limits_timeout_and_retries(self) -> None:
+        """Should shorten attempts to the time left and stop retrying at the deadline."""
+        policy = RetryPolicy(retries=10, timeout=5.0, deadline=2.0)
+        call = Mock(side_effect=ConnectionError())
+
+        with patch('retry.time.monotonic', side_effect=[100.0, 100.5, 100.6, 101.9, 102.5]), \
+                patch('retry.random.uniform', return_value=0.2):
+            with self.assertRaises(ConnectionError):
+                policy.run(call, lambda e: True)
+
+        self.assertEqual(call.call_count, 2)
+        self.assertEqual(call.call_args_list[0].args, (1.5,))
+        self.assertAlmostEqual(call.call_args_list[1].args[0], 0.1)
+
+    def test_expired_deadline_raises_timeout(self) -> None:
+        """Should not start an attempt once the deadline has passed."""
+        with patch('retry.time.monotonic', side_effect=[100.0, 103.0]):
+            with self.assertRaises(TimeoutError):
+                RetryPolicy(deadline=2.0).run(Mock(), lambda e: True)
+
+    def test_backoff_is_jittered_and_capped(self) -> None:
+        """Should draw the delay between zero and the capped exponential bound."""
+        policy = RetryPolicy(backoff=0.1, max_backoff=1.0)
+        with patch('retry.random.uniform', side_effect=lambda low, high: high) as mock_uniform:
+            self.assertAlmostEqual(policy.backoff_delay(2), 0.4)
+            self.assertEqual(policy.backoff_delay(10), 1.0)
+        mock_uniform.assert_called_with(0, 1.0)
+
+    def test_grpc_options_enable_native_retries(self) -> None:
+        """Should describe the policy as a gRPC retry service config."""
+        options = dict(RetryPolicy(retries=9, backoff=0.1, max_backoff=2.0).grpc_options('File'))
+
+        self.assertEqual(options['grpc.enable_retries'], 1)
+        [method_config] = json.loads(options['grpc.service_config'])['methodConfig']
+        self.assertEqual(method_config['name'], [{'service': 'File'}])
+        self.assertEqual(method_config['retryPolicy']['maxAttempts'], 5)
+        self.assertEqual(method_config['retryPolicy']['retryableStatusCodes'], ['UNAVAILABLE'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+from flask_server.store import SqliteMetadataStore
+from flask_server.scanner import Scanner, sniff_mimetype, UUID_XATTR
+
+
+class TestScanner(unittest.TestCase):
+
+    def setUp(self) -> None:
+        """Create a small storage tree and a metadata database for each test."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root: str = os.path.join(self.tmp_dir.name, 'storage')
+        os.makedirs(os.path.join(self.root, 'docs', 'old'))
+        self.write('readme.txt', b'Hello')
+        self.write('docs/report.json', b'{}')
+        self.write('docs/old/image', b'\x89PNG\r\n\x1a\n' + b'\0' * 10)
+        self.db: str = os.path.join(self.tmp_dir.name, 'metadata.db')
+        self.store = SqliteMetadataStore(self.db)
+        self.scanner = Scanner(self.root, self.store, self.db, workers=4)
+
+    def tearDown(self) -> None:
+        self.scanner.close()
+        self.store.close()
+        self.tmp_dir.cleanup()
+
+    def write(self, path: str, content: bytes) -> None:
+        with open(os.path.join(self.root, path), 'wb') as f:
+            f.write(content)
+
+    def uuid_of(self, path: str) -> str:
+        connection = self.scanner._connection()
+        directory, name = os.path.split(os.path.join(self.root, path))
+        return connection.execute("SELECT uuid FROM scan_state WHERE directory = ? AND name = ?",
+                                  (directory, name)).fetchone()[0]
+
+    def test_scan_indexes_all_files(self) -> None:
+        """Should add every file with its size, MIME type and path."""
+        result = self.scanner.scan()
+
+        self.assertEqual((result.added, result.updated, result.removed, result.unchanged), (3, 0, 0, 0))
+        file_metadata = self.store.get(self.uuid_of('readme.txt'))
+        self.assertEqual(file_metadata.name, 'readme.txt')
+        self.assertEqual(file_metadata.size, 5)
+        self.assertEqual(file_metadata.mimetype, 'text/plain')
+        self.assertEqual(file_metadata.path, os.path.join(self.root, 'readme.txt'))
+        self.assertTrue(file_metadata.create_datetime.endswith('Z'))
+        self.assertEqual(self.store.get(self.uuid_of('docs/old/image')).mimetype, 'image/png')
+
+    def test_rescan_skips_unchanged_files(self) -> None:
+        """Should not examine files whose inode, mtime and size are unchanged."""
+        self.scanner.scan()
+
+        with patch('flask_server.scanner.sniff_mimetype') as mock_sniff:
+            result = self.scanner.scan()
+
+        mock_sniff.assert_not_called()
+        self.assertEqual((result.added, result.updated, result.removed, result.unchanged), (0, 0, 0, 3))
+
+    def test_rescan_updates_changed_files_and_keeps_uuid(self) -> None:
+        """Should re-examine a changed file and keep its UUID."""
+        self.scanner.scan()
+        uuid = self.uuid_of('readme.txt')
+
+        self.write('readme.txt', b'Hello, world')
+        result = self.scanner.scan()
+
+        self.assertEqual((result.added, result.updated), (0, 1))
+        self.assertEqual(self.uuid_of('readme.txt'), uuid)
+        self.assertEqual(self.store.get(uuid).size, 12)
+
+    def test_rescan_removes_deleted_files_and_directories(self) -> None:
+        """Should remove files which were deleted, also with their whole directory."""
+        self.scanner.scan()
+        readme_uuid = self.uuid_of('readme.txt')
+        image_uuid = self.uuid_of('docs/old/image')
+
+        os.remove(os.path.join(self.root, 'readme.txt'))
+        shutil.rmtree(os.path.join(self.root, 'docs', 'old'))
+        result = self.scanner.scan()
+
+        self.assertEqual((result.removed, result.unchanged), (2, 1))
+        self.assertIsNone(self.store.get(readme_uuid))
+        self.assertIsNone(self.store.get(image_uuid))
+        self.assertEqual(len(self.store), 1)
+
+    def test_renamed_directory_keeps_xattr_uuids(self) -> None:
+        """Should keep files whose UUID moved with their renamed directory in the store."""
+        image = os.path.join(self.root, 'docs', 'old', 'image')
+        os.setxattr(image, UUID_XATTR, b'11111111-2222-3333-4444-555555555555')
+        self.scanner.scan()
+
+        os.rename(os.path.join(self.root, 'docs', 'old'), os.path.join(self.root, 'docs', 'archive'))
+        result = self.scanner.scan()
+
+        self.assertEqual((result.added, result.moved, result.removed), (0, 1, 0))
+        file_metadata = self.store.get('11111111-2222-3333-4444-555555555555')
+        self.assertEqual(file_metadata.path, os.path.join(self.root, 'docs', 'archive', 'image'))
+        self.assertEqual(len(self.store), 3)
+
+    def test_renamed_files_keep_uuids_without_xattr(self) -> None:
+        """Should give a renamed file, also in a renamed directory, the UUID it had before."""
+        self.scanner.scan()
+        readme_uuid = self.uuid_of('readme.txt')
+        image_uuid = self.uuid_of('docs/old/image')
+
+        os.rename(os.path.join(self.root, 'readme.txt'), os.path.join(self.root, 'README'))
+        os.rename(os.path.join(self.root, 'docs', 'old'), os.path.join(self.root, 'docs', 'archive'))
+        result = self.scanner.scan()
+
+        self.assertEqual((result.added, result.moved, result.removed, result.unchanged), (0, 2, 0, 1))
+        self.assertEqual(self.uuid_of('README'), readme_uuid)
+        self.assertEqual(self.uuid_of('docs/archive/image'), image_uuid)
+        self.assertEqual(self.store.get(readme_uuid).path, os.path.join(self.root, 'README'))
+        self.assertEqual(self.store.get(image_uuid).name, 'image')
+        self.assertEqual(len(self.store), 3)
+        self.assertEqual(self.scanner.scan().unchanged, 3)
+
+    def test_changed_xattr_uuid_removes_previous_uuid(self) -> None:
+        """Should remove the previous UUID of a file whose extended attribute now names another one."""
+        self.scanner.scan()
+        previous_uuid = self.uuid_of('readme.txt')
+
+        readme = os.path.join(self.root, 'readme.txt')
+        os.setxattr(readme, UUID_XATTR, b'11111111-2222-3333-4444-555555555555')
+        self.write('readme.txt', b'Hello, world')
+        result = self.scanner.scan()
+
+        self.assertEqual(result.updated, 1)
+        self.assertIsNone(self.store.get(previous_uuid))
+        self.assertEqual(self.store.get('11111111-2222-3333-4444-555555555555').size, 12)
+        self.assertEqual(len(self.store), 3)
+
+    def test_sniff_mimetype(self) -> None:
+        """Should recognize types by extension, by signature and binary content without either."""
+        self.write('data', b'\0\1\2')
+        self.assertEqual(sniff_mimetype(os.path.join(self.root, 'docs/report.json')), 'application/json')
+        self.assertEqual(sniff_mimetype(os.path.join(self.root, 'docs/old/image')), 'image/png')
+        self.assertEqual(sniff_mimetype(os.path.join(self.root, 'data')), 'application/octet-stream')
+
+
+if __name__ == '__main__':
+    unittest.main()
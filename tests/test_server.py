@@ -1,8 +1,13 @@
 import os
+import gzip
+import json
 import sys
+import logging
 import unittest
+from unittest.mock import patch
 from flask import Flask
 from flask_server.server import app, FileMetadata, FileService, FileAPI
+from flask_server.request_log import RequestLog
 
 class FileAPITestCase(unittest.TestCase):
 
@@ -30,7 +35,10 @@ class FileAPITestCase(unittest.TestCase):
         self.app: Flask = Flask(__name__)
         self.app.testing = True
         self.client = self.app.test_client()
-        self.file_api: FileAPI = FileAPI(self.app, self.file_service)
+        # A log of its own, the default one would write to standard error from threads left running
+        self.request_log = RequestLog(f'test.{self.id()}', handlers=[logging.NullHandler()])
+        self.addCleanup(self.request_log.stop)
+        self.file_api: FileAPI = FileAPI(self.app, self.file_service, request_log=self.request_log)
 
     def tearDown(self) -> None:
         """Clean up the test environment after each test."""
@@ -52,6 +60,26 @@ class FileAPITestCase(unittest.TestCase):
         self.assertEqual(response.status_code, 404)
         self.assertIn("File with UUID invalid_uuid not found.", response.get_data(as_text=True))
 
+    def test_file_stat_serves_cached_response(self) -> None:
+        """Test file stat endpoint serializes the metadata once and refreshes it after an update."""
+        with patch.object(FileMetadata, 'to_dict', autospec=True, side_effect=FileMetadata.to_dict) as mock_to_dict:
+            first = self.client.get('/file/1234/stat/')
+            second = self.client.get('/file/1234/stat/')
+        self.assertEqual(mock_to_dict.call_count, 1)
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(json.loads(first.data)["size"], 12345)
+        self.assertEqual(first.headers['ETag'], second.headers['ETag'])
+
+        updated = FileMetadata(uuid="1234", create_datetime="2023-09-20T12:34:56Z", size=20, mimetype="text/plain",
+                               name="example.txt", path=self.test_file_path)
+        self.file_service.add_file_metadata(updated)
+        response = self.client.get('/file/1234/stat/', headers={'If-None-Match': first.headers['ETag']})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json["size"], 20)
+
+        self.file_service.delete_file_metadata("1234")
+        self.assertEqual(self.client.get('/file/1234/stat/').status_code, 404)
+
     def test_read_file_success(self) -> None:
         """Test file read endpoint with a valid UUID."""
         response = self.client.get('/file/1234/read/')
@@ -82,5 +110,207 @@ class FileAPITestCase(unittest.TestCase):
         response = self.client.get('/file/!!invalid_uuid_format!!/stat/')
         self.assertEqual(response.status_code, 404)
 
+    def test_file_stat_conditional(self) -> None:
+        """Test file stat endpoint answers 304 for a matching ETag or Last-Modified."""
+        response = self.client.get('/file/1234/stat/')
+        self.assertIn('ETag', response.headers)
+        self.assertEqual(response.headers['Last-Modified'], 'Wed, 20 Sep 2023 12:34:56 GMT')
+
+        response = self.client.get('/file/1234/stat/', headers={'If-None-Match': response.headers['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+        response = self.client.get('/file/1234/stat/', headers={'If-Modified-Since': 'Wed, 20 Sep 2023 12:34:56 GMT'})
+        self.assertEqual(response.status_code, 304)
+
+    def test_read_file_conditional(self) -> None:
+        """Test file read endpoint answers 304 for a matching ETag and 200 after a change."""
+        etag = self.client.get('/file/1234/read/').headers['ETag']
+
+        response = self.client.get('/file/1234/read/', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b'')
+
+        self.file_service.files_metadata["1234"].size = 20
+        response = self.client.get('/file/1234/read/', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+    def test_read_file_with_stat(self) -> None:
+        """Test file read endpoint sends the metadata headers only when asked with stat=1."""
+        self.file_service.files_metadata["1234"].name = "výkaz 1.txt"
+        response = self.client.get('/file/1234/read/?stat=1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, b'This is a test file.')
+        self.assertEqual(response.headers['X-File-Name'], 'v%C3%BDkaz%201.txt')
+        self.assertEqual(response.headers['X-File-Size'], '12345')
+        self.assertEqual(response.headers['X-File-Create-Datetime'], '2023-09-20T12:34:56Z')
+        self.assertEqual(response.headers['X-File-Mimetype'], 'text/plain')
+
+        response = self.client.get('/file/1234/read/')
+        self.assertNotIn('X-File-Name', response.headers)
+
+    def test_read_file_single_range(self) -> None:
+        """Test file read endpoint answers a single range with 206 Partial Content."""
+        response = self.client.get('/file/1234/read/', headers={'Range': 'bytes=5-6'})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.data, b'is')
+        self.assertEqual(response.headers['Content-Range'], 'bytes 5-6/20')
+
+    def test_read_file_multi_range(self) -> None:
+        """Test file read endpoint answers several ranges with a multipart/byteranges body."""
+        response = self.client.get('/file/1234/read/', headers={'Range': 'bytes=0-3,-5'})
+        self.assertEqual(response.status_code, 206)
+        self.assertTrue(response.headers['Content-Type'].startswith('multipart/byteranges; boundary='))
+        body = response.get_data(as_text=True)
+        self.assertIn('Content-Range: bytes 0-3/20\r\n\r\nThis\r\n', body)
+        self.assertIn('Content-Range: bytes 15-19/20\r\n\r\nfile.\r\n', body)
+
+    def test_read_file_multi_range_attachment_name(self) -> None:
+        """Test file read endpoint sends the same Content-Disposition for one and for several ranges."""
+        self.file_service.add_file_metadata(FileMetadata(
+            uuid="1234", create_datetime="2023-09-20T12:34:56Z", size=20, mimetype="text/plain",
+            name="文件 a.txt", path=self.test_file_path
+        ))
+        single = self.client.get('/file/1234/read/', headers={'Range': 'bytes=0-3'})
+        multi = self.client.get('/file/1234/read/', headers={'Range': 'bytes=0-3,5-6'})
+
+        self.assertEqual(multi.status_code, 206)
+        self.assertEqual(multi.headers['Content-Disposition'], single.headers['Content-Disposition'])
+        self.assertIn("filename*=UTF-8''%E6%96%87%E4%BB%B6%20a.txt", multi.headers['Content-Disposition'])
+
+    def test_read_file_multi_range_if_range_mismatch(self) -> None:
+        """Test file read endpoint sends the whole file when If-Range does not match."""
+        response = self.client.get('/file/1234/read/', headers={'Range': 'bytes=0-3,5-6', 'If-Range': '"other"'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, b'This is a test file.')
+
+    def test_read_file_if_range_date_without_offset(self) -> None:
+        """Test file read endpoint compares an If-Range date with a creation time stored without an offset."""
+        self.file_service.add_file_metadata(FileMetadata(
+            uuid="1234", create_datetime="2024-01-01T00:00:00", size=20, mimetype="text/plain",
+            name="example.txt", path=self.test_file_path
+        ))
+        for ranges in ('bytes=0-3', 'bytes=0-3,5-6'):
+            with self.subTest(ranges=ranges):
+                response = self.client.get('/file/1234/read/', headers={
+                    'Range': ranges, 'If-Range': 'Mon, 01 Jan 2024 00:00:00 GMT'})
+                self.assertEqual(response.status_code, 206)
+
+                response = self.client.get('/file/1234/read/', headers={
+                    'Range': ranges, 'If-Range': 'Sun, 31 Dec 2023 23:59:59 GMT'})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.data, b'This is a test file.')
+
+    def test_read_file_gzip_compression(self) -> None:
+        """Test file read endpoint compresses text content when the client accepts gzip."""
+        with open(self.test_file_path, "w") as f:
+            f.write("This is a test file.\n" * 100)
+        response = self.client.get('/file/1234/read/', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        self.assertEqual(gzip.decompress(response.data), b"This is a test file.\n" * 100)
+
+        etag = response.headers['ETag']
+        self.assertTrue(etag.startswith('W/'))
+        revalidated = self.client.get('/file/1234/read/', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_read_file_no_compression(self) -> None:
+        """Test file read endpoint sends small, binary or unrequested content uncompressed."""
+        response = self.client.get('/file/1234/read/', headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', response.headers)
+
+        with open(self.test_file_path, "wb") as f:
+            f.write(b"\0" * 4096)
+        response = self.client.get('/file/1234/read/', headers={'Accept-Encoding': 'identity'})
+        self.assertNotIn('Content-Encoding', response.headers)
+
+        self.file_service.files_metadata["1234"].mimetype = "application/octet-stream"
+        response = self.client.get('/file/1234/read/', headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertEqual(response.data, b"\0" * 4096)
+
+    def test_read_file_sends_file_wrapper(self) -> None:
+        """Test file read endpoint hands the open file to the file wrapper of the server and lets it close it."""
+        wrappers: list[RecordingFileWrapper] = []
+
+        def file_wrapper(f, block_size=8192):
+            wrappers.append(RecordingFileWrapper(f, block_size))
+            return wrappers[-1]
+
+        response = self.client.get('/file/1234/read/', environ_overrides={'wsgi.file_wrapper': file_wrapper})
+        self.assertEqual(response.data, b'This is a test file.')
+        response.close()
+        self.assertEqual(wrappers[0].start, 0)
+        self.assertTrue(wrappers[0].file.closed)
+
+        response = self.client.get('/file/1234/read/', headers={'Range': 'bytes=5-6'},
+                                   environ_overrides={'wsgi.file_wrapper': file_wrapper})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.headers['Content-Range'], 'bytes 5-6/20')
+        self.assertEqual(response.headers['Content-Length'], '2')
+        self.assertEqual(response.headers['Content-Disposition'], 'attachment; filename=example.txt')
+        response.close()
+        self.assertEqual(wrappers[1].start, 5)
+        self.assertTrue(wrappers[1].file.closed)
+
+        response = self.client.get('/file/1234/read/', headers={'Range': 'bytes=50-60'},
+                                   environ_overrides={'wsgi.file_wrapper': file_wrapper})
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response.headers['Content-Range'], 'bytes */20')
+
+    def test_read_file_offload(self) -> None:
+        """Test file read endpoint leaves sending the file to the front proxy in the offload modes."""
+        app = Flask(__name__)
+        FileAPI(app, self.file_service, offload='x-accel-redirect', offload_root=os.path.dirname(self.test_file_path),
+                offload_prefix='/internal', request_log=self.request_log)
+        client = app.test_client()
+
+        response = client.get('/file/1234/read/?stat=1', headers={'Accept-Encoding': 'gzip', 'Range': 'bytes=0-3'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['X-Accel-Redirect'], '/internal/example.txt')
+        self.assertEqual(response.headers['Accept-Ranges'], 'bytes')
+        self.assertEqual(response.headers['X-File-Name'], 'example.txt')
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertEqual(response.data, b'')
+
+        response = client.get('/file/1234/read/', headers={'If-None-Match': response.headers['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+        app = Flask(__name__)
+        FileAPI(app, self.file_service, offload='x-sendfile', request_log=self.request_log)
+        response = app.test_client().get('/file/1234/read/')
+        self.assertEqual(response.headers['X-Sendfile'], self.test_file_path)
+        self.assertEqual(response.data, b'')
+
+        with self.assertRaises(ValueError):
+            FileAPI(Flask(__name__), self.file_service, offload='sendfile', request_log=self.request_log)
+
+    def test_read_file_offload_outside_root(self) -> None:
+        """Test file read endpoint sends files outside the directory of the proxy itself."""
+        app = Flask(__name__)
+        FileAPI(app, self.file_service, offload='x-accel-redirect', offload_root='/srv/files',
+                request_log=self.request_log)
+
+        response = app.test_client().get('/file/1234/read/')
+        self.assertNotIn('X-Accel-Redirect', response.headers)
+        self.assertEqual(response.data, b'This is a test file.')
+        response.close()
+
+class RecordingFileWrapper:
+    """File wrapper of a WSGI server recording where the file was positioned when handed over."""
+
+    def __init__(self, file, block_size: int) -> None:
+        self.file = file
+        self.block_size = block_size
+        self.start = file.tell()
+
+    def __iter__(self):
+        return iter(lambda: self.file.read(self.block_size), b'')
+
+    def close(self) -> None:
+        self.file.close()
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,84 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import patch
+from stat_cache import StatCache
+
+STAT_DATA: dict = {
+    'name': 'example.txt',
+    'size': 12345,
+    'create_datetime': '2023-09-20T12:34:56Z',
+    'mimetype': 'text/plain'
+}
+
+
+class TestStatCache(unittest.TestCase):
+
+    def setUp(self) -> None:
+        """Create a cache in a temporary directory for each test."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path: str = os.path.join(self.tmp_dir.name, 'cache', 'stat.sqlite3')
+        self.cache: StatCache = StatCache(self.path, ttl=60, max_entries=2)
+
+    def tearDown(self) -> None:
+        """Close the cache and remove the temporary directory."""
+        self.cache.close()
+        self.tmp_dir.cleanup()
+
+    def test_put_and_get(self) -> None:
+        """Should return stored metadata for the same backend and UUID only."""
+        self.cache.put('rest:http://localhost:5000', '1234', STAT_DATA)
+
+        self.assertEqual(self.cache.get('rest:http://localhost:5000', '1234'), STAT_DATA)
+        self.assertIsNone(self.cache.get('grpc:localhost:50051', '1234'))
+        self.assertIsNone(self.cache.get('rest:http://localhost:5000', '5678'))
+
+    def test_expired_entry_is_a_miss(self) -> None:
+        """Should not return metadata older than the TTL."""
+        with patch('stat_cache.time.time', return_value=1000.0):
+            self.cache.put('rest', '1234', STAT_DATA)
+        with patch('stat_cache.time.time', return_value=1061.0):
+            self.assertIsNone(self.cache.get('rest', '1234'))
+
+    def test_evicts_least_recently_used(self) -> None:
+        """Should keep only the most recently used entries over the limit."""
+        with patch('stat_cache.time.time', return_value=1000.0):
+            self.cache.put('rest', 'a', STAT_DATA)
+        with patch('stat_cache.time.time', return_value=1001.0):
+            self.cache.put('rest', 'b', STAT_DATA)
+        with patch('stat_cache.time.time', return_value=1002.0):
+            self.cache.get('rest', 'a')
+            self.cache.put('rest', 'c', STAT_DATA)
+            self.cache._evict()
+
+            self.assertIsNotNone(self.cache.get('rest', 'a'))
+            self.assertIsNone(self.cache.get('rest', 'b'))
+            self.assertIsNotNone(self.cache.get('rest', 'c'))
+
+    def test_shared_between_connections(self) -> None:
+        """Should see entries stored through another connection to the same file."""
+        other: StatCache = StatCache(self.path)
+        other.put('rest', '1234', STAT_DATA)
+        other.close()
+
+        self.assertEqual(self.cache.get('rest', '1234'), STAT_DATA)
+
+    def test_close_with_database_locked(self) -> None:
+        """Should close the connection without raising when another process holds the write lock."""
+        other = sqlite3.connect(self.path, isolation_level=None)
+        other.execute("BEGIN IMMEDIATE")
+        self.cache._connection.execute("PRAGMA busy_timeout = 0")
+        try:
+            self.cache.close()
+        finally:
+            other.execute("ROLLBACK")
+            other.close()
+
+        with self.assertRaises(sqlite3.ProgrammingError):
+            self.cache._connection.execute("SELECT 1")
+        self.cache = StatCache(self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,224 @@
+import os
+import tempfile
+import threading
+import unittest
+from flask_server.store import FileMetadata, MetadataStore, DictMetadataStore, CompactMetadataStore, \
+    SqliteMetadataStore, _after_fork_in_child
+from flask_server.server import FileService
+
+
+def make_metadata(uuid: str, size: int = 1) -> FileMetadata:
+    return FileMetadata(uuid=uuid, create_datetime="2023-09-20T12:34:56Z", size=size, mimetype="text/plain",
+                        name=f"{uuid}.txt", path=f"/data/{uuid}.txt")
+
+
+class TestSqliteMetadataStore(unittest.TestCase):
+
+    def setUp(self) -> None:
+        """Open a store in a temporary directory for each test."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path: str = os.path.join(self.tmp_dir.name, 'metadata.db')
+        self.store = SqliteMetadataStore(self.path, lru_size=2)
+
+    def tearDown(self) -> None:
+        self.store.close()
+        self.tmp_dir.cleanup()
+
+    def test_add_get_delete(self) -> None:
+        """Should return added metadata by UUID and nothing after it was deleted."""
+        self.store.add(make_metadata("1234", size=42))
+
+        file_metadata = self.store.get("1234")
+        self.assertEqual(file_metadata.to_dict(), make_metadata("1234", size=42).to_dict())
+        self.assertEqual(file_metadata.path, "/data/1234.txt")
+        self.assertIn("1234", self.store)
+
+        self.store.delete("1234")
+        self.assertIsNone(self.store.get("1234"))
+        with self.assertRaises(KeyError):
+            self.store["1234"]
+
+    def test_add_many_and_persistence(self) -> None:
+        """Should ingest files in batches and keep them after the store is reopened."""
+        self.store.add_many(make_metadata(str(i)) for i in range(2500))
+        self.store.close()
+
+        reopened = SqliteMetadataStore(self.path)
+        try:
+            self.assertEqual(len(reopened), 2500)
+            self.assertEqual(reopened.get("2499").name, "2499.txt")
+        finally:
+            reopened.close()
+
+    def test_lru_is_invalidated_by_changes(self) -> None:
+        """Should not serve a cached entry after the file was replaced or deleted."""
+        self.store.add(make_metadata("1234", size=1))
+        self.assertEqual(self.store.get("1234").size, 1)
+
+        self.store.add(make_metadata("1234", size=2))
+        self.assertEqual(self.store.get("1234").size, 2)
+
+        self.store.delete("1234")
+        self.assertIsNone(self.store.get("1234"))
+
+    def test_lru_sees_changes_of_other_processes(self) -> None:
+        """Should drop cached entries once another connection changed the database."""
+        store = SqliteMetadataStore(self.path, check_interval=0)
+        self.addCleanup(store.close)
+        store.add(make_metadata("1234", size=1))
+        self.assertEqual(store.get("1234").size, 1)
+        version = store.version()
+
+        self.store.add(make_metadata("1234", size=2))
+
+        self.assertEqual(store.get("1234").size, 2)
+        self.assertNotEqual(store.version(), version)
+
+    def test_lru_is_bounded(self) -> None:
+        """Should keep at most lru_size entries in memory."""
+        self.store.add_many(make_metadata(str(i)) for i in range(5))
+        for i in range(5):
+            self.store.get(str(i))
+
+        self.assertEqual(list(self.store._lru), ["3", "4"])
+
+    def test_threads_use_own_connections(self) -> None:
+        """Should serve lookups from several threads at once."""
+        self.store.add_many(make_metadata(str(i)) for i in range(100))
+        results: list[bool] = []
+
+        def lookup() -> None:
+            results.append(all(self.store.get(str(i)) is not None for i in range(100)))
+
+        threads = [threading.Thread(target=lookup) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, [True] * 4)
+
+    def test_after_fork_opens_new_connection(self) -> None:
+        """Should not use the connection of the parent process after a fork."""
+        self.store.add(make_metadata("1234"))
+        inherited = self.store._connection()
+
+        self.store._after_fork()
+
+        self.assertIsNot(self.store._connection(), inherited)
+        self.assertEqual(self.store.get("1234").name, "1234.txt")
+        inherited.close()
+
+    def test_fork_hook_covers_every_open_store(self) -> None:
+        """Should reset the connections of all stores from the one fork hook of the module."""
+        other = SqliteMetadataStore(self.path)
+        self.addCleanup(other.close)
+        inherited = [self.store._connection(), other._connection()]
+
+        _after_fork_in_child()
+
+        self.assertIsNot(self.store._connection(), inherited[0])
+        self.assertIsNot(other._connection(), inherited[1])
+        for connection in inherited:
+            connection.close()
+
+
+class TestCompactMetadataStore(unittest.TestCase):
+
+    def fields(self, file_metadata: FileMetadata) -> tuple:
+        return tuple(getattr(file_metadata, field) for field in FileMetadata.__slots__)
+
+    def test_round_trip(self) -> None:
+        """Should return exactly the stored values, packed or kept in side tables."""
+        files = [
+            make_metadata("123e4567-e89b-12d3-a456-426614174000", size=2 ** 40),
+            FileMetadata("1234", "2023-09-20T12:34:56.5+02:00", 0, "text/plain", "výkaz.txt", "relative/other.txt"),
+            FileMetadata("123E4567-E89B-12D3-A456-426614174000", "2023-09-20T12:34:56.123456", 7,
+                         "application/octet-stream", "raw\udcff", "/data/raw\udcff"),
+            FileMetadata("5678", "not a date", 1, "text/plain", "a.txt", "a.txt"),
+        ]
+        store = CompactMetadataStore(files)
+
+        self.assertEqual(len(store), 4)
+        for file_metadata in files:
+            self.assertEqual(self.fields(store.get(file_metadata.uuid)), self.fields(file_metadata))
+        self.assertIsNone(store.get("123e4567-e89b-12d3-a456-426614174001"))
+        self.assertEqual(sorted(f.uuid for f in store), sorted(f.uuid for f in files))
+
+    def test_replace_and_delete(self) -> None:
+        """Should replace metadata in place and forget deleted files across table resizes."""
+        uuids = [f"00000000-0000-4000-8000-{i:012d}" for i in range(1000)]
+        store = CompactMetadataStore(make_metadata(uuid) for uuid in uuids)
+
+        for uuid in uuids[:500]:
+            store.delete(uuid)
+        store.add(make_metadata(uuids[999], size=5))
+        store.add_many(make_metadata(uuid) for uuid in uuids[:10])
+
+        self.assertEqual(len(store), 510)
+        self.assertIsNone(store.get(uuids[10]))
+        self.assertEqual(store.get(uuids[0]).size, 1)
+        self.assertEqual(store.get(uuids[999]).size, 5)
+
+    def test_views_are_independent(self) -> None:
+        """Should build slotted views, so changing one does not change the store."""
+        store = CompactMetadataStore([make_metadata("1234")])
+
+        view = store.get("1234")
+        view.size = 99
+
+        self.assertEqual(store.get("1234").size, 1)
+        with self.assertRaises(AttributeError):
+            view.extra = True
+
+
+class TestFileServiceStore(unittest.TestCase):
+
+    def test_file_service_keeps_dict_api(self) -> None:
+        """Should keep the dictionary behaviour of FileService without a store."""
+        file_service = FileService(files_metadata={"1234": make_metadata("1234")})
+
+        self.assertIsInstance(file_service.store, DictMetadataStore)
+        self.assertEqual(file_service.files_metadata["1234"].name, "1234.txt")
+        file_service.add_files_metadata([make_metadata("5678")])
+        file_service.delete_file_metadata("1234")
+        self.assertIsNone(file_service.get_file_metadata("1234"))
+        self.assertIsNotNone(file_service.get_file_metadata("5678"))
+
+    def test_store_interface_is_abstract(self) -> None:
+        """Should refuse to instantiate a store which does not implement the interface."""
+        class PartialStore(MetadataStore):
+            def get(self, uuid: str) -> FileMetadata | None:
+                return None
+
+        with self.assertRaises(TypeError):
+            PartialStore()
+
+    def test_file_service_sees_changes_of_other_processes(self) -> None:
+        """Should not serve a cached stat response after another process changed the database."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'metadata.db')
+            file_service = FileService(store=SqliteMetadataStore(path, check_interval=0))
+            writer = SqliteMetadataStore(path)
+            writer.add(make_metadata("1234", size=1))
+            self.assertIn(b'"size":1', file_service.get_stat_response("1234").body)
+
+            writer.add(make_metadata("1234", size=2))
+
+            self.assertIn(b'"size":2', file_service.get_stat_response("1234").body)
+            writer.close()
+            file_service.store.close()
+
+    def test_file_service_with_sqlite_store(self) -> None:
+        """Should serve metadata from a SQLite store through the same API."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store = SqliteMetadataStore(os.path.join(tmp_dir, 'metadata.db'))
+            file_service = FileService(store=store)
+            file_service.add_file_metadata(make_metadata("1234"))
+
+            self.assertEqual(file_service.get_file_metadata("1234").name, "1234.txt")
+            store.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import os
+import json
+import tempfile
+import unittest
+from unittest.mock import patch
+from timings import Timings
+
+
+class TestTimings(unittest.TestCase):
+
+    def test_span_records_duration_and_args(self) -> None:
+        """Should record the time spent in the block with its arguments."""
+        timings = Timings(origin=10.0)
+        with patch('timings.time.perf_counter', side_effect=[12.0, 12.5]):
+            with timings.span('connect', host='localhost'):
+                pass
+
+        [span] = timings.spans
+        self.assertEqual((span.name, span.start, span.duration, span.args), ('connect', 12.0, 0.5, {'host': 'localhost'}))
+
+    def test_disabled_recorder_ignores_spans(self) -> None:
+        """Should not record anything and pass chunks through unchanged."""
+        timings = Timings(enabled=False)
+        chunks = [b'a', b'b']
+        with timings.span('connect'):
+            pass
+        timings.record('startup', 0.0, 1.0)
+
+        self.assertIs(timings.track(chunks), chunks)
+        self.assertEqual(timings.spans, [])
+
+    def test_track_separates_transfer_and_write(self) -> None:
+        """Should record time spent producing and consuming the chunks as separate phases."""
+        timings = Timings()
+        for chunk in timings.track([b'Hello, ', b'world']):
+            pass
+
+        transfer, write = timings.spans
+        self.assertEqual((transfer.name, write.name), ('transfer', 'write'))
+        self.assertEqual(transfer.args, {'chunks': 2, 'bytes': 12})
+
+    def test_summary_aggregates_phases(self) -> None:
+        """Should print count, total and maximum of each phase."""
+        timings = Timings()
+        timings.record('ttfb', 0.0, 0.001)
+        timings.record('ttfb', 0.0, 0.003)
+
+        lines = timings.summary().splitlines()
+        self.assertEqual(lines[1].split(), ['ttfb', '2', '4.000', '3.000'])
+
+    def test_write_trace_exports_chrome_trace(self) -> None:
+        """Should write complete events in microseconds relative to the origin."""
+        timings = Timings(origin=1.0)
+        timings.record('send', 1.5, 0.25, uuid='1234')
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'trace.json')
+            timings.write_trace(path)
+            with open(path) as f:
+                [event] = json.load(f)['traceEvents']
+
+        self.assertEqual((event['name'], event['ph'], event['ts'], event['dur'], event['args']),
+                         ('send', 'X', 500000.0, 250000.0, {'uuid': '1234'}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+"""
+Per-phase timing of client operations.
+
+A Timings recorder collects named spans (import, connect, send, ttfb,
+transfer, write, ...) from any thread. Spans can be summarized per phase or
+exported as a Chrome trace (chrome://tracing, Perfetto). A disabled recorder
+makes every span a no-op, so instrumented code pays almost nothing when
+timings are not requested.
+"""
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager, nullcontext
+from typing import Iterable, Iterator, NamedTuple
+
+class Span(NamedTuple):
+    """A finished span, times in seconds of the performance counter."""
+    name: str
+    start: float
+    duration: float
+    thread_id: int
+    args: dict
+
+class Timings:
+    """
+    Thread-safe recorder of timing spans.
+    """
+    def __init__(self, enabled: bool = True, origin: float = None) -> None:
+        """
+        Initialize the recorder.
+
+        :param enabled: Record spans; a disabled recorder ignores them.
+        :param origin: Performance counter value used as time zero of the trace, defaults to now.
+        """
+        self.enabled: bool = enabled
+        self.origin: float = time.perf_counter() if origin is None else origin
+        self.spans: list[Span] = []
+        self._lock = threading.Lock()
+
+    def record(self, name: str, start: float, duration: float, **args) -> None:
+        """
+        Record a span measured by the caller.
+
+        :param name: Name of the phase.
+        :param start: Performance counter value at the start of the span.
+        :param duration: Duration in seconds.
+        :param args: Additional values shown with the span.
+        """
+        if self.enabled:
+            span = Span(name, start, duration, threading.get_ident(), args)
+            with self._lock:
+                self.spans.append(span)
+
+    def span(self, name: str, **args):
+        """
+        Return a context manager recording the time spent in its block.
+
+        :param name: Name of the phase.
+        :param args: Additional values shown with the span.
+        """
+        if not self.enabled:
+            return nullcontext()
+        return self._span(name, args)
+
+    @contextmanager
+    def _span(self, name: str, args: dict) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start, time.perf_counter() - start, **args)
+
+    def track(self, chunks: Iterable[bytes], fetch: str = 'transfer', consume: str = 'write',
+              **args) -> Iterable[bytes]:
+        """
+        Wrap a chunk iterator, timing separately the producer and the consumer.
+
+        Time spent getting the next chunk is recorded as the fetch phase and
+        time spent by the caller between chunks as the consume phase, each as
+        one span with the accumulated duration.
+
+        :param chunks: Chunks to pass through.
+        :param fetch: Name of the phase producing the chunks.
+        :param consume: Name of the phase consuming the chunks.
+        :param args: Additional values shown with both spans.
+        """
+        if not self.enabled:
+            return chunks
+        return self._track(chunks, fetch, consume, args)
+
+    def _track(self, chunks: Iterable[bytes], fetch: str, consume: str, args: dict) -> Iterator[bytes]:
+        start = time.perf_counter()
+        fetch_time = consume_time = 0.0
+        count = size = 0
+        iterator = iter(chunks)
+        try:
+            while True:
+                before = time.perf_counter()
+                chunk = next(iterator, None)
+                fetch_time += time.perf_counter() - before
+                if chunk is None:
+                    break
+                count += 1
+                size += len(chunk)
+                before = time.perf_counter()
+                yield chunk
+                consume_time += time.perf_counter() - before
+        finally:
+            self.record(fetch, start, fetch_time, chunks=count, bytes=size, **args)
+            self.record(consume, start, consume_time, chunks=count, bytes=size, **args)
+
+    def summary(self) -> str:
+        """
+        Return the total, count and maximum duration of each phase in recording order.
+        """
+        phases: dict[str, list[float]] = {}
+        with self._lock:
+            for span in self.spans:
+                phases.setdefault(span.name, []).append(span.duration)
+        lines = [f"{'phase':<12} {'count':>6} {'total ms':>10} {'max ms':>10}"]
+        for name, durations in phases.items():
+            lines.append(f"{name:<12} {len(durations):>6} {sum(durations) * 1000:>10.3f} "
+                         f"{max(durations) * 1000:>10.3f}")
+        return '\n'.join(lines) + '\n'
+
+    def to_trace(self) -> dict:
+        """
+        Return the spans as a Chrome trace with complete events in microseconds.
+        """
+        pid = os.getpid()
+        with self._lock:
+            spans = list(self.spans)
+        return {
+            'traceEvents': [
+                {
+                    'name': span.name,
+                    'ph': 'X',
+                    'ts': (span.start - self.origin) * 1e6,
+                    'dur': span.duration * 1e6,
+                    'pid': pid,
+                    'tid': span.thread_id,
+                    'args': span.args,
+                }
+                for span in spans
+            ],
+            'displayTimeUnit': 'ms',
+        }
+
+    def write_trace(self, path: str) -> None:
+        """
+        Write the spans as a Chrome trace JSON file.
+
+        :param path: Path to the trace file.
+        """
+        with open(path, 'w') as f:
+            json.dump(self.to_trace(), f)
+
+# Shared recorder for clients created without timings
+NO_TIMINGS = Timings(enabled=False)